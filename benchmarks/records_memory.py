@@ -0,0 +1,123 @@
+"""Memory benchmark: Fakturoid models vs compact records.
+
+Builds synthetic invoices shaped like Fakturoid API v3 responses, measures the
+memory held by the model objects and by their ``Record`` equivalents, and checks
+that every record round-trips to identical ``model_to_dict`` output.
+
+Usage:
+    uv run python benchmarks/records_memory.py [COUNT]
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from fakturoid import Invoice
+
+from fakturoid_mcp.records import compact
+from fakturoid_mcp.tools._helpers import model_to_dict
+
+STATUSES = ["open", "sent", "overdue", "paid", "cancelled"]
+CURRENCIES = ["CZK", "CZK", "CZK", "EUR", "USD"]
+UNITS = ["ks", "hod", "měs", ""]
+
+
+def invoice_payload(i: int, rng: random.Random) -> dict:
+    """Raw API-like payload for one invoice (strings, as returned by the API)."""
+    lines = []
+    for n in range(rng.randint(1, 4)):
+        lines.append(
+            {
+                "id": i * 10 + n,
+                "name": f"Služba {rng.randint(1, 500)}",
+                "quantity": f"{rng.randint(1, 20)}.0",
+                "unit_name": rng.choice(UNITS),
+                "unit_price": f"{rng.randint(100, 50000)}.{rng.randint(0, 99):02d}",
+                "vat_rate": rng.choice([0, 12, 21]),
+                "unit_price_without_vat": f"{rng.randint(100, 50000)}.00",
+                "unit_price_with_vat": f"{rng.randint(100, 60000)}.00",
+            }
+        )
+    total = f"{rng.randint(100, 500000)}.{rng.randint(0, 99):02d}"
+    return {
+        "id": i,
+        "custom_id": None,
+        "document_type": "invoice",
+        "proforma": False,
+        "number": f"2026-{i:06d}",
+        "variable_symbol": f"2026{i:06d}",
+        "your_name": "Moje firma s.r.o.",
+        "client_name": f"Klient {rng.randint(1, 2000)}",
+        "subject_id": rng.randint(1, 2000),
+        "status": rng.choice(STATUSES),
+        "issued_on": "2026-03-01",
+        "taxable_fulfillment_due": "2026-03-01",
+        "due": 14,
+        "due_on": "2026-03-15",
+        "note": "Fakturujeme Vám za dodané služby:",
+        "currency": rng.choice(CURRENCIES),
+        "exchange_rate": "1.0",
+        "payment_method": "bank",
+        "language": "cz",
+        "tags": [],
+        "lines": lines,
+        "subtotal": total,
+        "total": total,
+        "native_subtotal": total,
+        "native_total": total,
+        "remaining_amount": total,
+        "remaining_native_amount": total,
+        "html_url": f"https://app.fakturoid.cz/slug/invoices/{i}",
+        "url": f"https://app.fakturoid.cz/api/v3/accounts/slug/invoices/{i}.json",
+        "created_at": "2026-03-01T10:00:00.000+01:00",
+        "updated_at": "2026-03-01T10:00:00.000+01:00",
+    }
+
+
+def retained(baseline: int) -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] - baseline
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    payloads = [invoice_payload(i, rng) for i in range(count)]
+
+    # Timed in its own pass: tracemalloc slows allocation-heavy code several times.
+    models = [Invoice(**dict(p)) for p in payloads]
+    gc.collect()
+    started = time.perf_counter()
+    records = [compact(m) for m in models]
+    compact_seconds = time.perf_counter() - started
+    del models, records
+
+    tracemalloc.start()
+    baseline = retained(0)
+    models = [Invoice(**p) for p in payloads]
+    del payloads
+    model_bytes = retained(baseline)
+    records = [compact(m) for m in models]
+
+    mismatches = 0
+    for model, record in zip(models, records):
+        expected = model_to_dict(model)
+        if record.to_dict() != expected or model_to_dict(record.to_model()) != expected:
+            mismatches += 1
+    del models, model, expected
+    record_bytes = retained(baseline)
+    tracemalloc.stop()
+
+    mb = 1024 * 1024
+    print(f"invoices:      {count}")
+    print(f"models:        {model_bytes / mb:8.1f} MiB ({model_bytes / count:6.0f} B/invoice)")
+    print(f"records:       {record_bytes / mb:8.1f} MiB ({record_bytes / count:6.0f} B/invoice)")
+    print(f"reduction:     {model_bytes / max(record_bytes, 1):8.1f}x")
+    print(f"compact time:  {compact_seconds:8.2f} s")
+    print(f"round-trip mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,17 @@
 
 import os
 
-from fakturoid_mcp.server import mcp
+from fakturoid_mcp.server import http_app, mcp
 
 
 def main():
     transport = os.environ.get("FAKTUROID_TRANSPORT", "stdio")
     if transport == "streamable-http":
+        import uvicorn
+
         host = os.environ.get("FAKTUROID_HOST", "0.0.0.0")
         port = int(os.environ.get("FAKTUROID_PORT", "8000"))
-        mcp.run(transport=transport, host=host, port=port)
+        uvicorn.run(http_app(), host=host, port=port)
     else:
         mcp.run(transport="stdio")
 
@@ -0,0 +1,84 @@
+"""Direct Fakturoid API v3 access for endpoints the client library does not cover.
+
+The ``fakturoid`` client returns parsed JSON models; binary downloads such as
+invoice PDFs need the raw (streamed) response, and attachment uploads a streamed
+request body, so they go through this session.
+It obtains its own OAuth token with the same client credentials.
+"""
+
+import threading
+import time
+
+import requests
+
+from fakturoid_mcp.breaker import CircuitBreaker
+from fakturoid_mcp.config import Settings
+from fakturoid_mcp.ratelimit import RateLimiter
+
+API_BASE = "https://app.fakturoid.cz/api/v3"
+TOKEN_URL = f"{API_BASE}/oauth/token"
+TIMEOUT = 30
+
+
+class ApiSession:
+    """Authenticated, rate-limited ``requests`` session for one Fakturoid account.
+
+    Requests go through the same circuit breaker as the client library.
+    """
+
+    def __init__(self, settings: Settings, rate_limiter: RateLimiter, breaker: CircuitBreaker):
+        self.settings = settings
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.base_url = f"{API_BASE}/accounts/{settings.slug}"
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = settings.user_agent
+        self._token: str | None = None
+        self._token_expires = 0.0
+        self._lock = threading.Lock()
+
+    def _access_token(self) -> str:
+        with self._lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                self.rate_limiter.acquire()
+                r = self._session.post(
+                    TOKEN_URL,
+                    auth=(self.settings.client_id, self.settings.client_secret.get_secret_value()),
+                    json={"grant_type": "client_credentials"},
+                    timeout=TIMEOUT,
+                )
+                r.raise_for_status()
+                data = r.json()
+                self._token = data["access_token"]
+                # Renew a minute early so in-flight requests never carry an expired token.
+                self._token_expires = time.monotonic() + data.get("expires_in", 7200) - 60
+            return self._token
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Make a rate-limited request to ``path`` (relative to the account URL).
+
+        Raises ``requests.HTTPError`` for error responses; other statuses
+        (e.g. 204) are returned to the caller.
+        """
+        # Wait for the rate limiter outside the breaker so queueing is not seen as latency.
+        self.rate_limiter.acquire()
+        return self.breaker.call(self._request, method, path, **kwargs)
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        token = self._access_token()
+        headers = {**kwargs.pop("headers", {}), "Authorization": f"Bearer {token}"}
+        r = self._session.request(
+            method,
+            f"{self.base_url}/{path.lstrip('/')}",
+            headers=headers,
+            timeout=TIMEOUT,
+            **kwargs,
+        )
+        if r.status_code == 401:
+            # Token revoked or expired early: drop it so the next call re-authenticates.
+            with self._lock:
+                self._token = None
+        if r.status_code >= 400:
+            r.close()
+        r.raise_for_status()
+        return r
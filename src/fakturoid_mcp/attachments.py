@@ -0,0 +1,252 @@
+"""Content-addressed store for document attachments and their streamed upload.
+
+Fakturoid takes attachments as base64 ``data:`` URLs inside the document's JSON
+body. Instead of building that body in memory, files are copied into the store
+(hashing them on the way) and the request body is generated chunk by chunk
+from disk when it is sent, with its length computed up front. Peak memory per
+upload is a few chunks regardless of the file size.
+
+Identical files share one blob, and each document remembers which blobs it
+already received, so attaching the same content twice (or replaying an
+interrupted write) uploads it only once.
+"""
+
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fakturoid_mcp.api import ApiSession
+
+CHUNK_SIZE = 3 * 64 * 1024
+"""Bytes read per chunk; a multiple of 3 so encoded chunks concatenate without padding."""
+
+DOCUMENT_PATHS = {"invoice": "invoices", "expense": "expenses"}
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def encoded_length(size: int) -> int:
+    """Length of the base64 encoding of ``size`` bytes."""
+    return (size + 2) // 3 * 4
+
+
+class AttachmentBody:
+    """Streamed JSON body ``{"attachments": [...]}`` for an update request.
+
+    ``requests`` takes the Content-Length from ``len()`` and sends the chunks
+    yielded by iteration, which re-reads the blobs so a retried request can
+    send the body again.
+    """
+
+    def __init__(self, files: list[tuple[Path, dict]]):
+        self._parts: list[bytes | Path] = [b'{"attachments":[']
+        for n, (path, meta) in enumerate(files):
+            head = (
+                ("," if n else "")
+                + '{"filename":'
+                + json.dumps(meta["filename"])
+                + f',"data_url":"data:{meta["content_type"]};base64,'
+            )
+            self._parts.extend([head.encode(), path, b'"}'])
+        self._parts.append(b"]}")
+        self._length = sum(
+            encoded_length(part.stat().st_size) if isinstance(part, Path) else len(part)
+            for part in self._parts
+        )
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            with part.open("rb") as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    yield base64.b64encode(chunk)
+
+
+class BlobWriter:
+    """Receives one upload chunk by chunk; ``commit`` stores it under its digest."""
+
+    def __init__(self, store: "AttachmentStore"):
+        self.store = store
+        self.size = 0
+        self._digest = hashlib.sha256()
+        store.blobs.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_name = tempfile.mkstemp(dir=store.blobs, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._digest.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self, filename: str) -> dict:
+        self._file.close()
+        digest = self._digest.hexdigest()
+        path = self.store.blob_path(digest)
+        path.parent.mkdir(exist_ok=True)
+        if path.exists():
+            os.unlink(self._tmp_name)
+        else:
+            os.replace(self._tmp_name, path)
+        return self.store._register(digest, filename, self.size)
+
+    def abort(self) -> None:
+        self._file.close()
+        Path(self._tmp_name).unlink(missing_ok=True)
+
+
+class AttachmentStore:
+    """Stores attachment files by SHA-256 and uploads them to Fakturoid documents.
+
+    ``index.json`` holds the file name, content type and size of each blob (its
+    upload ID is the digest) and, per document, the digests already attached.
+    Local paths are only accepted inside ``local_root``; without it, files can
+    only be attached by upload ID.
+    """
+
+    def __init__(
+        self,
+        api: ApiSession,
+        root: Path,
+        local_root: Path | None = None,
+        max_concurrency: int = 4,
+    ):
+        self.api = api
+        self.root = root
+        self.blobs = root / "blobs"
+        self.local_root = local_root.resolve() if local_root is not None else None
+        self.max_concurrency = max_concurrency
+        self._index_path = root / "index.json"
+        self._index: dict[str, dict] | None = None
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self._index_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._index = {"blobs": {}, "attached": {}}
+        return self._index
+
+    def _save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._index), encoding="utf-8")
+        os.replace(tmp, self._index_path)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs / digest[:2] / digest
+
+    def _register(self, digest: str, filename: str, size: int) -> dict:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        meta = {"filename": filename, "content_type": content_type, "size": size}
+        with self._lock:
+            self._load_index()["blobs"][digest] = meta
+            self._save_index()
+        return {"upload_id": digest, **meta}
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def add(self, chunks: Iterable[bytes], filename: str) -> dict:
+        """Store an upload and return its upload ID, file name, content type and size."""
+        writer = self.writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+            return writer.commit(filename)
+        except BaseException:
+            writer.abort()
+            raise
+
+    def add_file(self, path: str) -> dict:
+        """Copy a local file into the store (see ``add``)."""
+        if self.local_root is None:
+            raise ValueError(
+                "Local attachment paths are disabled (FAKTUROID_ATTACHMENT_DIR is not set); "
+                f"upload the file with POST /uploads and pass its upload ID: {path}"
+            )
+        resolved = Path(path).expanduser().resolve()
+        if not resolved.is_relative_to(self.local_root):
+            raise ValueError(f"Attachment must be inside the attachment directory: {path}")
+        if not resolved.is_file():
+            raise ValueError(f"Attachment file not found: {path}")
+        with resolved.open("rb") as f:
+            return self.add(iter(lambda: f.read(CHUNK_SIZE), b""), resolved.name)
+
+    def resolve(self, refs: list[str]) -> list[dict]:
+        """Turn upload IDs and local paths into stored attachments, dropping duplicates.
+
+        Returns ``{"upload_id", "filename"}`` entries; raises ValueError for
+        unknown upload IDs and missing files.
+        """
+        resolved = {}
+        for ref in refs:
+            if _DIGEST.fullmatch(ref):
+                with self._lock:
+                    meta = self._load_index()["blobs"].get(ref)
+                if meta is None or not self.blob_path(ref).exists():
+                    raise ValueError(f"Unknown upload ID: {ref}")
+                entry = {"upload_id": ref, "filename": meta["filename"]}
+            else:
+                entry = self.add_file(ref)
+            resolved.setdefault(entry["upload_id"], entry)
+        return [{"upload_id": e["upload_id"], "filename": e["filename"]} for e in resolved.values()]
+
+    def attach(self, kind: str, document_id: int, attachments: list[dict]) -> dict | None:
+        """Upload attachments (from ``resolve``) the document does not have yet.
+
+        Returns the updated document as JSON, or None if nothing was sent.
+        """
+        key = f"{kind}:{document_id}"
+        with self._lock:
+            index = self._load_index()
+            done = set(index["attached"].get(key, ()))
+            files = [
+                (self.blob_path(a["upload_id"]), {**index["blobs"][a["upload_id"]], **a})
+                for a in {a["upload_id"]: a for a in attachments}.values()
+                if a["upload_id"] not in done
+            ]
+        if not files:
+            return None
+        r = self.api.request(
+            "PATCH",
+            f"{DOCUMENT_PATHS[kind]}/{document_id}.json",
+            data=AttachmentBody(files),
+            headers={"Content-Type": "application/json"},
+        )
+        with self._lock:
+            attached = self._load_index()["attached"].setdefault(key, [])
+            attached.extend(meta["upload_id"] for _, meta in files)
+            self._save_index()
+        return r.json()
+
+    def attach_many(self, kind: str, batch: list[tuple[int, list[dict]]]) -> list:
+        """Attach files to several documents concurrently.
+
+        Returns, per ``(document_id, attachments)`` item and in order, the
+        updated document JSON, None if nothing was sent, or the exception raised.
+        """
+        if not batch:
+            return []
+
+        def run(item):
+            try:
+                return self.attach(kind, *item)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batch))) as pool:
+            return list(pool.map(run, batch))
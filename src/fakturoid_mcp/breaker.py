@@ -0,0 +1,196 @@
+"""Circuit breaker around the Fakturoid API and background revalidation of stale data."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from functools import wraps
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit is open."""
+
+
+def is_outage(e: Exception) -> bool:
+    """True for errors that indicate Fakturoid is unavailable, not that the request was bad.
+
+    Connection errors, timeouts, 5xx and 429 responses count; other HTTP
+    errors (404, 422, ...) and local errors do not.
+    """
+    if isinstance(e, CircuitOpenError):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, requests.RequestException)
+
+
+class CircuitBreaker:
+    """Trips after ``failure_threshold`` consecutive outage errors or slow calls.
+
+    A call slower than ``latency_threshold`` seconds succeeds but counts as a
+    failure. While open, calls fail immediately with ``CircuitOpenError``.
+    After ``reset_timeout`` seconds one trial call is let through (half-open);
+    its outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, latency_threshold: float, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.last_error: str | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial call is allowed (0 when calls go through)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def _before_call(self) -> bool:
+        """Admit a call or raise; returns True if it is the half-open trial."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and self.retry_in() == 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            raise CircuitOpenError(
+                f"Fakturoid API is unavailable ({self.last_error}); "
+                f"failing fast, retry in {self.retry_in() or self.reset_timeout:.0f}s"
+            )
+
+    def _record(self, trial: bool, error: str | None) -> None:
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if error is None:
+                if self.state != CLOSED:
+                    logger.info("Fakturoid API recovered, closing circuit")
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            self.last_error = error
+            if trial or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning("Opening circuit after %d failures: %s", self.failures, error)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, func: Callable, *args, **kwargs):
+        trial = self._before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(trial, str(e) if is_outage(e) else None)
+            raise
+        elapsed = time.monotonic() - started
+        if elapsed > self.latency_threshold:
+            self._record(trial, f"slow response ({elapsed:.1f}s)")
+        else:
+            self._record(trial, None)
+        return result
+
+    def wrap(self, func: Callable) -> Callable:
+        @wraps(func)
+        def guarded(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+
+        return guarded
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "retry_in": round(self.retry_in(), 1),
+        }
+
+
+class _GuardedCallable:
+    def __init__(self, func, breaker: CircuitBreaker):
+        self._func = func
+        self._breaker = breaker
+
+    def __call__(self, *args, **kwargs):
+        result = self._breaker.call(self._func, *args, **kwargs)
+        if hasattr(result, "load_page"):
+            # Lazy lists fetch their pages later; guard those requests too.
+            result.load_page = self._breaker.wrap(result.load_page)
+        return result
+
+    def __getattr__(self, name):
+        # e.g. ``client.subjects.search``
+        return _guard(getattr(self._func, name), self._breaker)
+
+
+def _guard(value, breaker: CircuitBreaker):
+    return _GuardedCallable(value, breaker) if callable(value) else value
+
+
+class GuardedClient:
+    """Proxy for the Fakturoid client that routes every API call through a breaker."""
+
+    def __init__(self, client, breaker: CircuitBreaker):
+        self._client = client
+        self.breaker = breaker
+
+    def __getattr__(self, name):
+        return _guard(getattr(self._client, name), self.breaker)
+
+
+class Revalidator:
+    """Refreshes entities that were served stale once the API is reachable again.
+
+    Pending refreshes are deduplicated per entity and retried by a single
+    background thread that waits for the circuit to allow calls.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, cache, interval: float = 5.0):
+        self.breaker = breaker
+        self.cache = cache
+        self.interval = interval
+        self._pending: dict[tuple[str, int], Callable[[int], object]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, kind: str, entity_id: int, load: Callable[[int], object]) -> None:
+        with self._lock:
+            self._pending[(kind, entity_id)] = load
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="revalidate", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(max(self.breaker.retry_in(), self.interval))
+            with self._lock:
+                pending = list(self._pending.items())
+            for (kind, entity_id), load in pending:
+                try:
+                    self.cache.put(kind, load(entity_id))
+                except Exception as e:
+                    if is_outage(e):
+                        break
+                    logger.warning("Dropping refresh of %s %s: %s", kind, entity_id, e)
+                with self._lock:
+                    self._pending.pop((kind, entity_id), None)
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
@@ -0,0 +1,187 @@
+"""In-memory entity cache shared by all sessions and tools, with copy-on-write snapshots."""
+
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from fakturoid_mcp.records import Record, compact
+
+
+class Snapshot:
+    """Frozen view of the entity cache for a multi-call analysis.
+
+    Nothing is copied when the snapshot is taken. Before the cache replaces or
+    drops an entity, it hands the old record to every open snapshot that has
+    not kept its own version yet, so a snapshot holds only what changed since
+    it was taken (plus entities it had to load). Cache entries that were
+    already older than the cache TTL when the snapshot was taken count as
+    missing, so they are loaded fresh; after that, reads ignore the TTL.
+    Each entity is frozen as first seen by the snapshot, and each list as
+    returned by its first call with the same filters.
+    """
+
+    def __init__(self, cache: "EntityCache", ttl: float):
+        self.id = uuid.uuid4().hex
+        self.cache = cache
+        self.ttl = ttl
+        self.created_at = datetime.now(UTC)
+        self.expires = time.monotonic() + ttl
+        self.fresh_after = time.monotonic() - cache.ttl
+        """Cache entries stored before this (monotonic) time were stale at the start."""
+        self.entries: dict[tuple[str, int], Record] = {}
+        self.lists: dict[tuple[str, str], list[int]] = {}
+        self.loaded = 0
+
+    def get(self, kind: str, entity_id: int) -> Record | None:
+        """Return the snapshot's version of an entity without loading it, or None."""
+        with self.cache._lock:
+            record = self.entries.get((kind, entity_id))
+            if record is None:
+                entry = self.cache._entries.get(kind, {}).get(entity_id)
+                if entry is not None and entry[1] >= self.fresh_after:
+                    record = entry[0]
+        return record
+
+    def pin(self, kind: str, record: Record) -> Record:
+        """Freeze a record loaded for this snapshot; returns the version the snapshot keeps."""
+        with self.cache._lock:
+            self.loaded += 1
+            return self.entries.setdefault((kind, record.get("id")), record)
+
+    def load(self, kind: str, entity_id: int, load: Callable[[int], object]) -> Record:
+        """Return the snapshot's version of an entity, loading (and freezing) it if unknown."""
+        record = self.get(kind, entity_id)
+        if record is None:
+            record = self.pin(kind, self.cache.put(kind, load(entity_id)))
+        return record
+
+    def to_dict(self) -> dict:
+        return {
+            "snapshot_id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "expires_in": round(max(self.expires - time.monotonic(), 0.0), 1),
+            "kept_entities": len(self.entries),
+            "loaded_entities": self.loaded,
+            "lists": len(self.lists),
+        }
+
+
+class EntityCache:
+    """Thread-safe TTL cache of compact records keyed by entity kind and ID.
+
+    Kinds are plain strings ("invoice", "subject", ...). Entries older than
+    ``ttl`` seconds are treated as missing.
+    """
+
+    def __init__(self, ttl: float, snapshot_ttl: float = 900.0):
+        self.ttl = ttl
+        self.snapshot_ttl = snapshot_ttl
+        self._entries: dict[str, dict[int, tuple[Record, float]]] = {}
+        self._snapshots: dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, entity_id: int) -> Record | None:
+        """Return a fresh cached record, or None."""
+        entry = self._entries.get(kind, {}).get(entity_id)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def get_stale(self, kind: str, entity_id: int) -> tuple[Record, float] | None:
+        """Return ``(record, age in seconds)`` regardless of TTL, or None.
+
+        Expired entries are kept until replaced so they can be served while
+        Fakturoid is unreachable.
+        """
+        entry = self._entries.get(kind, {}).get(entity_id)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def stale_values(self, kind: str) -> list[tuple[Record, float]]:
+        """Return ``(record, age)`` for every cached entity of ``kind``, regardless of TTL."""
+        now = time.monotonic()
+        return [
+            (record, now - stored) for record, stored in list(self._entries.get(kind, {}).values())
+        ]
+
+    def put(self, kind: str, obj) -> Record:
+        """Store a model (or record) under its ``id`` and return the record."""
+        record = compact(obj)
+        entity_id = record.get("id")
+        if entity_id is not None:
+            with self._lock:
+                if self._snapshots:
+                    self._preserve(kind, (entity_id,))
+                self._entries.setdefault(kind, {})[entity_id] = (record, time.monotonic())
+        return record
+
+    def put_many(self, kind: str, objs) -> list[Record]:
+        return [self.put(kind, obj) for obj in objs]
+
+    def replace(self, kind: str, objs) -> list[Record]:
+        """Replace every entity of ``kind`` with ``objs`` (a full refresh)."""
+        records = [compact(obj) for obj in objs]
+        now = time.monotonic()
+        entries = {r.get("id"): (r, now) for r in records if r.get("id") is not None}
+        with self._lock:
+            if self._snapshots:
+                self._preserve(kind, list(self._entries.get(kind, ())))
+            self._entries[kind] = entries
+        return records
+
+    def invalidate(self, kind: str, entity_id: int | None = None) -> None:
+        """Drop one entity, or every entity of ``kind`` when ``entity_id`` is None."""
+        with self._lock:
+            if self._snapshots:
+                ids = list(self._entries.get(kind, ())) if entity_id is None else (entity_id,)
+                self._preserve(kind, ids)
+            if entity_id is None:
+                self._entries.pop(kind, None)
+            else:
+                self._entries.get(kind, {}).pop(entity_id, None)
+
+    def _preserve(self, kind: str, ids) -> None:
+        """Hand current records about to change to open snapshots (call with the lock held)."""
+        now = time.monotonic()
+        entries = self._entries.get(kind, {})
+        for snapshot_id, snapshot in list(self._snapshots.items()):
+            if now > snapshot.expires:
+                del self._snapshots[snapshot_id]
+                continue
+            for entity_id in ids:
+                entry = entries.get(entity_id)
+                if entry is not None and entry[1] >= snapshot.fresh_after:
+                    snapshot.entries.setdefault((kind, entity_id), entry[0])
+
+    def begin_snapshot(self) -> Snapshot:
+        """Open a snapshot of the current cache contents (see ``Snapshot``)."""
+        snapshot = Snapshot(self, self.snapshot_ttl)
+        now = time.monotonic()
+        with self._lock:
+            for expired in [i for i, s in self._snapshots.items() if now > s.expires]:
+                del self._snapshots[expired]
+            self._snapshots[snapshot.id] = snapshot
+        return snapshot
+
+    def snapshot(self, snapshot_id: str) -> Snapshot:
+        """Return an open snapshot, extending its expiry; raises ValueError if unknown."""
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_id)
+            if snapshot is not None and time.monotonic() > snapshot.expires:
+                del self._snapshots[snapshot_id]
+                snapshot = None
+        if snapshot is None:
+            raise ValueError(f"Unknown or expired snapshot: {snapshot_id}")
+        snapshot.expires = time.monotonic() + snapshot.ttl
+        return snapshot
+
+    def end_snapshot(self, snapshot_id: str) -> Snapshot:
+        """Close a snapshot and release what it kept; raises ValueError if unknown."""
+        with self._lock:
+            snapshot = self._snapshots.pop(snapshot_id, None)
+        if snapshot is None:
+            raise ValueError(f"Unknown or expired snapshot: {snapshot_id}")
+        return snapshot
@@ -26,6 +26,103 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", description="HTTP server host")
     port: int = Field(default=8000, description="HTTP server port")
 
+    text_fallback: bool = Field(
+        default=False,
+        description="Repeat tool results as JSON text for clients without structured output",
+    )
+
+    cache_ttl: float = Field(default=300.0, description="Entity cache TTL in seconds")
+    snapshot_ttl: float = Field(
+        default=900.0, description="Seconds an unused snapshot stays open (see begin_snapshot)"
+    )
+    metadata_ttl: float = Field(
+        default=86400.0, description="Account metadata (account, bank accounts) TTL in seconds"
+    )
+    max_concurrency: int = Field(
+        default=8, description="Maximum concurrent Fakturoid API requests per batch tool call"
+    )
+    rate_limit: int = Field(
+        default=400,
+        description="Maximum Fakturoid API requests per minute for bulk operations (0 = unlimited)",
+    )
+
+    vat_rates: list[float] = Field(
+        default=[0, 12, 21],
+        description="Standard VAT rates; other rates on issued documents produce a warning",
+    )
+
+    breaker_failure_threshold: int = Field(
+        default=5, description="Consecutive API failures or slow calls that open the circuit"
+    )
+    breaker_latency_threshold: float = Field(
+        default=10.0, description="API calls slower than this many seconds count as failures"
+    )
+    breaker_reset_timeout: float = Field(
+        default=30.0, description="Seconds the circuit stays open before a trial call"
+    )
+
+    job_workers: int = Field(default=4, description="Worker threads for background jobs")
+    job_retention: float = Field(
+        default=3600.0, description="Seconds to keep finished background jobs and their results"
+    )
+
+    write_queue_path: str = Field(
+        default="write_queue.sqlite3", description="SQLite database of queued document writes"
+    )
+    write_workers: int = Field(
+        default=2, description="Worker threads draining queued writes to Fakturoid"
+    )
+    write_retention: float = Field(
+        default=604800.0,
+        description="Seconds to keep finished writes; their idempotency keys expire with them",
+    )
+    payment_ledger_path: str = Field(
+        default="payments.sqlite3",
+        description="SQLite database of payments recorded by reconcile_payments",
+    )
+
+    search_sync_interval: float = Field(
+        default=60.0,
+        description="Seconds before search_documents re-syncs its index with Fakturoid",
+    )
+    search_rebuild_interval: float = Field(
+        default=3600.0,
+        description="Seconds between full re-syncs that drop deleted documents (0 disables)",
+    )
+
+    export_dir: str = Field(default="exports", description="Directory for exported files")
+    pdf_cache_dir: str = Field(default="pdf_cache", description="Invoice PDF cache directory")
+    pdf_poll_timeout: float = Field(
+        default=60.0, description="Seconds to wait for Fakturoid to generate a PDF"
+    )
+
+    upload_dir: str = Field(
+        default="uploads", description="Content-addressed store of attachment uploads"
+    )
+    upload_token: SecretStr | None = Field(
+        default=None,
+        description="Bearer token for POST /uploads (unset disables the endpoint)",
+    )
+    upload_max_bytes: int = Field(
+        default=50 * 1024 * 1024, description="Largest accepted POST /uploads body in bytes"
+    )
+    attachment_dir: str | None = Field(
+        default=None,
+        description="Directory local attachment paths must be inside (unset: upload IDs only)",
+    )
+
+    admin_token: SecretStr | None = Field(
+        default=None,
+        description="Bearer token for the /admin HTTP endpoints (unset disables them)",
+    )
+    profile_dir: str = Field(default="profiles", description="Directory for saved profiles")
+
+    warmup_enabled: bool = Field(default=True, description="Prefetch hot data in the background")
+    warmup_refresh_interval: float = Field(
+        default=240.0,
+        description="Seconds between background refreshes of hot data (0 disables refresh)",
+    )
+
     model_config = SettingsConfigDict(
         env_prefix="FAKTUROID_",
         env_file=".env",
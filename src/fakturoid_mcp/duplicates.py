@@ -0,0 +1,178 @@
+"""Duplicate expense detection with a blocking index.
+
+Comparing every pair of expenses is quadratic, so each expense is filed under
+a few blocking keys instead (same supplier and original document number, same
+supplier and variable symbol, same supplier, currency and amount within a date
+window). Only expenses sharing a key are compared, which keeps candidate
+generation near-linear in the number of expenses.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from fakturoid_mcp.reconcile import normalize_symbol
+from fakturoid_mcp.records import Record
+
+WEIGHTS = {
+    "original_number": 0.5,
+    "variable_symbol": 0.4,
+    "amount": 0.4,
+    "issued_on": 0.2,
+}
+"""Score contributed by each matching signal; pair scores are capped at 1."""
+
+
+def _issued_ordinal(record: Record) -> int | None:
+    value = record.get("issued_on")
+    if value is None:
+        return None
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return value.toordinal()
+
+
+def _normalize_number(value) -> str | None:
+    if not value:
+        return None
+    folded = "".join(c for c in str(value).casefold() if c.isalnum())
+    return folded or None
+
+
+class _Entry:
+    __slots__ = ("record", "subject_id", "currency", "amount", "issued", "symbol", "original")
+
+    def __init__(self, record: Record):
+        self.record = record
+        self.subject_id = record.get("subject_id")
+        self.currency = record.get("currency")
+        self.amount = record.units("total")
+        self.issued = _issued_ordinal(record)
+        self.symbol = normalize_symbol(record.get("variable_symbol"))
+        self.original = _normalize_number(record.get("original_number"))
+
+
+class ExpenseIndex:
+    """Blocking index over expenses for finding likely duplicates.
+
+    ``date_window`` is the largest difference in issue dates (days) for two
+    expenses with the same amount to count as a match. Pairs scoring at least
+    ``min_score`` (see ``WEIGHTS``) are reported.
+    """
+
+    def __init__(self, date_window: int = 7, min_score: float = 0.5):
+        self.date_window = max(date_window, 0)
+        self.min_score = min_score
+        self._entries: list[_Entry] = []
+        self._blocks: dict[tuple, list[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, entry: _Entry) -> list[tuple]:
+        keys = []
+        if entry.original:
+            keys.append(("original_number", entry.subject_id, entry.original))
+        if entry.symbol:
+            keys.append(("variable_symbol", entry.subject_id, entry.symbol))
+        if entry.amount and entry.issued is not None:
+            window = self.date_window + 1
+            keys.append(
+                ("amount", entry.subject_id, entry.currency, entry.amount, entry.issued // window)
+            )
+        return keys
+
+    def add(self, record: Record) -> None:
+        entry = _Entry(record)
+        n = len(self._entries)
+        self._entries.append(entry)
+        for key in self._keys(entry):
+            self._blocks[key].append(n)
+
+    def _candidates(self, entry: _Entry) -> set[int]:
+        found = set()
+        for key in self._keys(entry):
+            if key[0] == "amount":
+                # Issue dates within the window fall into this or a neighbouring bucket.
+                for bucket in (key[-1] - 1, key[-1], key[-1] + 1):
+                    found.update(self._blocks.get((*key[:-1], bucket), ()))
+            else:
+                found.update(self._blocks.get(key, ()))
+        return found
+
+    def _score(self, a: _Entry, b: _Entry) -> tuple[float, list[str]]:
+        reasons = []
+        if a.original and a.original == b.original:
+            reasons.append("original_number")
+        if a.symbol and a.symbol == b.symbol:
+            reasons.append("variable_symbol")
+        days = None
+        if a.issued is not None and b.issued is not None:
+            days = abs(a.issued - b.issued)
+        close = days is not None and days <= self.date_window
+        # Recurring bills repeat the amount, so it only counts for nearby issue dates.
+        if a.amount and a.amount == b.amount and a.currency == b.currency and close:
+            reasons.append("amount")
+        score = sum(WEIGHTS[reason] for reason in reasons)
+        if close:
+            reasons.append("issued_on")
+            score += WEIGHTS["issued_on"] * (1 - days / (self.date_window + 1))
+        return min(round(score, 2), 1.0), reasons
+
+    def check(self, record: Record) -> list[dict]:
+        """Return indexed expenses that are likely duplicates of ``record``, best first."""
+        entry = _Entry(record)
+        matches = []
+        for n in self._candidates(entry):
+            other = self._entries[n]
+            if other.record.get("id") is not None and other.record.get("id") == record.get("id"):
+                continue
+            score, reasons = self._score(entry, other)
+            if score >= self.min_score:
+                matches.append({"id": other.record.get("id"), "score": score, "reasons": reasons})
+        matches.sort(key=lambda m: (-m["score"], m["id"] or 0))
+        return matches
+
+    def groups(self) -> list[dict]:
+        """Group all indexed expenses into clusters of likely duplicates.
+
+        Returns one entry per cluster with its member IDs and the matching
+        pairs (with score and reasons), highest-scoring clusters first.
+        """
+        parent = list(range(len(self._entries)))
+
+        def find(n: int) -> int:
+            while parent[n] != n:
+                parent[n] = parent[parent[n]]
+                n = parent[n]
+            return n
+
+        pairs = []
+        for n, entry in enumerate(self._entries):
+            for m in self._candidates(entry):
+                if m <= n:
+                    continue
+                score, reasons = self._score(entry, self._entries[m])
+                if score >= self.min_score:
+                    pairs.append((n, m, score, reasons))
+                    parent[find(m)] = find(n)
+
+        clusters: dict[int, dict] = {}
+        for n, m, score, reasons in pairs:
+            cluster = clusters.setdefault(find(n), {"ids": set(), "pairs": [], "score": 0.0})
+            cluster["ids"].update(
+                (self._entries[n].record.get("id"), self._entries[m].record.get("id"))
+            )
+            cluster["pairs"].append(
+                {
+                    "ids": [self._entries[n].record.get("id"), self._entries[m].record.get("id")],
+                    "score": score,
+                    "reasons": reasons,
+                }
+            )
+            cluster["score"] = max(cluster["score"], score)
+        result = [
+            {"ids": sorted(c["ids"]), "score": c["score"], "pairs": c["pairs"]}
+            for c in clusters.values()
+        ]
+        result.sort(key=lambda c: (-c["score"], c["ids"]))
+        return result
@@ -0,0 +1,214 @@
+"""Streaming export of documents to NDJSON, CSV and Parquet files."""
+
+import csv
+import hashlib
+import json
+from collections.abc import Iterable
+from pathlib import Path
+
+FORMATS = ("ndjson", "csv", "parquet")
+
+
+def split_lines(document: dict) -> tuple[dict, list[dict]]:
+    """Split a serialized document into its header row and child line rows."""
+    header = {key: value for key, value in document.items() if key != "lines"}
+    lines = [
+        {"document_id": document.get("id"), "position": position, **line}
+        for position, line in enumerate(document.get("lines") or [], start=1)
+    ]
+    return header, lines
+
+
+def _flat(value):
+    """Encode nested values as JSON for tabular formats."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+class NdjsonWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows = 0
+        self._file = path.open("w", encoding="utf-8")
+
+    def write(self, rows: list[dict]) -> None:
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False, default=str))
+            self._file.write("\n")
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CsvWriter:
+    """CSV writer whose columns are fixed by the first non-empty batch.
+
+    Fields first seen in later batches are collected into an ``extra`` JSON column.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows = 0
+        self._file = path.open("w", encoding="utf-8", newline="")
+        self._writer: csv.DictWriter | None = None
+        self._columns: list[str] = []
+
+    def write(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            self._columns = list(dict.fromkeys(key for row in rows for key in row))
+            self._writer = csv.DictWriter(self._file, fieldnames=[*self._columns, "extra"])
+            self._writer.writeheader()
+        known = set(self._columns)
+        for row in rows:
+            out = {key: _flat(row.get(key)) for key in self._columns}
+            extra = {key: value for key, value in row.items() if key not in known}
+            out["extra"] = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+            self._writer.writerow(out)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """Parquet writer emitting one row group per batch (requires pyarrow).
+
+    Like ``CsvWriter``, columns are fixed by the first non-empty batch and
+    fields first seen later go to an ``extra`` JSON column. Column types are
+    inferred from that batch: columns that are null there (or mix types) are
+    stored as strings, nested values as JSON strings. A later value that does
+    not fit its column is stored as a string in string columns, else moved to
+    ``extra``, so no batch is rejected.
+    """
+
+    def __init__(self, path: Path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError(
+                "Parquet export requires pyarrow; install fakturoid-mcp[parquet]"
+            ) from e
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._columns: list[str] = []
+
+    def _infer(self, values: list):
+        pa = self._pa
+        try:
+            inferred = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.string()
+        return pa.string() if pa.types.is_null(inferred) else inferred
+
+    def _column(self, field, values: list, extras: list[dict]):
+        """Build the column for ``field``, coercing or moving aside values that do not fit."""
+        pa = self._pa
+        try:
+            return pa.array(values, type=field.type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        if pa.types.is_string(field.type):
+            return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        fitted = []
+        for value, extra in zip(values, extras):
+            try:
+                fitted.append(pa.scalar(value, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                extra[field.name] = value
+                fitted.append(pa.scalar(None, type=field.type))
+        return pa.array(fitted, type=field.type)
+
+    def write(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        pa = self._pa
+        rows = [{key: _flat(value) for key, value in row.items()} for row in rows]
+        if self._schema is None:
+            self._columns = list(dict.fromkeys(key for row in rows for key in row))
+            fields = [
+                pa.field(name, self._infer([row.get(name) for row in rows]))
+                for name in self._columns
+            ]
+            self._schema = pa.schema([*fields, pa.field("extra", pa.string())])
+            self._writer = self._pq.ParquetWriter(self.path, self._schema)
+        known = set(self._columns)
+        extras = [{key: value for key, value in row.items() if key not in known} for row in rows]
+        arrays = [
+            self._column(self._schema.field(name), [row.get(name) for row in rows], extras)
+            for name in self._columns
+        ]
+        arrays.append(
+            pa.array(
+                [json.dumps(e, ensure_ascii=False, default=str) if e else None for e in extras],
+                type=pa.string(),
+            )
+        )
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            # No rows: still produce a valid (empty) file.
+            self._pq.write_table(self._pa.table({}), self.path)
+
+
+WRITERS = {"ndjson": NdjsonWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_documents(batches: Iterable[list[dict]], dest_dir: Path, basename: str, fmt: str) -> dict:
+    """Stream batches of serialized documents to a document file and a line file.
+
+    Only one batch is held in memory at a time. Returns paths, row counts and
+    SHA-256 checksums of the written files.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}. Supported: {', '.join(FORMATS)}")
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    writer_cls = WRITERS[fmt]
+    documents = writer_cls(dest_dir / f"{basename}.{fmt}")
+    lines = writer_cls(dest_dir / f"{basename}_lines.{fmt}")
+    try:
+        for batch in batches:
+            headers, children = [], []
+            for document in batch:
+                header, document_lines = split_lines(document)
+                headers.append(header)
+                children.extend(document_lines)
+            documents.write(headers)
+            lines.write(children)
+    finally:
+        documents.close()
+        lines.close()
+
+    return {
+        "format": fmt,
+        "files": [
+            {
+                "table": table,
+                "path": str(writer.path.resolve()),
+                "rows": writer.rows,
+                "bytes": writer.path.stat().st_size,
+                "sha256": file_sha256(writer.path),
+            }
+            for table, writer in (("documents", documents), ("lines", lines))
+        ],
+    }
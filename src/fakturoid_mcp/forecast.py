@@ -0,0 +1,168 @@
+"""Cash-flow forecast from recurring generators and open documents.
+
+Every expected payment is reduced to a flow (date ordinal, currency, signed
+amount in hundredths) held in flat ``array`` columns, so hundreds of generators
+expanded over a long horizon stay cheap. Amounts come from ``Record.units``
+without building Decimals, and flows are bucketed by integer arithmetic on the
+date ordinals.
+"""
+
+import calendar
+from array import array
+from datetime import date, timedelta
+
+from fakturoid_mcp.records import Record
+
+GRANULARITIES = ("week", "month")
+
+DEFAULT_DUE_DAYS = 14
+"""Due days for generators that set none and accounts without a default."""
+
+
+def add_months(day: date, months: int, last_day: bool = False) -> date:
+    """Shift ``day`` by whole months, clamping to the end of shorter months."""
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    days_in_month = calendar.monthrange(year, month)[1]
+    return date(year, month, days_in_month if last_day else min(day.day, days_in_month))
+
+
+def format_units(units: int) -> str:
+    """Format integer hundredths as a decimal string (``-1234`` -> ``"-12.34"``)."""
+    sign = "-" if units < 0 else ""
+    whole, cents = divmod(abs(units), 100)
+    return f"{sign}{whole}.{cents:02d}"
+
+
+def _as_date(value) -> date | None:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class CashflowForecast:
+    """Accumulates expected payments and buckets them by week or month per currency.
+
+    Inflows are positive, outflows negative. Payments expected before ``start``
+    (overdue documents) are reported separately instead of in the buckets.
+    """
+
+    def __init__(self, start: date, horizon_months: int, granularity: str = "month"):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        if horizon_months < 1:
+            raise ValueError("horizon_months must be at least 1")
+        self.start = start
+        self.end = add_months(start, horizon_months)
+        self.granularity = granularity
+        self.ordinals = array("q")
+        self.amounts = array("q")
+        self.currencies: list[str] = []
+        self.sources = {"generators": 0, "occurrences": 0, "invoices": 0, "expenses": 0}
+
+    def add(self, day: date, currency: str, units: int) -> None:
+        if units and day < self.end:
+            self.ordinals.append(day.toordinal())
+            self.amounts.append(units)
+            self.currencies.append(currency)
+
+    def add_generator(self, generator: Record, default_currency: str, default_due: int) -> None:
+        """Expand a recurring generator's schedule into expected inflows."""
+        if generator.get("active") is False:
+            return
+        occurrence = _as_date(generator.get("next_occurrence_on") or generator.get("start_date"))
+        total = generator.units("total")
+        if occurrence is None or not total:
+            return
+        period = generator.get("months_period") or 1
+        end = _as_date(generator.get("end_date"))
+        due = generator.get("due")
+        due = timedelta(days=default_due if due is None else due)
+        last_day = bool(generator.get("last_day_in_month"))
+        currency = generator.get("currency") or default_currency
+        self.sources["generators"] += 1
+        first, n = occurrence, 0
+        while occurrence < self.end and (end is None or occurrence <= end):
+            self.add(occurrence + due, currency, total)
+            self.sources["occurrences"] += 1
+            n += 1
+            occurrence = add_months(first, n * period, last_day)
+
+    def add_document(self, document: Record, default_currency: str, outflow: bool) -> None:
+        """Add an open invoice (inflow) or expense (outflow) at its due date."""
+        units = document.units("remaining_amount")
+        if units is None:
+            units = document.units("total") or 0
+        day = _as_date(document.get("due_on") or document.get("issued_on")) or self.start
+        currency = document.get("currency") or default_currency
+        self.add(day, currency, -units if outflow else units)
+        self.sources["expenses" if outflow else "invoices"] += 1
+
+    def _bucket_starts(self) -> list[date]:
+        if self.granularity == "week":
+            first = self.start - timedelta(days=self.start.weekday())
+            count = (self.end.toordinal() - first.toordinal() + 6) // 7
+            return [first + timedelta(weeks=i) for i in range(count)]
+        first = self.start.replace(day=1)
+        count = (self.end.year - first.year) * 12 + self.end.month - first.month
+        count += 1 if self.end.day > 1 else 0
+        return [add_months(first, i) for i in range(count)]
+
+    def result(self) -> dict:
+        starts = self._bucket_starts()
+        start_ordinal = self.start.toordinal()
+        first_ordinal = starts[0].toordinal()
+        first_month = starts[0].year * 12 + starts[0].month - 1
+        weekly = self.granularity == "week"
+        # currency -> [inflow per bucket, outflow per bucket, overdue inflow, overdue outflow]
+        totals: dict[str, list] = {}
+        for ordinal, units, currency in zip(self.ordinals, self.amounts, self.currencies):
+            sums = totals.get(currency)
+            if sums is None:
+                sums = totals[currency] = [[0] * len(starts), [0] * len(starts), 0, 0]
+            if ordinal < start_ordinal:
+                sums[2 if units > 0 else 3] += units
+                continue
+            if weekly:
+                i = (ordinal - first_ordinal) // 7
+            else:
+                day = date.fromordinal(ordinal)
+                i = day.year * 12 + day.month - 1 - first_month
+            sums[0 if units > 0 else 1][i] += units
+
+        currencies = {}
+        for currency, (inflows, outflows, overdue_in, overdue_out) in sorted(totals.items()):
+            buckets = []
+            cumulative = 0
+            for i, bucket_start in enumerate(starts):
+                net = inflows[i] + outflows[i]
+                cumulative += net
+                bucket_end = starts[i + 1] if i + 1 < len(starts) else self.end
+                buckets.append(
+                    {
+                        "start": max(bucket_start, self.start).isoformat(),
+                        "end": (min(bucket_end, self.end) - timedelta(days=1)).isoformat(),
+                        "inflow": format_units(inflows[i]),
+                        "outflow": format_units(outflows[i]),
+                        "net": format_units(net),
+                        "cumulative": format_units(cumulative),
+                    }
+                )
+            currencies[currency] = {
+                "inflow": format_units(sum(inflows)),
+                "outflow": format_units(sum(outflows)),
+                "net": format_units(cumulative),
+                "overdue": {
+                    "inflow": format_units(overdue_in),
+                    "outflow": format_units(overdue_out),
+                },
+                "buckets": buckets,
+            }
+        return {
+            "start": self.start.isoformat(),
+            "end": (self.end - timedelta(days=1)).isoformat(),
+            "granularity": self.granularity,
+            "currencies": currencies,
+            "sources": self.sources,
+        }
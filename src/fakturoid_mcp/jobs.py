@@ -0,0 +1,154 @@
+"""Background jobs for long-running tool operations."""
+
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import UTC, datetime
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job function when the job has been cancelled."""
+
+
+class Job:
+    """A unit of work running on the job manager's worker pool.
+
+    Job functions receive the job and should call ``report()`` as they make
+    progress and ``check_cancelled()`` between upstream requests, so that
+    cancelling a job actually stops further API calls.
+    """
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.state = PENDING
+        self.progress = 0.0
+        self.total: float | None = None
+        self.message: str | None = None
+        self.result = None
+        self.error: str | None = None
+        self.created_at = datetime.now(UTC)
+        self.finished_at: datetime | None = None
+        self.future: Future | None = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelledError(f"Job {self.id} was cancelled")
+
+    def report(self, progress: float, total: float | None = None, message: str | None = None):
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the job finishes; returns False on timeout."""
+        return self._finished.wait(timeout)
+
+    def to_dict(self, include_result: bool = False) -> dict:
+        data = {
+            "job_id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps finished jobs for ``retention`` seconds."""
+
+    def __init__(self, max_workers: int, retention: float):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, func: Callable[[Job], object]) -> Job:
+        """Queue ``func(job)`` and return the job immediately."""
+        self._prune()
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        return job
+
+    def list(self) -> list[Job]:
+        self._prune()
+        return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> Job:
+        """Request cancellation.
+
+        A pending job never starts; a running one stops at its next ``check_cancelled()``.
+        """
+        job = self.get(job_id)
+        if job.state in FINISHED_STATES:
+            return job
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], object]) -> None:
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+            return
+        job.state = RUNNING
+        try:
+            job.result = func(job)
+            self._finish(job, DONE)
+        except JobCancelledError:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job.id, job.name, e)
+            job.error = str(e)
+            self._finish(job, FAILED)
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished_at = datetime.now(UTC)
+        job._finished.set()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at.timestamp() < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
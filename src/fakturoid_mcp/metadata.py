@@ -0,0 +1,58 @@
+"""Long-lived cache of account metadata and reference data."""
+
+import threading
+import time
+from collections.abc import Callable
+
+from fakturoid import Fakturoid
+
+from fakturoid_mcp.records import Record, compact
+
+
+class MetadataCache:
+    """Memoizes account-level data that rarely changes (account, bank accounts).
+
+    Shared by all sessions and tools. Values are kept for ``ttl`` seconds and can
+    be reloaded explicitly with ``refresh=True``. Concurrent misses for the same
+    entry wait for a single upstream request instead of each issuing their own.
+    """
+
+    def __init__(self, client: Fakturoid, ttl: float):
+        self.client = client
+        self.ttl = ttl
+        self._loaders: dict[str, Callable[[], object]] = {
+            "account": lambda: compact(client.account()),
+            "bank_accounts": lambda: [compact(a) for a in client.bank_accounts()],
+        }
+        self._values: dict[str, tuple[object, float]] = {}
+        self._locks = {name: threading.Lock() for name in self._loaders}
+
+    def get(self, name: str, refresh: bool = False):
+        requested = time.monotonic()
+        entry = self._values.get(name)
+        if not refresh and self._is_fresh(entry):
+            return entry[0]
+        with self._locks[name]:
+            entry = self._values.get(name)
+            # Another caller may have loaded it while we waited for the lock.
+            if self._is_fresh(entry) and (not refresh or entry[1] >= requested):
+                return entry[0]
+            value = self._loaders[name]()
+            self._values[name] = (value, time.monotonic())
+            return value
+
+    def peek(self, name: str) -> tuple[object, float] | None:
+        """Return the stored ``(value, age in seconds)`` regardless of TTL, or None."""
+        entry = self._values.get(name)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def _is_fresh(self, entry: tuple | None) -> bool:
+        return entry is not None and time.monotonic() - entry[1] <= self.ttl
+
+    def account(self, refresh: bool = False) -> Record:
+        return self.get("account", refresh)
+
+    def bank_accounts(self, refresh: bool = False) -> list[Record]:
+        return self.get("bank_accounts", refresh)
@@ -0,0 +1,138 @@
+"""Content-addressed on-disk cache of invoice PDFs."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from fakturoid_mcp.api import ApiSession
+
+CHUNK_SIZE = 64 * 1024
+
+
+class PdfNotReadyError(Exception):
+    """Fakturoid did not finish generating the PDF within the polling timeout."""
+
+
+class PdfCache:
+    """Stores invoice PDFs by SHA-256 of their content.
+
+    ``index.json`` maps each invoice ID to the ``updated_at`` it was downloaded
+    for and the digest of the file, so a PDF is downloaded again only after the
+    invoice changes. Identical PDFs share one blob. ``fetch`` updates the index
+    in memory; ``save_index`` writes it once a batch is done.
+    """
+
+    def __init__(
+        self, api: ApiSession, root: Path, poll_timeout: float, poll_interval: float = 1.0
+    ):
+        self.api = api
+        self.root = root
+        self.poll_timeout = poll_timeout
+        self.poll_interval = poll_interval
+        self._index_path = root / "index.json"
+        self._index: dict[str, dict] | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self._index_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._index = {}
+        return self._index
+
+    def save_index(self) -> None:
+        """Write index changes made by ``fetch`` to disk, if there are any."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self._index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._index), encoding="utf-8")
+            os.replace(tmp, self._index_path)
+            self._dirty = False
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / f"{digest}.pdf"
+
+    def lookup(self, invoice_id: int, updated_at: str | None) -> Path | None:
+        """Return the cached PDF for this version of the invoice, if any."""
+        with self._lock:
+            entry = self._load_index().get(str(invoice_id))
+        if entry is None or updated_at is None or entry["updated_at"] != updated_at:
+            return None
+        path = self.blob_path(entry["sha256"])
+        return path if path.exists() else None
+
+    def fetch(self, invoice_id: int, updated_at: str | None) -> tuple[Path, bool]:
+        """Return ``(blob path, downloaded)``, downloading only if the invoice changed.
+
+        The index entry is updated in memory; call ``save_index`` to persist it.
+        """
+        path = self.lookup(invoice_id, updated_at)
+        if path is not None:
+            return path, False
+        digest = self._download(invoice_id)
+        with self._lock:
+            self._load_index()[str(invoice_id)] = {"updated_at": updated_at, "sha256": digest}
+            self._dirty = True
+        return self.blob_path(digest), True
+
+    def _download(self, invoice_id: int) -> str:
+        """Stream the PDF into the blob store and return its digest.
+
+        Fakturoid answers 204 while the PDF is still being generated; the
+        request is repeated until it is ready or ``poll_timeout`` expires.
+        """
+        deadline = time.monotonic() + self.poll_timeout
+        while True:
+            r = self.api.request("GET", f"invoices/{invoice_id}/download.pdf", stream=True)
+            if r.status_code != 204:
+                break
+            r.close()
+            if time.monotonic() >= deadline:
+                raise PdfNotReadyError(f"PDF for invoice {invoice_id} is not ready yet")
+            time.sleep(self.poll_interval)
+
+        blobs = self.root / "blobs"
+        blobs.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=blobs, suffix=".part")
+        try:
+            with r, os.fdopen(fd, "wb") as f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+            path = self.blob_path(digest.hexdigest())
+            path.parent.mkdir(exist_ok=True)
+            if path.exists():
+                # Same content is already stored (and maybe linked from archives).
+                os.unlink(tmp_name)
+            else:
+                os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return digest.hexdigest()
+
+
+def place(blob: Path, dest: Path) -> bool:
+    """Make ``dest`` a copy of ``blob``; returns False if it already was one.
+
+    Hard links are used where possible so archives do not duplicate cache data.
+    """
+    if dest.exists():
+        if dest.samefile(blob):
+            return False
+        dest.unlink()
+    try:
+        os.link(blob, dest)
+    except OSError:
+        shutil.copyfile(blob, dest)
+    return True
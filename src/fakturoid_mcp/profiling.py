@@ -0,0 +1,335 @@
+"""On-demand sampling profiler for a live server.
+
+A profile samples the Python stacks of all threads with ``sys._current_frames``
+for a time window, or only the stacks working on one tool until it has been
+called a given number of times. Each sample is weighted by the wall-clock time
+since the previous one and attributed to a layer (upstream HTTP, rate limiting,
+``model_to_dict``, ``json_response``, MCP transport, tool code) by its innermost
+recognizable frame. Stacks are also aggregated in the collapsed format read by
+flamegraph.pl, speedscope and similar tools.
+
+Work a profiled tool hands to its own thread pools is attributed to it when
+the task is wrapped with ``traced_worker``.
+
+Nothing runs while no profile is active: the tool call hook is a single
+attribute comparison and the sampler thread only exists during a profile.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from pathlib import Path
+from types import CodeType, FrameType
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+DONE = "done"
+
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 600.0
+"""Upper bound on a profile's length; tool profiles stop then even if calls are missing."""
+
+_HTTP_PATHS = (f"{os.sep}requests{os.sep}", f"{os.sep}urllib3{os.sep}")
+_HTTP_FILES = ("socket.py", "ssl.py", f"http{os.sep}client.py")
+_TRANSPORT_PATHS = tuple(
+    f"{os.sep}{package}{os.sep}"
+    for package in (
+        "mcp",
+        "starlette",
+        "sse_starlette",
+        "uvicorn",
+        "h11",
+        "pydantic",
+        "pydantic_core",
+        "jsonschema",
+    )
+)
+_TOOL_PATHS = (f"{os.sep}fakturoid_mcp{os.sep}", f"{os.sep}fakturoid{os.sep}")
+
+# Innermost frames of threads waiting for work (event loop, worker pools, write queue,
+# revalidator).
+_IDLE = {
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("breaker.py", "_run"),
+}
+_IDLE_CALLERS = {("writequeue.py", "_work")}
+
+
+def _layer(code: CodeType) -> str | None:
+    path, name = code.co_filename, code.co_name
+    if path.endswith(_HTTP_FILES) or any(p in path for p in _HTTP_PATHS):
+        return "upstream_http"
+    if path.endswith("ratelimit.py") and f"{os.sep}fakturoid_mcp{os.sep}" in path:
+        return "rate_limit"
+    if name in ("model_to_dict", "_convert_value") or (
+        name == "to_dict" and path.endswith("records.py")
+    ):
+        return "model_to_dict"
+    if name == "json_response":
+        return "json_response"
+    if any(p in path for p in _TRANSPORT_PATHS):
+        return "transport"
+    if any(p in path for p in _TOOL_PATHS):
+        return "tool"
+    return None
+
+
+class _Frames:
+    """Per-code-object labels and layers, computed once."""
+
+    def __init__(self):
+        self._info: dict[CodeType, tuple[str, str | None, tuple[str, str]]] = {}
+
+    def info(self, code: CodeType) -> tuple[str, str | None, tuple[str, str]]:
+        info = self._info.get(code)
+        if info is None:
+            basename = os.path.basename(code.co_filename)
+            label = f"{code.co_qualname} ({basename})".replace(";", ":")
+            info = self._info[code] = (label, _layer(code), (basename, code.co_name))
+        return info
+
+
+_traced_tool: ContextVar[str | None] = ContextVar("traced_tool", default=None)
+_thread_tools: dict[int, str] = {}
+"""Profiled tool each pool worker thread is currently working for, by thread ident."""
+
+
+async def traced_call(call, *args):
+    """Await ``call(*args)``; its frame marks stacks belonging to the profiled tool."""
+    return await call(*args)
+
+
+def traced_worker(func: Callable) -> Callable:
+    """Wrap ``func`` so its stacks count for the profiled tool call submitting it.
+
+    Pool threads do not inherit the caller's context; the wrapper tags the
+    worker thread with the tool's name while ``func`` runs. Outside a profiled
+    call, ``func`` is returned unchanged.
+    """
+    tool = _traced_tool.get()
+    if tool is None:
+        return func
+
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        _thread_tools[ident] = tool
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _thread_tools.pop(ident, None)
+
+    return run
+
+
+class Profile:
+    """One profiling session: a time window, or the next ``calls`` calls of ``tool``."""
+
+    def __init__(
+        self,
+        seconds: float | None,
+        tool: str | None,
+        calls: int | None,
+        interval: float,
+        output_dir: Path,
+    ):
+        self.id = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ") + (f"_{tool}" if tool else "")
+        self.tool = tool
+        self.calls = calls
+        self.seconds = min(seconds or MAX_DURATION, MAX_DURATION)
+        self.interval = interval
+        self.path = output_dir / f"{self.id}.collapsed"
+        self.state = RUNNING
+        self.started_at = datetime.now(UTC)
+        self.finished_at: datetime | None = None
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+        self.layers: Counter[str] = Counter()
+        self.call_times: list[float] = []
+        self.active_calls = 0
+        self._stop = threading.Event()
+        self._tool_marker = f".{tool}" if tool else None
+
+    def _belongs(self, thread_id: int, frames: list[FrameType]) -> bool:
+        """In a tool profile, keep stacks of the tool's workers, traced call or own functions."""
+        if _thread_tools.get(thread_id) == self.tool:
+            return True
+        for frame in frames:
+            code = frame.f_code
+            if code is traced_call.__code__:
+                return True
+            qualname = code.co_qualname
+            if qualname.endswith(self._tool_marker) or f"{self._tool_marker}.<locals>." in qualname:
+                return True
+        return False
+
+    def _sample(self, labels: _Frames, dt: float) -> None:
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            if not frames or self._idle(labels, frames):
+                continue
+            if self.tool is not None and not self._belongs(thread_id, frames):
+                continue
+            layer = None
+            for f in frames:
+                layer = labels.info(f.f_code)[1]
+                if layer is not None:
+                    break
+            self.layers[layer or "other"] += dt
+            self.stacks[";".join(labels.info(f.f_code)[0] for f in reversed(frames))] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _idle(labels: _Frames, frames: list[FrameType]) -> bool:
+        leaf = labels.info(frames[0].f_code)[2]
+        if leaf in _IDLE:
+            return True
+        caller = labels.info(frames[1].f_code)[2] if len(frames) > 1 else None
+        return leaf == ("threading.py", "wait") and (caller in _IDLE or caller in _IDLE_CALLERS)
+
+    def run(self) -> None:
+        labels = _Frames()
+        deadline = time.monotonic() + self.seconds
+        last = time.monotonic()
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            now = time.monotonic()
+            if self.tool is None or self.active_calls:
+                self._sample(labels, now - last)
+            last = now
+        self._finish()
+
+    def call_finished(self, elapsed: float) -> None:
+        self.call_times.append(elapsed)
+        if self.calls is not None and len(self.call_times) >= self.calls:
+            self._stop.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _finish(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", self.path, e)
+        self.finished_at = datetime.now(UTC)
+        self.state = DONE
+
+    def to_dict(self) -> dict:
+        total = sum(self.layers.values())
+        data = {
+            "id": self.id,
+            "state": self.state,
+            "tool": self.tool,
+            "calls": self.calls,
+            "interval": self.interval,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "samples": self.samples,
+            "layers": {
+                layer: {
+                    "seconds": round(seconds, 3),
+                    "percent": round(100 * seconds / total, 1) if total else 0.0,
+                }
+                for layer, seconds in sorted(self.layers.items(), key=lambda item: -item[1])
+            },
+        }
+        if self.tool is not None:
+            times = self.call_times
+            data["tool_calls"] = {
+                "count": len(times),
+                "total_seconds": round(sum(times), 3),
+                "mean_seconds": round(sum(times) / len(times), 3) if times else None,
+                "max_seconds": round(max(times), 3) if times else None,
+            }
+        if self.state == DONE:
+            data["collapsed_path"] = str(self.path)
+        return data
+
+
+class Profiler:
+    """Runs at most one profile at a time and hooks tool calls while it does."""
+
+    def __init__(self):
+        self.current: Profile | None = None
+        self.tool: str | None = None
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        output_dir: Path,
+        seconds: float | None = None,
+        tool: str | None = None,
+        calls: int | None = None,
+        interval: float = DEFAULT_INTERVAL,
+    ) -> Profile:
+        """Start a profile; raises ValueError for bad arguments or if one is running."""
+        if tool is None and not seconds:
+            raise ValueError("Give seconds for a time window, or a tool (and calls)")
+        if seconds is not None and seconds <= 0:
+            raise ValueError("seconds must be positive")
+        if calls is not None and (tool is None or calls < 1):
+            raise ValueError("calls needs a tool and must be at least 1")
+        if not 0.001 <= interval <= 1:
+            raise ValueError("interval must be between 0.001 and 1 second")
+        with self._lock:
+            if self.current is not None and self.current.state == RUNNING:
+                raise ValueError(f"Profile {self.current.id} is still running")
+            profile = Profile(seconds, tool, calls or (1 if tool else None), interval, output_dir)
+            self.current = profile
+            self.tool = tool
+        thread = threading.Thread(target=self._run, args=(profile,), name="profiler", daemon=True)
+        thread.start()
+        return profile
+
+    def _run(self, profile: Profile) -> None:
+        try:
+            profile.run()
+        finally:
+            with self._lock:
+                if self.current is profile:
+                    self.tool = None
+
+    def stop(self) -> Profile | None:
+        profile = self.current
+        if profile is not None:
+            profile.stop()
+        return profile
+
+    async def call_tool(self, call, name: str, arguments: dict):
+        """Run a tool call, timing and marking it when it is the profiled tool."""
+        if name != self.tool:
+            return await call(name, arguments)
+        # The profile may have finished since the check; read both together.
+        with self._lock:
+            profile = self.current if name == self.tool else None
+            if profile is not None:
+                profile.active_calls += 1
+        if profile is None:
+            return await call(name, arguments)
+        token = _traced_tool.set(name)
+        started = time.perf_counter()
+        try:
+            return await traced_call(call, name, arguments)
+        finally:
+            _traced_tool.reset(token)
+            profile.active_calls -= 1
+            profile.call_finished(time.perf_counter() - started)
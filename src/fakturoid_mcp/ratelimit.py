@@ -0,0 +1,35 @@
+"""Process-wide limiter for Fakturoid API requests made by bulk operations."""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` requests per ``period`` seconds.
+
+    Bursts up to ``rate`` requests pass immediately; after that callers are
+    spaced out evenly. Fakturoid allows 400 requests per minute per account.
+    """
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be made."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._tokens = min(self.rate, self._tokens + elapsed * self.rate / self.period)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.period / self.rate
+            time.sleep(wait)
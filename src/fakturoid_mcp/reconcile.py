@@ -0,0 +1,414 @@
+"""Matching bank transactions to open invoices.
+
+Statements are parsed from CSV exports or the Czech ABO/GPC format into
+``Transaction`` objects. ``PaymentMatcher`` indexes open invoices by variable
+symbol and by (currency, amount) and assigns each incoming transaction to the
+invoices it pays, in this order:
+
+1. variable symbol with the exact remaining amount (``exact``)
+2. variable symbol with a smaller amount (``partial``) or a larger one
+   (``overpayment``; spread over invoices sharing the symbol, the rest is
+   reported as surplus)
+3. a variable symbol found in the payment message (``message``)
+4. a single open invoice with the same currency and amount (``amount``)
+
+Amounts are compared as integer hundredths, so lookups are plain dict hits.
+
+``PaymentLedger`` remembers which transactions were already recorded (Fakturoid
+payments have no field to carry the bank reference), so reconciling the same
+statement again does not pay the invoices twice.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import UTC, date, datetime
+from decimal import Decimal, InvalidOperation
+
+from fakturoid_mcp.records import MONEY_SCALE, Record
+
+STATEMENT_FORMATS = ("csv", "gpc")
+
+GPC_CURRENCIES = {
+    "0203": "CZK",
+    "0978": "EUR",
+    "0840": "USD",
+    "0826": "GBP",
+    "0985": "PLN",
+    "0348": "HUF",
+    "0756": "CHF",
+}
+"""ISO 4217 numeric codes used in GPC transaction records."""
+
+CSV_COLUMNS = {
+    "amount": ("amount", "castka", "objem", "value"),
+    "currency": ("currency", "mena"),
+    "paid_on": ("date", "datum", "paidon", "bookingdate", "valuedate", "datumzauctovani"),
+    "variable_symbol": ("variablesymbol", "variabilnisymbol", "vs"),
+    "message": ("message", "note", "description", "zpravaproprijemce", "zprava", "poznamka"),
+    "counterparty": ("counterparty", "protiucet", "nazevprotiuctu", "name", "accountname"),
+    "reference": ("reference", "id", "transactionid", "idpohybu", "idtransakce"),
+}
+"""Accepted CSV header names per field, after folding to lowercase ASCII alphanumerics."""
+
+_SYMBOL_RE = re.compile(r"\d{4,10}")
+
+_LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    tx_key TEXT NOT NULL,
+    invoice_id INTEGER NOT NULL,
+    payment_id INTEGER,
+    amount TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (tx_key, invoice_id)
+)
+"""
+
+
+@dataclass(slots=True)
+class Transaction:
+    amount: Decimal
+    currency: str | None = None
+    paid_on: date | None = None
+    variable_symbol: str | None = None
+    message: str | None = None
+    counterparty: str | None = None
+    reference: str | None = None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["amount"] = str(self.amount)
+        data["paid_on"] = self.paid_on.isoformat() if self.paid_on else None
+        return data
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text.lower() if c.isascii() and c.isalnum())
+
+
+def normalize_symbol(value) -> str | None:
+    """Variable symbols are numeric; leading zeros and separators are not significant."""
+    if value is None:
+        return None
+    digits = "".join(c for c in str(value) if c.isdigit()).lstrip("0")
+    return digits or None
+
+
+def parse_amount(value) -> Decimal:
+    """Parse amounts like ``1234.50``, ``1 234,50`` or ``1.234,50``."""
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = str(value).replace("\xa0", "").replace(" ", "").replace("'", "")
+    if "," in text and "." in text:
+        # Whichever separator comes last is the decimal point.
+        thousands = "." if text.rfind(",") > text.rfind(".") else ","
+        text = text.replace(thousands, "")
+    text = text.replace(",", ".")
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}") from None
+
+
+def parse_transaction_date(value) -> date | None:
+    """Parse ISO (``2026-03-15``) or Czech (``15.03.2026``) dates."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(text[:10].strip(), fmt).date()
+        except ValueError:
+            continue
+    return date.fromisoformat(text[:10])
+
+
+def transaction_from_dict(data: dict) -> Transaction:
+    """Build a transaction from a dict with ``Transaction`` field names."""
+    if data.get("amount") in (None, ""):
+        raise ValueError(f"Transaction without amount: {data}")
+    return Transaction(
+        amount=parse_amount(data["amount"]),
+        currency=(data.get("currency") or "").upper() or None,
+        paid_on=parse_transaction_date(data.get("paid_on")),
+        variable_symbol=normalize_symbol(data.get("variable_symbol")),
+        message=data.get("message") or None,
+        counterparty=data.get("counterparty") or None,
+        reference=str(data["reference"]) if data.get("reference") not in (None, "") else None,
+    )
+
+
+def parse_csv(text: str) -> list[Transaction]:
+    """Parse a bank CSV export with a header row (``,``, ``;`` or tab separated)."""
+    sample = text[:4096]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader, None)
+    if header is None:
+        return []
+    folded = [_fold(name) for name in header]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in folded:
+                columns[field] = folded.index(alias)
+                break
+    if "amount" not in columns:
+        raise ValueError(f"CSV has no amount column; header: {header}")
+
+    transactions = []
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        values = {field: row[i].strip() if i < len(row) else None for field, i in columns.items()}
+        transactions.append(transaction_from_dict(values))
+    return transactions
+
+
+def parse_gpc(text: str) -> list[Transaction]:
+    """Parse a GPC (ABO) statement; only ``075`` transaction records are used."""
+    transactions = []
+    for line in text.splitlines():
+        if not line.startswith("075") or len(line) < 97:
+            continue
+        amount = Decimal(int(line[48:60])).scaleb(-2)
+        # Accounting code: 1 debit, 2 credit, 4 reversed debit, 5 reversed credit.
+        if line[60] in ("1", "5"):
+            amount = -amount
+        value_date = line[91:97]
+        paid_on = datetime.strptime(value_date, "%d%m%y").date() if value_date.strip("0 ") else None
+        transactions.append(
+            Transaction(
+                amount=amount,
+                currency=GPC_CURRENCIES.get(line[118:122]) if len(line) >= 122 else None,
+                paid_on=paid_on,
+                variable_symbol=normalize_symbol(line[61:71]),
+                message=line[97:117].strip() or None,
+                counterparty=line[19:35].strip().lstrip("0") or None,
+                reference=line[35:48].strip() or None,
+            )
+        )
+    return transactions
+
+
+def parse_statement(text: str, fmt: str | None = None) -> list[Transaction]:
+    """Parse a statement; the format is detected from the content when not given."""
+    if fmt is None:
+        fmt = "gpc" if text.lstrip().startswith("074") else "csv"
+    if fmt not in STATEMENT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}. Supported: {', '.join(STATEMENT_FORMATS)}")
+    return parse_gpc(text) if fmt == "gpc" else parse_csv(text)
+
+
+def _units(amount: Decimal) -> int:
+    return int(amount.scaleb(MONEY_SCALE).to_integral_value())
+
+
+def _amount(units: int) -> str:
+    return str(Decimal(units).scaleb(-MONEY_SCALE))
+
+
+class PaymentMatcher:
+    """Hash indexes over open invoices; remaining amounts shrink as matches are made."""
+
+    def __init__(
+        self, invoices: list[Record], default_currency: str | None, match_by_amount: bool = True
+    ):
+        self.default_currency = default_currency
+        self.match_by_amount = match_by_amount
+        self.invoices = {}
+        self.remaining: dict[int, int] = {}
+        self.by_symbol: dict[str, list[int]] = {}
+        self.by_amount: dict[tuple[str, int], list[int]] = {}
+        ordered = sorted(invoices, key=lambda r: (str(r.get("due_on") or ""), r.get("id")))
+        for invoice in ordered:
+            remaining = invoice.units("remaining_amount")
+            if remaining is None:
+                remaining = invoice.units("total")
+            if not remaining or remaining <= 0:
+                continue
+            invoice_id = invoice.get("id")
+            self.invoices[invoice_id] = invoice
+            self.remaining[invoice_id] = remaining
+            symbol = normalize_symbol(invoice.get("variable_symbol"))
+            if symbol:
+                self.by_symbol.setdefault(symbol, []).append(invoice_id)
+            key = (invoice.get("currency"), remaining)
+            self.by_amount.setdefault(key, []).append(invoice_id)
+
+    def _open(self, invoice_ids, currency: str) -> list[int]:
+        return [
+            i
+            for i in invoice_ids
+            if self.remaining[i] > 0 and self.invoices[i].get("currency") == currency
+        ]
+
+    def match(self, tx: Transaction) -> tuple[list[dict], int, str | None]:
+        """Return ``(allocations, surplus units, method)`` for one transaction."""
+        units = _units(tx.amount)
+        currency = tx.currency or self.default_currency
+        method = None
+        candidates = []
+        if tx.variable_symbol:
+            candidates = self._open(self.by_symbol.get(tx.variable_symbol, ()), currency)
+            method = "symbol"
+        if not candidates and tx.message:
+            for symbol in _SYMBOL_RE.findall(tx.message):
+                candidates = self._open(self.by_symbol.get(normalize_symbol(symbol), ()), currency)
+                if candidates:
+                    method = "message"
+                    break
+        if not candidates and not self.match_by_amount:
+            return [], units, None
+        if not candidates:
+            by_amount = self._open(self.by_amount.get((currency, units), ()), currency)
+            by_amount = [i for i in by_amount if self.remaining[i] == units]
+            if len(by_amount) == 1:
+                return self._allocate(by_amount, units), 0, "amount"
+            return [], units, "ambiguous_amount" if by_amount else None
+
+        exact = [i for i in candidates if self.remaining[i] == units]
+        if exact:
+            return self._allocate(exact[:1], units), 0, "exact" if method == "symbol" else method
+        allocations = self._allocate(candidates, units)
+        surplus = units - sum(a["units"] for a in allocations)
+        if method == "symbol":
+            method = "overpayment" if surplus else "partial"
+        return allocations, surplus, method
+
+    def _allocate(self, invoice_ids: list[int], units: int) -> list[dict]:
+        """Pay invoices in due-date order until the amount is used up."""
+        allocations = []
+        for invoice_id in invoice_ids:
+            if units <= 0:
+                break
+            paid = min(units, self.remaining[invoice_id])
+            self.remaining[invoice_id] -= paid
+            units -= paid
+            invoice = self.invoices[invoice_id]
+            allocations.append(
+                {
+                    "invoice_id": invoice_id,
+                    "number": invoice.get("number"),
+                    "units": paid,
+                    "amount": _amount(paid),
+                    "fully_paid": self.remaining[invoice_id] == 0,
+                }
+            )
+        return allocations
+
+    def reconcile(self, transactions: list[Transaction]) -> tuple[list[dict], list[dict]]:
+        """Match transactions in statement order; returns ``(matches, unmatched)``."""
+        matches, unmatched = [], []
+        for tx in transactions:
+            if tx.amount <= 0:
+                unmatched.append({"transaction": tx, "reason": "outgoing payment"})
+                continue
+            allocations, surplus, method = self.match(tx)
+            if not allocations:
+                reason = (
+                    "several open invoices have this amount"
+                    if method == "ambiguous_amount"
+                    else "no matching open invoice"
+                )
+                unmatched.append({"transaction": tx, "reason": reason})
+                continue
+            matches.append(
+                {
+                    "transaction": tx,
+                    "method": method,
+                    "allocations": allocations,
+                    "surplus": _amount(surplus) if surplus else None,
+                }
+            )
+        return matches, unmatched
+
+
+def transaction_keys(transactions: list[Transaction]) -> list[str]:
+    """Stable identity of each transaction across runs over the same statement.
+
+    The bank reference when there is one, otherwise a hash of all fields plus
+    the number of identical transactions before it in the statement.
+    """
+    keys = []
+    seen: Counter[str] = Counter()
+    for tx in transactions:
+        if tx.reference:
+            keys.append(f"ref:{tx.reference}")
+            continue
+        fields = json.dumps(tx.to_dict(), sort_keys=True)
+        digest = hashlib.sha256(fields.encode()).hexdigest()
+        keys.append(f"sha256:{digest}:{seen[digest]}")
+        seen[digest] += 1
+    return keys
+
+
+class PaymentLedger:
+    """SQLite record of the payments ``reconcile_payments`` created, per transaction."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(_LEDGER_SCHEMA)
+
+    def recorded(self, keys: list[str], open_invoices: dict) -> dict[str, list[dict]]:
+        """Return the payments already recorded for ``keys``.
+
+        A payment on an invoice in ``open_invoices`` (ID to invoice record) that
+        no longer lists it was deleted in Fakturoid; it is forgotten so the
+        transaction can be matched again.
+        """
+        rows = []
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows += self._db.execute(
+                    f"SELECT * FROM payments WHERE tx_key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+        found: dict[str, list[dict]] = {}
+        stale = []
+        for row in rows:
+            invoice = open_invoices.get(row["invoice_id"])
+            payments = invoice.get("payments") if invoice is not None else None
+            if payments is not None and row["payment_id"] is not None:
+                if row["payment_id"] not in {p.get("id") for p in payments}:
+                    stale.append((row["tx_key"], row["invoice_id"]))
+                    continue
+            found.setdefault(row["tx_key"], []).append(
+                {
+                    "invoice_id": row["invoice_id"],
+                    "payment_id": row["payment_id"],
+                    "amount": row["amount"],
+                    "recorded_at": row["recorded_at"],
+                }
+            )
+        if stale:
+            with self._lock:
+                self._db.executemany(
+                    "DELETE FROM payments WHERE tx_key = ? AND invoice_id = ?", stale
+                )
+        return {key: found[key] for key in keys if key in found}
+
+    def add(self, key: str, invoice_id: int, payment_id: int | None, amount: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO payments VALUES (?, ?, ?, ?, ?)",
+                (key, invoice_id, payment_id, amount, datetime.now(UTC).isoformat()),
+            )
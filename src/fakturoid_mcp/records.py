@@ -0,0 +1,271 @@
+"""Compact in-memory representation of Fakturoid models.
+
+Fakturoid models keep every field in a per-instance ``__dict__`` and every
+monetary value as a ``Decimal``. When whole accounts are held in memory (caches,
+indexes, snapshots) that overhead dominates, so the server stores documents as
+``Record`` objects instead:
+
+- a record is two slots: a shared, interned ``Shape`` (model type, field names
+  and per-field codecs) and a tuple of values
+- enum-like strings (currency, status, unit names, ...) are interned
+- decimals are stored as scaled integers with their scale packed into the low
+  bits, so ``Decimal("1234.50")`` round-trips as ``"1234.50"``
+
+Records convert losslessly back to models (``to_model``) and produce exactly the
+same output as ``model_to_dict`` (``to_dict``).
+"""
+
+import sys
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+RAW = 0
+DECIMAL = 1
+RECORD = 2
+RECORD_LIST = 3
+
+MONEY_SCALE = 2
+"""Default scale (decimal places) used by ``Record.units``."""
+
+_SCALE_BITS = 4
+_SCALE_MASK = (1 << _SCALE_BITS) - 1
+
+INTERNED_FIELDS = frozenset(
+    {
+        "currency",
+        "status",
+        "unit_name",
+        "payment_method",
+        "language",
+        "country",
+        "document_type",
+        "vat_price_mode",
+        "type",
+        "event",
+    }
+)
+
+
+def pack_decimal(value: Decimal) -> int | None:
+    """Pack a Decimal into a scaled integer, or return None if it cannot be exact.
+
+    The number of decimal places is kept in the low bits so that trailing zeros
+    survive the round trip.
+    """
+    if not value.is_finite():
+        return None
+    places = -value.as_tuple().exponent
+    if not 0 <= places <= _SCALE_MASK or (not value and value.is_signed()):
+        return None
+    units = int(value.scaleb(places))
+    return (units << _SCALE_BITS) | places
+
+
+def unpack_decimal(packed: int) -> Decimal:
+    """Inverse of ``pack_decimal``."""
+    places = packed & _SCALE_MASK
+    units = packed >> _SCALE_BITS
+    return Decimal(f"{units}e-{places}")
+
+
+def packed_units(packed: int, scale: int = MONEY_SCALE) -> int:
+    """Convert a packed decimal to an integer number of ``10**-scale`` units.
+
+    Values with more decimal places than ``scale`` are rounded half-up.
+    """
+    places = packed & _SCALE_MASK
+    units = packed >> _SCALE_BITS
+    if places <= scale:
+        return units * 10 ** (scale - places)
+    divisor = 10 ** (places - scale)
+    quotient, remainder = divmod(abs(units), divisor)
+    if remainder * 2 >= divisor:
+        quotient += 1
+    return quotient if units >= 0 else -quotient
+
+
+class Shape:
+    """Field layout shared by all records with the same type, keys and codecs."""
+
+    __slots__ = ("model_type", "names", "codecs", "index")
+
+    def __init__(self, model_type: type | None, names: tuple, codecs: tuple):
+        self.model_type = model_type
+        self.names = names
+        self.codecs = codecs
+        self.index = {name: i for i, name in enumerate(names)}
+
+
+_shapes: dict[tuple, Shape] = {}
+_shapes_lock = threading.Lock()
+
+
+def _get_shape(model_type: type | None, names: tuple, codecs: tuple) -> Shape:
+    key = (model_type, names, codecs)
+    shape = _shapes.get(key)
+    if shape is None:
+        with _shapes_lock:
+            shape = _shapes.setdefault(key, Shape(model_type, names, codecs))
+    return shape
+
+
+class Record:
+    """Slotted, immutable snapshot of a Fakturoid model."""
+
+    __slots__ = ("_shape", "_values")
+
+    def __init__(self, shape: Shape, values: tuple):
+        self._shape = shape
+        self._values = values
+
+    def __getattr__(self, name: str):
+        try:
+            i = self._shape.index[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return _decode(self._shape.codecs[i], self._values[i])
+
+    def __repr__(self) -> str:
+        type_name = self._shape.model_type.__name__ if self._shape.model_type else "dict"
+        return f"<Record {type_name}:{self.get('id')}>"
+
+    @property
+    def model_type(self) -> type | None:
+        return self._shape.model_type
+
+    def keys(self) -> tuple:
+        return self._shape.names
+
+    def get(self, name: str, default=None):
+        """Return a field value decoded to its model form (Decimal, date, ...)."""
+        i = self._shape.index.get(name)
+        if i is None:
+            return default
+        return _decode(self._shape.codecs[i], self._values[i])
+
+    def units(self, name: str, scale: int = MONEY_SCALE) -> int | None:
+        """Return a decimal field as integer ``10**-scale`` units without building a Decimal."""
+        i = self._shape.index.get(name)
+        if i is None or self._values[i] is None:
+            return None
+        if self._shape.codecs[i] == DECIMAL:
+            return packed_units(self._values[i], scale)
+        packed = pack_decimal(Decimal(str(self._values[i])))
+        return None if packed is None else packed_units(packed, scale)
+
+    def to_dict(self) -> dict:
+        """Serialize to the same JSON-safe dict ``model_to_dict`` returns for the model."""
+        result = {}
+        for name, codec, value in zip(self._shape.names, self._shape.codecs, self._values):
+            if value is None:
+                result[name] = None
+            elif codec == DECIMAL:
+                result[name] = str(unpack_decimal(value))
+            elif codec == RECORD:
+                result[name] = value.to_dict()
+            elif codec == RECORD_LIST:
+                result[name] = [item.to_dict() for item in value]
+            else:
+                result[name] = _plain(value)
+        return result
+
+    def to_model(self):
+        """Rebuild the original Fakturoid model (or dict) from the record."""
+        fields = {}
+        for name, codec, value in zip(self._shape.names, self._shape.codecs, self._values):
+            if codec == RECORD:
+                fields[name] = value.to_model()
+            elif codec == RECORD_LIST:
+                fields[name] = [item.to_model() for item in value]
+            else:
+                fields[name] = _decode(codec, value)
+        model_type = self._shape.model_type
+        if model_type is None:
+            return fields
+        model = model_type.__new__(model_type)
+        model.__dict__.update(fields)
+        if hasattr(model_type, "_loaded_lines") and "lines" in fields:
+            # Keep delete-on-save semantics of loaded invoice lines.
+            model._loaded_lines = [
+                line.to_dict()
+                for line in self._values[self._shape.index["lines"]]
+                if isinstance(line, Record) and line.get("id") is not None
+            ]
+        return model
+
+
+def _decode(codec: int, value):
+    if value is None:
+        return None
+    if codec == DECIMAL:
+        return unpack_decimal(value)
+    if codec == RECORD_LIST:
+        return list(value)
+    if codec == RAW and isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def _plain(value):
+    """JSON-safe conversion for raw values, mirroring ``model_to_dict``."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _is_model(value) -> bool:
+    return hasattr(value, "__dict__") and not isinstance(value, (str, int, float, bool, type))
+
+
+def compact(obj) -> Record:
+    """Convert a Fakturoid model (or a plain dict of fields) to a ``Record``.
+
+    Private attributes (``_loaded_lines`` etc.) are dropped, exactly as in
+    ``model_to_dict``.
+    """
+    if isinstance(obj, Record):
+        return obj
+    if isinstance(obj, dict):
+        model_type, items = None, obj.items()
+    else:
+        model_type, items = type(obj), obj.__dict__.items()
+
+    names, codecs, values = [], [], []
+    for name, value in items:
+        if name.startswith("_"):
+            continue
+        codec = RAW
+        if isinstance(value, Decimal):
+            packed = pack_decimal(value)
+            if packed is not None:
+                codec, value = DECIMAL, packed
+        elif isinstance(value, str):
+            if name in INTERNED_FIELDS:
+                value = sys.intern(value)
+        elif isinstance(value, list):
+            if value and all(_is_model(item) for item in value):
+                codec, value = RECORD_LIST, tuple(compact(item) for item in value)
+            else:
+                value = tuple(value)
+        elif value is not None and _is_model(value):
+            codec, value = RECORD, compact(value)
+        names.append(sys.intern(name))
+        codecs.append(codec)
+        values.append(value)
+    return Record(_get_shape(model_type, tuple(names), tuple(codecs)), tuple(values))
+
+
+def from_dict(data: dict, model_type: type | None = None) -> Record:
+    """Build a record from ``model_to_dict`` output (or raw API JSON).
+
+    With ``model_type`` the dict is parsed by the model class first, so decimal
+    and date strings regain their native types.
+    """
+    if model_type is None:
+        return compact(data)
+    return compact(model_type(**dict(data)))
@@ -0,0 +1,236 @@
+"""Local full-text index over invoice and expense content.
+
+Documents are indexed by number, order number, original number, variable
+symbol, note, tags and line names. Text is folded to lowercase ASCII (Czech
+diacritics removed) and reduced with a light Czech stemmer that strips case
+endings, so "hostingu", "Hostingem" and "hosting" match each other. Matches
+are ranked with BM25, weighting identifiers and tags above free text.
+
+The index is kept up to date incrementally: each sync only requests the
+documents updated since the previous one. ``updated_since`` does not report
+deletions, so every ``rebuild_interval`` seconds a sync lists all documents
+instead and drops the ones that no longer exist.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from fakturoid_mcp.records import Record
+
+SEARCH_KINDS = ("invoice", "expense")
+
+FIELD_WEIGHTS = {
+    "number": 3.0,
+    "order_number": 3.0,
+    "original_number": 3.0,
+    "variable_symbol": 3.0,
+    "tags": 2.0,
+    "lines": 1.0,
+    "note": 1.0,
+}
+"""Term frequency multiplier per indexed field."""
+
+STOP_WORDS = frozenset(
+    "a aby ale ani az by do i jak je jsem jsou k kde ktery na nebo o od po pro s se si ta "
+    "to u v ve z za ze the and of for".split()
+)
+
+# Light Czech stemmer (after Dolamic & Savoy): strip the longest case ending,
+# keeping a stem of at least three characters. Endings are diacritic-folded.
+_SUFFIXES = sorted(
+    set(
+        "atech etem atum ech ich eho emi emu ete eti iho imi imu ach ata aty ych ama ami ove "
+        "ovi ymi em es im um at am os us ym mi ou a e i o u y".split()
+    ),
+    key=len,
+    reverse=True,
+)
+_MIN_STEM = 3
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SYNC_OVERLAP = timedelta(minutes=1)
+"""Re-request documents updated this long before the last sync to absorb clock skew."""
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics (``"Účetnictví"`` -> ``"ucetnictvi"``)."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    if token.isdigit():
+        return token
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into folded, stemmed terms without stop words."""
+    return [stem(t) for t in _TOKEN.findall(fold(text)) if t not in STOP_WORDS]
+
+
+def _field_texts(record: Record) -> dict[str, str]:
+    texts = {}
+    for field in ("number", "order_number", "original_number", "variable_symbol", "note"):
+        value = record.get(field)
+        if value:
+            texts[field] = str(value)
+    tags = record.get("tags")
+    if tags:
+        texts["tags"] = " ".join(str(t) for t in tags)
+    lines = record.get("lines") or []
+    names = [str(line.get("name")) for line in lines if line.get("name")]
+    if names:
+        texts["lines"] = " ".join(names)
+    return texts
+
+
+def _summary(kind: str, record: Record) -> dict:
+    summary = {"kind": kind}
+    for field in ("id", "number", "status", "subject_id", "issued_on", "total", "currency"):
+        value = record.get(field)
+        summary[field] = value.isoformat() if hasattr(value, "isoformat") else value
+    if summary["total"] is not None:
+        summary["total"] = str(summary["total"])
+    return summary
+
+
+class SearchIndex:
+    """Thread-safe inverted index of invoices and expenses, ranked with BM25."""
+
+    def __init__(self, rebuild_interval: float = 3600.0):
+        self.rebuild_interval = rebuild_interval
+        self._postings: dict[str, dict[int, float]] = {}
+        self._docs: dict[int, tuple[dict, float, tuple[str, ...]]] = {}
+        self._doc_ids: dict[tuple[str, int], int] = {}
+        self._next_id = 0
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.synced_at: dict[str, datetime] = {}
+        self.rebuilt_at: dict[str, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, kind: str, record: Record) -> None:
+        """Index a document, replacing any earlier version of it."""
+        weights: Counter[str] = Counter()
+        for field, text in _field_texts(record).items():
+            for term in tokenize(text):
+                weights[term] += FIELD_WEIGHTS[field]
+        length = sum(weights.values())
+        with self._lock:
+            self._remove(kind, record.get("id"))
+            doc = self._next_id
+            self._next_id += 1
+            self._doc_ids[(kind, record.get("id"))] = doc
+            self._docs[doc] = (_summary(kind, record), length, tuple(weights))
+            self._total_length += length
+            for term, weight in weights.items():
+                self._postings.setdefault(term, {})[doc] = weight
+
+    def remove(self, kind: str, entity_id: int) -> None:
+        with self._lock:
+            self._remove(kind, entity_id)
+
+    def _remove(self, kind: str, entity_id: int) -> None:
+        doc = self._doc_ids.pop((kind, entity_id), None)
+        if doc is None:
+            return
+        _, length, terms = self._docs.pop(doc)
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+
+    def sync(self, kind: str, load: Callable[[datetime | None], object]) -> int:
+        """Index documents updated since the last sync of ``kind``; returns how many.
+
+        ``load(updated_since)`` returns an iterable of records (all documents
+        when ``updated_since`` is None). The first sync, and the first one after
+        ``rebuild_interval``, loads all documents and removes deleted ones.
+        """
+        with self._sync_lock:
+            started = datetime.now(UTC)
+            since = self.synced_at.get(kind)
+            rebuilt = self.rebuilt_at.get(kind)
+            full = rebuilt is None or (
+                self.rebuild_interval > 0
+                and (started - rebuilt).total_seconds() >= self.rebuild_interval
+            )
+            with self._lock:
+                first_new = self._next_id
+            count = 0
+            for record in load(None if full or since is None else since - SYNC_OVERLAP):
+                self.add(kind, record)
+                count += 1
+            if full:
+                # Documents not listed (and not added since the sync started) were deleted.
+                with self._lock:
+                    gone = [
+                        key
+                        for key, doc in self._doc_ids.items()
+                        if key[0] == kind and doc < first_new
+                    ]
+                    for key in gone:
+                        self._remove(*key)
+                self.rebuilt_at[kind] = started
+            self.synced_at[kind] = started
+            return count
+
+    def search(
+        self,
+        query: str,
+        kinds: tuple[str, ...] = SEARCH_KINDS,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[int, list[dict]]:
+        """Find documents containing every query term, best match first.
+
+        Returns the number of matches and the ``limit`` matches from ``offset``.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            raise ValueError("Query contains no searchable terms")
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return 0, []
+            n = len(self._docs)
+            average = self._total_length / n if n else 1.0
+            # Intersect starting from the rarest term.
+            order = sorted(range(len(terms)), key=lambda i: len(postings[i]))
+            candidates = set(postings[order[0]])
+            for i in order[1:]:
+                candidates.intersection_update(postings[i])
+            idfs = [math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            scored = []
+            for doc in candidates:
+                summary, length, _ = self._docs[doc]
+                if summary["kind"] not in kinds:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (average or 1.0))
+                score = 0.0
+                for idf, term_postings in zip(idfs, postings):
+                    tf = term_postings[doc]
+                    score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                scored.append((-score, -doc, summary))
+        # Internal IDs grow with indexing order, so ties list recent documents first.
+        scored.sort(key=lambda item: item[:2])
+        end = None if limit is None else offset + limit
+        page = [{**summary, "score": round(-score, 3)} for score, _, summary in scored[offset:end]]
+        return len(scored), page
@@ -1,40 +1,281 @@
 """FastMCP server instance and lifespan management."""
 
+import asyncio
+import hmac
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
 
+import anyio
 from fakturoid import Fakturoid
 from mcp.server.fastmcp import FastMCP
+from pydantic import SecretStr
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
+from fakturoid_mcp.api import ApiSession
+from fakturoid_mcp.attachments import AttachmentStore
+from fakturoid_mcp.breaker import CircuitBreaker, GuardedClient, Revalidator
+from fakturoid_mcp.cache import EntityCache
 from fakturoid_mcp.config import Settings
+from fakturoid_mcp.jobs import JobManager
+from fakturoid_mcp.metadata import MetadataCache
+from fakturoid_mcp.pdfs import PdfCache
+from fakturoid_mcp.profiling import DEFAULT_INTERVAL, DONE, Profiler
+from fakturoid_mcp.ratelimit import RateLimiter
+from fakturoid_mcp.reconcile import PaymentLedger
+from fakturoid_mcp.search import SearchIndex
+from fakturoid_mcp.warmup import Warmup
+from fakturoid_mcp.writequeue import WriteQueue
 
 
 @dataclass
 class AppContext:
-    client: Fakturoid
+    client: GuardedClient
     settings: Settings
+    cache: EntityCache
+    metadata: MetadataCache
+    jobs: JobManager
+    warmup: Warmup
+    rate_limiter: RateLimiter
+    breaker: CircuitBreaker
+    revalidator: Revalidator
+    pdfs: PdfCache
+    writes: WriteQueue
+    search: SearchIndex
+    attachments: AttachmentStore
+    payments: PaymentLedger
+
+
+_app_context: AppContext | None = None
+_background_tasks: set[asyncio.Task] = set()
+profiler = Profiler()
+
+
+def get_app_context() -> AppContext:
+    """Return the process-wide application context, starting background work once.
+
+    The FastMCP lifespan runs per session (per connection with HTTP transport),
+    so the client, caches, job manager, write queue and warm-up are created once
+    and shared by all sessions.
+    """
+    global _app_context
+    if _app_context is None:
+        settings = Settings()
+        breaker = CircuitBreaker(
+            failure_threshold=settings.breaker_failure_threshold,
+            latency_threshold=settings.breaker_latency_threshold,
+            reset_timeout=settings.breaker_reset_timeout,
+        )
+        client = GuardedClient(
+            Fakturoid(
+                settings.slug,
+                settings.email,
+                settings.client_id,
+                settings.client_secret.get_secret_value(),
+                settings.user_agent,
+            ),
+            breaker,
+        )
+        cache = EntityCache(ttl=settings.cache_ttl, snapshot_ttl=settings.snapshot_ttl)
+        metadata = MetadataCache(client, ttl=settings.metadata_ttl)
+        rate_limiter = RateLimiter(settings.rate_limit)
+        warmup = Warmup(
+            client,
+            cache,
+            metadata,
+            rate_limiter,
+            refresh_interval=settings.warmup_refresh_interval,
+            max_concurrency=settings.max_concurrency,
+        )
+        jobs = JobManager(max_workers=settings.job_workers, retention=settings.job_retention)
+        api = ApiSession(settings, rate_limiter, breaker)
+        pdfs = PdfCache(api, Path(settings.pdf_cache_dir), poll_timeout=settings.pdf_poll_timeout)
+        attachments = AttachmentStore(
+            api,
+            Path(settings.upload_dir),
+            Path(settings.attachment_dir) if settings.attachment_dir else None,
+            max_concurrency=settings.max_concurrency,
+        )
+        writes = WriteQueue(
+            settings.write_queue_path,
+            client,
+            cache,
+            rate_limiter,
+            breaker,
+            attachments,
+            workers=settings.write_workers,
+            retention=settings.write_retention,
+        )
+        _app_context = AppContext(
+            client=client,
+            settings=settings,
+            cache=cache,
+            metadata=metadata,
+            jobs=jobs,
+            warmup=warmup,
+            rate_limiter=rate_limiter,
+            breaker=breaker,
+            revalidator=Revalidator(breaker, cache),
+            pdfs=pdfs,
+            writes=writes,
+            search=SearchIndex(rebuild_interval=settings.search_rebuild_interval),
+            attachments=attachments,
+            payments=PaymentLedger(settings.payment_ledger_path),
+        )
+        writes.start()
+        if settings.warmup_enabled:
+            task = asyncio.get_running_loop().create_task(warmup.run())
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        else:
+            warmup.state = "disabled"
+    return _app_context
 
 
 @asynccontextmanager
 async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
-    settings = Settings()
-    client = Fakturoid(
-        settings.slug,
-        settings.email,
-        settings.client_id,
-        settings.client_secret.get_secret_value(),
-        settings.user_agent,
-    )
-    yield AppContext(client=client, settings=settings)
+    yield get_app_context()
+
+
+class FakturoidMCP(FastMCP):
+    """FastMCP whose tool calls pass through the profiler hook (a no-op unless profiling)."""
 
+    async def call_tool(self, name: str, arguments: dict[str, Any]):
+        return await profiler.call_tool(super().call_tool, name, arguments)
 
-mcp = FastMCP(
+
+mcp = FakturoidMCP(
     "Fakturoid",
     instructions="MCP server for Fakturoid.cz accounting service (API v3)",
     lifespan=app_lifespan,
 )
 
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
+    """Readiness endpoint; reports cache warm-up progress and upstream circuit state."""
+    if _app_context is None:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return JSONResponse(
+        {
+            "status": "ok",
+            "warmup": _app_context.warmup.status(),
+            "upstream": _app_context.breaker.status(),
+        }
+    )
+
+
+def _token_denied(request: Request, token: SecretStr | None) -> Response | None:
+    """Reject requests without the bearer ``token``; the route 404s when none is set."""
+    if token is None:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    expected = f"Bearer {token.get_secret_value()}".encode()
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    return None
+
+
+def _admin_denied(request: Request) -> Response | None:
+    """Reject requests without the admin bearer token; admin routes 404 when none is set."""
+    return _token_denied(request, get_app_context().settings.admin_token)
+
+
+@mcp.custom_route("/uploads", methods=["POST"])
+async def upload(request: Request) -> JSONResponse:
+    """Store a raw request body as an attachment and return its upload ID.
+
+    Requires the upload bearer token. The file name is taken from the
+    ``filename`` query parameter. The body is written to disk as it arrives, so
+    large files are never held in memory; bodies over the size limit are
+    discarded with 413.
+    """
+    settings = get_app_context().settings
+    denied = _token_denied(request, settings.upload_token)
+    if denied is not None:
+        return denied
+    filename = request.query_params.get("filename")
+    if not filename:
+        return JSONResponse({"error": "filename query parameter is required"}, status_code=400)
+    limit = settings.upload_max_bytes
+    too_large = JSONResponse(
+        {"error": f"Upload exceeds the limit of {limit} bytes"}, status_code=413
+    )
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        return too_large
+    writer = await anyio.to_thread.run_sync(get_app_context().attachments.writer)
+    try:
+        async for chunk in request.stream():
+            if writer.size + len(chunk) > limit:
+                await anyio.to_thread.run_sync(writer.abort)
+                return too_large
+            await anyio.to_thread.run_sync(writer.write, chunk)
+        stored = await anyio.to_thread.run_sync(writer.commit, Path(filename).name)
+    except BaseException:
+        writer.abort()
+        raise
+    return JSONResponse(stored, status_code=201)
+
+
+@mcp.custom_route("/admin/profile", methods=["GET", "POST", "DELETE"])
+async def profile(request: Request) -> Response:
+    """Start (POST), inspect (GET) or stop (DELETE) a sampling profile.
+
+    POST takes a JSON body with ``seconds`` for a time window, or ``tool`` and
+    ``calls`` to profile the next calls of one tool, plus an optional sampling
+    ``interval``. GET returns the latest profile with its per-layer wall-clock
+    breakdown; ``?format=collapsed`` returns its stacks for flamegraph tools.
+    """
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+    if request.method == "POST":
+        try:
+            options = await request.json()
+            tool = options.get("tool")
+            if tool is not None and tool not in {t.name for t in await mcp.list_tools()}:
+                raise ValueError(f"Unknown tool: {tool}")
+            started = profiler.start(
+                Path(get_app_context().settings.profile_dir),
+                seconds=options.get("seconds"),
+                tool=tool,
+                calls=options.get("calls"),
+                interval=options.get("interval", DEFAULT_INTERVAL),
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(started.to_dict(), status_code=202)
+
+    current = profiler.stop() if request.method == "DELETE" else profiler.current
+    if current is None:
+        return JSONResponse({"error": "No profile has been taken"}, status_code=404)
+    if request.query_params.get("format") == "collapsed":
+        if current.state != DONE:
+            error = f"Profile {current.id} is still running"
+            return JSONResponse({"error": error}, status_code=409)
+        return PlainTextResponse(await anyio.Path(current.path).read_text(encoding="utf-8"))
+    return JSONResponse(current.to_dict())
+
+
+def http_app() -> Starlette:
+    """Streamable HTTP app that creates the shared context at startup."""
+    app = mcp.streamable_http_app()
+    session_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        get_app_context()
+        async with session_lifespan(app):
+            yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
 from fakturoid_mcp.tools import register_all_tools  # noqa: E402
 
 register_all_tools(mcp)
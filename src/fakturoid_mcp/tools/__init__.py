@@ -5,7 +5,27 @@ from mcp.server.fastmcp import FastMCP
 
 def register_all_tools(mcp: FastMCP) -> None:
     """Import all tool modules to trigger registration."""
-    from fakturoid_mcp.tools import account, expenses, generators, invoices, subjects  # noqa: F401
+    from fakturoid_mcp.tools import (  # noqa: F401
+        account,
+        documents,
+        expenses,
+        generators,
+        invoices,
+        jobs,
+        snapshots,
+        subjects,
+        writes,
+    )
 
-    for module in [account, subjects, invoices, expenses, generators]:
+    for module in [
+        account,
+        subjects,
+        invoices,
+        expenses,
+        generators,
+        documents,
+        jobs,
+        writes,
+        snapshots,
+    ]:
         module.register(mcp)
@@ -1,10 +1,46 @@
 """Shared utility functions for MCP tools."""
 
+import base64
+import hashlib
 import json
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from decimal import Decimal
+from pathlib import Path
+from typing import Annotated, Any
 
+import anyio
 from mcp.server.fastmcp import Context
+from mcp.server.lowlevel.server import request_ctx
+from mcp.types import CallToolResult, TextContent
+from pydantic import BaseModel
+
+from fakturoid_mcp.breaker import is_outage
+from fakturoid_mcp.cache import Snapshot
+from fakturoid_mcp.jobs import Job
+from fakturoid_mcp.profiling import traced_worker
+from fakturoid_mcp.records import Record
+from fakturoid_mcp.validation import NON_VAT_PAYER, validate_document
+from fakturoid_mcp.writequeue import DONE, FAILED
+
+
+class ListResult(BaseModel):
+    """Structured output of tools returning a list of entities."""
+
+    result: list[dict[str, Any]] | None = None
+    next_cursor: str | None = None
+    omitted: dict[str, Any] | None = None
+    stale: dict[str, Any] | None = None
+    job: dict[str, Any] | None = None
+    error: str | None = None
+
+
+ToolResult = Annotated[CallToolResult, dict[str, Any]]
+"""Return annotation for tools producing a single object."""
+
+ListToolResult = Annotated[CallToolResult, ListResult]
+"""Return annotation for tools producing a list (structured as ``{"result": [...]}``)."""
 
 
 def get_client(ctx: Context):
@@ -12,12 +48,524 @@ def get_client(ctx: Context):
     return ctx.request_context.lifespan_context.client
 
 
+def get_cache(ctx: Context):
+    """Extract the shared entity cache from MCP context."""
+    return ctx.request_context.lifespan_context.cache
+
+
+def get_metadata(ctx: Context):
+    """Extract the shared account metadata cache from MCP context."""
+    return ctx.request_context.lifespan_context.metadata
+
+
+def get_jobs(ctx: Context):
+    """Extract the background job manager from MCP context."""
+    return ctx.request_context.lifespan_context.jobs
+
+
+def get_revalidator(ctx: Context):
+    """Extract the background revalidator for stale entities from MCP context."""
+    return ctx.request_context.lifespan_context.revalidator
+
+
+def get_rate_limiter(ctx: Context):
+    """Extract the shared API rate limiter from MCP context."""
+    return ctx.request_context.lifespan_context.rate_limiter
+
+
+def get_pdfs(ctx: Context):
+    """Extract the invoice PDF cache from MCP context."""
+    return ctx.request_context.lifespan_context.pdfs
+
+
+def get_writes(ctx: Context):
+    """Extract the durable write queue from MCP context."""
+    return ctx.request_context.lifespan_context.writes
+
+
+def get_payments(ctx: Context):
+    """Extract the ledger of reconciled payments from MCP context."""
+    return ctx.request_context.lifespan_context.payments
+
+
+def get_search(ctx: Context):
+    """Extract the full-text document index from MCP context."""
+    return ctx.request_context.lifespan_context.search
+
+
+def get_attachments(ctx: Context):
+    """Extract the attachment upload store from MCP context."""
+    return ctx.request_context.lifespan_context.attachments
+
+
+def get_snapshot(ctx: Context, snapshot_id: str | None) -> Snapshot | None:
+    """Look up the snapshot named by a tool's ``snapshot_id`` argument (None without one)."""
+    if snapshot_id is None:
+        return None
+    return get_cache(ctx).snapshot(snapshot_id)
+
+
+def export_path(ctx: Context, relative: str) -> Path:
+    """Resolve ``relative`` inside the configured export directory.
+
+    Raises ValueError for paths that would escape it.
+    """
+    base = Path(ctx.request_context.lifespan_context.settings.export_dir).resolve()
+    path = (base / relative).resolve()
+    if not path.is_relative_to(base):
+        raise ValueError(f"Path must stay inside the export directory: {relative}")
+    return path
+
+
+def iter_pages(items, job: Job | None = None, start: int = 0) -> Iterator[list]:
+    """Yield a lazy Fakturoid ``ModelList`` page by page, from page ``start``.
+
+    Only the pages actually consumed are requested from the API. With ``job``,
+    progress is reported per page and a cancelled job stops before the next
+    page request. Plain lists are yielded as a single page.
+    """
+    if not hasattr(items, "get_page"):
+        if start == 0:
+            yield list(items)
+        return
+    n = start
+    while True:
+        if job is not None:
+            job.check_cancelled()
+        try:
+            page = items.get_page(n)
+        except IndexError:
+            return
+        n += 1
+        if job is not None:
+            job.report(n, getattr(items, "page_count", None), f"{n} pages loaded")
+        yield page
+
+
+def collect(items, job: Job | None = None) -> list:
+    """Load all pages of ``items`` (see ``iter_pages``) into a list."""
+    results = []
+    for page in iter_pages(items, job):
+        results.extend(page)
+    return results
+
+
+def _filters_key(filters: dict) -> str:
+    encoded = json.dumps(filters, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+def encode_cursor(page: int, offset: int, filters: dict) -> str:
+    data = json.dumps({"p": page, "o": offset, "f": _filters_key(filters)})
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, filters: dict) -> tuple[int, int]:
+    """Return ``(page, offset)``; raises ValueError for foreign or malformed cursors."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        page, offset, key = data["p"], data["o"], data["f"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+    if key != _filters_key(filters):
+        raise ValueError("Cursor was issued for different filters")
+    return page, offset
+
+
+def summarize(rows: list[dict]) -> dict:
+    """Count rows, and for documents count them and total their amounts per status."""
+    summary: dict[str, Any] = {"count": len(rows)}
+    by_status: dict[str, dict] = {}
+    for row in rows:
+        if "status" not in row:
+            continue
+        group = by_status.setdefault(row["status"], {"count": 0, "totals": {}})
+        group["count"] += 1
+        if row.get("total") is not None:
+            totals = group["totals"]
+            currency = row.get("currency")
+            totals[currency] = totals.get(currency, Decimal(0)) + Decimal(row["total"])
+    if by_status:
+        for group in by_status.values():
+            group["totals"] = {k: str(v) for k, v in group["totals"].items()}
+        summary["by_status"] = by_status
+    return summary
+
+
+BUDGET_ENVELOPE_BYTES = 512
+"""Part of ``max_bytes`` reserved for the response envelope (cursor and omitted summary)."""
+
+
+def collect_within_budget(
+    items,
+    serialize: Callable[[list], list[dict]],
+    filters: dict,
+    max_items: int | None = None,
+    max_bytes: int | None = None,
+    cursor: str | None = None,
+    job: Job | None = None,
+) -> dict:
+    """Serialize pages of ``items`` until ``max_items`` or ``max_bytes`` is reached.
+
+    Pages are fetched and serialized one at a time and fetching stops as soon
+    as the budget is used up. The response holds the included rows, a
+    ``next_cursor`` to continue from (pass it back with the same filters) and an
+    ``omitted`` summary of the rows loaded but cut from the current page, plus
+    how many pages were not fetched. At least one row is always returned so
+    that paging makes progress.
+    """
+    if max_items is not None and max_items < 1:
+        raise ValueError("max_items must be at least 1")
+    if max_bytes is not None and max_bytes < 1:
+        raise ValueError("max_bytes must be positive")
+    start_page, start_offset = decode_cursor(cursor, filters) if cursor else (0, 0)
+    page_count = getattr(items, "page_count", None)
+    result: list[dict] = []
+    size = BUDGET_ENVELOPE_BYTES
+
+    def cut(loaded_page: int, next_page: int, offset: int, rows: list[dict]) -> dict:
+        omitted = summarize(rows)
+        omitted["unfetched_pages"] = (
+            max(page_count - loaded_page - 1, 0) if page_count is not None else None
+        )
+        return {
+            "result": result,
+            "next_cursor": encode_cursor(next_page, offset, filters),
+            "omitted": omitted,
+        }
+
+    for page_no, page in enumerate(iter_pages(items, job, start_page), start=start_page):
+        offset = start_offset if page_no == start_page else 0
+        rows = serialize(page[offset:])
+        for i, row in enumerate(rows):
+            row_size = len(json.dumps(row, default=str, ensure_ascii=False).encode()) + 1
+            over_items = max_items is not None and len(result) >= max_items
+            over_bytes = max_bytes is not None and result and size + row_size > max_bytes
+            if over_items or over_bytes:
+                return cut(page_no, page_no, offset + i, rows[i:])
+            result.append(row)
+            size += row_size
+        # Do not fetch another page only to find the budget already used up.
+        if max_items is not None and len(result) >= max_items:
+            if page_count is not None and page_no + 1 >= page_count:
+                break
+            return cut(page_no, page_no + 1, 0, [])
+    return {"result": result, "next_cursor": None, "omitted": None}
+
+
+def serialize_list(
+    items,
+    serialize: Callable[[list], list[dict]],
+    filters: dict,
+    job: Job | None = None,
+    max_items: int | None = None,
+    max_bytes: int | None = None,
+    cursor: str | None = None,
+):
+    """Serialize all of ``items``, or a budgeted slice (see ``collect_within_budget``)."""
+    if max_items is None and max_bytes is None and cursor is None:
+        return serialize(collect(items, job))
+    return collect_within_budget(items, serialize, filters, max_items, max_bytes, cursor, job)
+
+
+def run_or_submit(ctx: Context, name: str, background: bool, func: Callable[[Job | None], Any]):
+    """Run ``func`` inline, or as a background job returning ``{"job": ...}`` immediately."""
+    if not background:
+        return json_response(func(None))
+    job = get_jobs(ctx).submit(name, func)
+    return json_response({"job": job.to_dict()})
+
+
+def with_warnings(data: dict, warnings: list[str] | None) -> dict:
+    """Add validation warnings to a tool's result, if there are any."""
+    return {**data, "warnings": warnings} if warnings else data
+
+
+async def submit_write(
+    ctx: Context,
+    kind: str,
+    payload: dict,
+    idempotency_key: str | None,
+    wait: float,
+    warnings: list[str] | None = None,
+) -> CallToolResult:
+    """Queue a document creation and wait up to ``wait`` seconds for it to be saved.
+
+    Returns the created document once saved, or the queued write's status
+    (``state``, ``idempotency_key``) to poll with get_write_status, with any
+    validation ``warnings``.
+    """
+    writes = get_writes(ctx)
+    status = await anyio.to_thread.run_sync(writes.submit, kind, payload, idempotency_key)
+    if wait > 0:
+        status = await anyio.to_thread.run_sync(writes.wait, kind, status["idempotency_key"], wait)
+    if status["state"] == DONE:
+        return json_response(with_warnings(status["result"], warnings))
+    if status["state"] == FAILED:
+        return error_response(RuntimeError(status["error"]))
+    return json_response(with_warnings(status, warnings))
+
+
+def stale_entity(
+    ctx: Context, kind: str, entity_id: int, load: Callable[[int], object], error: Exception
+) -> dict | None:
+    """Serve a cached entity, marked ``stale`` with its age, when Fakturoid is unavailable.
+
+    Returns None if ``error`` is not an outage or nothing is cached. A refresh
+    is scheduled in the background for when the API recovers.
+    """
+    if not is_outage(error):
+        return None
+    entry = get_cache(ctx).get_stale(kind, entity_id)
+    if entry is None:
+        return None
+    get_revalidator(ctx).schedule(kind, entity_id, load)
+    record, age = entry
+    return {**record.to_dict(), "stale": {"age": round(age, 1)}}
+
+
+def load_entity(ctx: Context, kind: str, entity_id: int, load: Callable[[int], object]) -> dict:
+    """Load an entity from Fakturoid and cache it, falling back to ``stale_entity``."""
+    try:
+        return get_cache(ctx).put(kind, load(entity_id)).to_dict()
+    except Exception as e:
+        data = stale_entity(ctx, kind, entity_id, load, e)
+        if data is None:
+            raise
+        return data
+
+
+def stale_metadata(ctx: Context, name: str, error: Exception) -> tuple[Any, float]:
+    """Return the last loaded metadata value and its age during an outage; else re-raise."""
+    entry = get_metadata(ctx).peek(name) if is_outage(error) else None
+    if entry is None:
+        raise error
+    return entry[0], round(entry[1], 1)
+
+
+def account_settings(ctx: Context) -> Record | None:
+    """The account for document checks: cached, else loaded, else last known, else None."""
+    metadata = get_metadata(ctx)
+    try:
+        return metadata.account()
+    except Exception:
+        entry = metadata.peek("account")
+        return entry[0] if entry else None
+
+
+def validate_lines(
+    ctx: Context,
+    lines: list | None,
+    currency: str | None = None,
+    payment_method: str | None = None,
+    vat_price_mode: str | None = None,
+    issued: bool = True,
+) -> list[str]:
+    """Check document lines and fields locally before they are sent to Fakturoid.
+
+    On documents the account issues (``issued``), non-VAT payers may only use a
+    zero rate, and rates other than the configured standard rates are returned
+    as warnings. Expenses are issued by third parties, so their rates are not
+    checked. Raises ValueError listing every problem.
+    """
+    account = account_settings(ctx) if issued else None
+    vat_rates = ctx.request_context.lifespan_context.settings.vat_rates
+    return validate_document(
+        lines,
+        frozenset(Decimal(str(rate)).normalize() for rate in vat_rates) if issued else None,
+        vat_payer=account is None or account.get("vat_mode") != NON_VAT_PAYER,
+        currency=currency,
+        payment_method=payment_method,
+        vat_price_mode=vat_price_mode,
+    )
+
+
+def _matches(record: Record, filters: dict) -> bool:
+    """Evaluate list filters against a cached record."""
+    for key, value in filters.items():
+        if value is None or key == "expand":
+            continue
+        if key in ("since", "updated_since"):
+            stamp = record.get("created_at" if key == "since" else "updated_at")
+            stamp = stamp.isoformat() if hasattr(stamp, "isoformat") else str(stamp or "")
+            if stamp[:10] < value.isoformat():
+                return False
+        elif key == "proforma":
+            if (record.get("document_type") in ("proforma", "partial_proforma")) != value:
+                return False
+        elif record.get(key) != value:
+            return False
+    return True
+
+
+def stale_list(
+    ctx: Context,
+    kind: str,
+    filters: dict,
+    serialize: Callable[[list], list[dict]],
+    error: Exception,
+    max_items: int | None = None,
+    match: Callable[[Record], bool] | None = None,
+) -> dict:
+    """Answer a list call from the local cache while Fakturoid is unavailable.
+
+    Re-raises ``error`` unless it is an outage. Cached records must match
+    ``filters`` and, if given, ``match``. The cache only holds entities that
+    were loaded before (plus the warm-up hot sets), so the result is marked
+    ``stale`` and may be incomplete.
+    """
+    if not is_outage(error):
+        raise error
+    entries = [
+        (r, age)
+        for r, age in get_cache(ctx).stale_values(kind)
+        if _matches(r, filters) and (match is None or match(r))
+    ]
+    entries.sort(key=lambda entry: entry[0].get("id"), reverse=True)
+    if max_items is not None:
+        entries = entries[:max_items]
+    return {
+        "result": serialize([record for record, _ in entries]),
+        "stale": {
+            "age": round(max((age for _, age in entries), default=0.0), 1),
+            "complete": False,
+            "reason": str(error),
+        },
+    }
+
+
+def load_records(
+    ctx: Context, kind: str, items: Callable[[], object], filters: dict
+) -> tuple[list[Record], float | None]:
+    """Load every page of a list into the cache and return ``(records, None)``.
+
+    During an outage, cached records matching ``filters`` are returned
+    instead, with the age of the oldest as second element.
+    """
+    cache = get_cache(ctx)
+    try:
+        return cache.put_many(kind, collect(items())), None
+    except Exception as e:
+        if not is_outage(e):
+            raise
+        entries = [(r, age) for r, age in cache.stale_values(kind) if _matches(r, filters)]
+        return [r for r, _ in entries], round(max((age for _, age in entries), default=0.0), 1)
+
+
+def snapshot_records(
+    ctx: Context,
+    snapshot: Snapshot,
+    kind: str,
+    filters: dict,
+    items: Callable[[], object],
+    load: Callable[[int], object],
+    job: Job | None = None,
+) -> list[Record]:
+    """List entities as seen by ``snapshot``.
+
+    The first call with given filters loads every page into the cache and
+    fixes the list's IDs; later calls return the snapshot's version of the same
+    entities without calling the API (``load`` fetches one that was dropped
+    from the cache meanwhile).
+    """
+    key = (kind, _filters_key(filters))
+    ids = snapshot.lists.get(key)
+    if ids is None:
+        records = get_cache(ctx).put_many(kind, collect(items(), job))
+        ids = snapshot.lists.setdefault(key, [r.get("id") for r in records])
+    return [snapshot.load(kind, entity_id, load) for entity_id in ids]
+
+
+def fetch_many(
+    ctx: Context,
+    kind: str,
+    ids: list[int],
+    load: Callable[[int], object],
+    snapshot: Snapshot | None = None,
+    refresh: bool = False,
+) -> list:
+    """Fetch entities by ID, serving fresh ones from the cache.
+
+    Cache misses (every ID with ``refresh``) are loaded concurrently (bounded
+    by ``max_concurrency``) and stored in the cache. Results keep the input
+    order; an ID that fails to load yields ``{"id": ..., "error": ...}`` instead
+    of failing the whole batch, or its stale cached copy during an outage. With
+    ``snapshot``, entities are read from it, and those it does not know yet are
+    loaded and frozen in it.
+    """
+    cache = get_cache(ctx)
+    results = {}
+    missing = []
+    for entity_id in dict.fromkeys(ids):
+        if refresh:
+            record = None
+        elif snapshot is not None:
+            record = snapshot.get(kind, entity_id)
+        else:
+            record = cache.get(kind, entity_id)
+        if record is None:
+            missing.append(entity_id)
+        else:
+            results[entity_id] = record.to_dict()
+
+    if missing:
+        workers = min(ctx.request_context.lifespan_context.settings.max_concurrency, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            load = traced_worker(load)
+            futures = [pool.submit(load, entity_id) for entity_id in missing]
+            for entity_id, future in zip(missing, futures):
+                try:
+                    record = cache.put(kind, future.result())
+                    if snapshot is not None:
+                        record = snapshot.pin(kind, record)
+                    results[entity_id] = record.to_dict()
+                except Exception as e:
+                    stale = stale_entity(ctx, kind, entity_id, load, e)
+                    results[entity_id] = stale or {"id": entity_id, "error": str(e)}
+
+    return [results[entity_id] for entity_id in ids]
+
+
+EXPANDABLE = ("subject",)
+
+
+def expand_documents(
+    ctx: Context,
+    documents: list[dict],
+    expand: list[str] | None,
+    snapshot: Snapshot | None = None,
+) -> list[dict]:
+    """Embed related entities into serialized documents in place.
+
+    ``expand=["subject"]`` adds a ``subject`` key holding the full subject for
+    each document's ``subject_id``. Distinct subjects are resolved once, in bulk,
+    through the entity cache (or ``snapshot``).
+    """
+    if not expand:
+        return documents
+    unknown = set(expand) - set(EXPANDABLE)
+    if unknown:
+        raise ValueError(
+            f"Unsupported expand value(s): {', '.join(sorted(unknown))}. "
+            f"Supported: {', '.join(EXPANDABLE)}"
+        )
+    subject_ids = list(dict.fromkeys(d["subject_id"] for d in documents if d.get("subject_id")))
+    subjects = fetch_many(ctx, "subject", subject_ids, get_client(ctx).subject, snapshot)
+    by_id = dict(zip(subject_ids, subjects))
+    for document in documents:
+        document["subject"] = by_id.get(document.get("subject_id"))
+    return documents
+
+
 def model_to_dict(model) -> dict:
     """Serialize a Fakturoid model to a JSON-safe dict.
 
     Handles Decimal, date, datetime types and filters internal fields.
-    Recursively processes nested models and lists.
+    Recursively processes nested models and lists. Compact ``Record`` objects
+    serialize to the same output as the model they were built from.
     """
+    if isinstance(model, Record):
+        return model.to_dict()
     result = {}
     for key, value in model.__dict__.items():
         if key.startswith("_"):
@@ -36,6 +584,8 @@ def _convert_value(value):
         return value.isoformat()
     if isinstance(value, list):
         return [_convert_value(item) for item in value]
+    if isinstance(value, Record):
+        return value.to_dict()
     if hasattr(value, "__dict__") and not isinstance(value, (str, int, float, bool)):
         return model_to_dict(value)
     return value
@@ -48,11 +598,41 @@ def parse_date(value: str | None) -> date | None:
     return date.fromisoformat(value)
 
 
-def json_response(data) -> str:
-    """Serialize data to a JSON string with fallback for special types."""
-    return json.dumps(data, default=str, ensure_ascii=False)
+TEXT_STUB = "Result is in structuredContent."
+"""Text block of tool results when the JSON text fallback is off."""
+
+
+def _text_fallback() -> bool:
+    """Whether the server handling the current request repeats results as JSON text."""
+    request = request_ctx.get(None)
+    return request is not None and request.lifespan_context.settings.text_fallback
+
+
+def json_response(data) -> CallToolResult:
+    """Build a tool result carrying ``data`` as structured content.
+
+    Only the structured content holds the data, so it is encoded once, by the
+    transport. The text block is a short stub unless ``text_fallback`` is set,
+    in which case it repeats the data as compact JSON for clients without
+    structured output support. Lists are structured as ``{"result": [...]}``
+    because structured content must be an object.
+    """
+    structured = data if isinstance(data, dict) else {"result": data}
+    if _text_fallback():
+        text = json.dumps(data, default=str, ensure_ascii=False)
+    else:
+        text = TEXT_STUB
+    return CallToolResult(
+        content=[TextContent(type="text", text=text)],
+        structuredContent=structured,
+    )
 
 
-def error_response(e: Exception) -> str:
-    """Create a standardized error response."""
-    return json_response({"error": str(e)})
+def error_response(e: Exception) -> CallToolResult:
+    """Create a standardized error response; the error is always included as text."""
+    data = {"error": str(e)}
+    return CallToolResult(
+        content=[TextContent(type="text", text=json.dumps(data, ensure_ascii=False))],
+        structuredContent=data,
+        isError=True,
+    )
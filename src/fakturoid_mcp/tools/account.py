@@ -2,28 +2,55 @@
 
 from mcp.server.fastmcp import Context, FastMCP
 
-from fakturoid_mcp.tools._helpers import error_response, get_client, json_response, model_to_dict
+from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
+    error_response,
+    get_metadata,
+    json_response,
+    model_to_dict,
+    stale_metadata,
+)
 
 
 def register(mcp: FastMCP) -> None:
     """Register account tools."""
 
     @mcp.tool()
-    def get_account(ctx: Context) -> str:
-        """Get Fakturoid account information (name, plan, etc.)."""
+    def get_account(ctx: Context, refresh: bool = False) -> ToolResult:
+        """Get Fakturoid account information (name, plan, etc.).
+
+        Served from a long-lived cache shared by all sessions.
+
+        Args:
+            refresh: Reload from Fakturoid instead of using the cached copy
+        """
         try:
-            fa = get_client(ctx)
-            account = fa.account()
-            return json_response(model_to_dict(account))
+            try:
+                return json_response(model_to_dict(get_metadata(ctx).account(refresh)))
+            except Exception as e:
+                account, age = stale_metadata(ctx, "account", e)
+                return json_response({**model_to_dict(account), "stale": {"age": age}})
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def list_bank_accounts(ctx: Context) -> str:
-        """List all bank accounts configured in Fakturoid."""
+    def list_bank_accounts(ctx: Context, refresh: bool = False) -> ListToolResult:
+        """List all bank accounts configured in Fakturoid.
+
+        Served from a long-lived cache shared by all sessions.
+
+        Args:
+            refresh: Reload from Fakturoid instead of using the cached copy
+        """
         try:
-            fa = get_client(ctx)
-            accounts = fa.bank_accounts()
-            return json_response([model_to_dict(a) for a in accounts])
+            try:
+                accounts = get_metadata(ctx).bank_accounts(refresh)
+                return json_response([model_to_dict(a) for a in accounts])
+            except Exception as e:
+                accounts, age = stale_metadata(ctx, "bank_accounts", e)
+                return json_response(
+                    {"result": [model_to_dict(a) for a in accounts], "stale": {"age": age}}
+                )
         except Exception as e:
             return error_response(e)
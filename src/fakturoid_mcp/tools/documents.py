@@ -0,0 +1,308 @@
+"""Cross-document tools (invoices and expenses) for Fakturoid MCP server."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import anyio
+from mcp.server.fastmcp import Context, FastMCP
+
+from fakturoid_mcp.breaker import is_outage
+from fakturoid_mcp.export import write_documents
+from fakturoid_mcp.forecast import DEFAULT_DUE_DAYS, CashflowForecast
+from fakturoid_mcp.search import SEARCH_KINDS
+from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
+    account_settings,
+    collect,
+    decode_cursor,
+    encode_cursor,
+    error_response,
+    get_attachments,
+    get_cache,
+    get_client,
+    get_search,
+    iter_pages,
+    json_response,
+    load_records,
+    model_to_dict,
+    parse_date,
+    run_or_submit,
+)
+
+DOCUMENT_TYPES = ("invoices", "expenses")
+
+EXPORT_CREATED_MARGIN = timedelta(days=90)
+"""How long before its issue date a document may have been created and still be exported.
+
+Fakturoid's ``since`` list filter is on the creation date. Documents are
+normally created on or after their issue date, but can be entered in advance;
+an export from ``since`` asks the API for documents created from ``since``
+minus this margin and matches issued_on locally.
+"""
+
+FORECAST_SOURCES = (
+    ("generator", {"recurring": True}),
+    ("invoice", {"status": "open"}),
+    ("invoice", {"status": "sent"}),
+    ("invoice", {"status": "overdue"}),
+    ("expense", {"status": "open"}),
+    ("expense", {"status": "overdue"}),
+)
+"""Entity kind and list filters of everything a cash-flow forecast is built from."""
+
+
+def register(mcp: FastMCP) -> None:
+    """Register document tools."""
+
+    @mcp.tool()
+    async def export_documents(
+        ctx: Context,
+        document_type: str,
+        format: str = "ndjson",
+        since: str | None = None,
+        until: str | None = None,
+        status: str | None = None,
+        background: bool = False,
+    ) -> ToolResult:
+        """Export invoices or expenses issued in a date range to files on the server.
+
+        Pages through Fakturoid and streams rows straight to disk, so memory use
+        stays constant. Writes a documents file and a lines file (one row per
+        document line, keyed by document_id). Returns file paths, row counts and
+        SHA-256 checksums instead of the data. The date range is matched against
+        issued_on; with since, only documents created at most 90 days before it are
+        fetched, so a document entered further in advance of its issue date is missed.
+
+        Args:
+            document_type: "invoices" or "expenses"
+            format: Output format: ndjson, csv or parquet
+            since: Include documents issued on or after this date (YYYY-MM-DD)
+            until: Include documents issued on or before this date (YYYY-MM-DD)
+            status: Filter by document status
+            background: Run as a background job and return its job ID immediately
+        """
+        try:
+            if document_type not in DOCUMENT_TYPES:
+                raise ValueError(f"document_type must be one of: {', '.join(DOCUMENT_TYPES)}")
+            fa = get_client(ctx)
+            settings = ctx.request_context.lifespan_context.settings
+            since_date = parse_date(since)
+            until_date = parse_date(until)
+            kwargs = {}
+            if since_date:
+                kwargs["since"] = since_date - EXPORT_CREATED_MARGIN
+            if status:
+                kwargs["status"] = status
+            lister = fa.invoices if document_type == "invoices" else fa.expenses
+            stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+            basename = f"{document_type}_{since or 'start'}_{until or 'now'}_{stamp}"
+
+            def in_range(document: dict) -> bool:
+                issued_on = document.get("issued_on")
+                if issued_on is None:
+                    return since_date is None and until_date is None
+                issued_on = issued_on[:10]
+                if since_date and issued_on < since_date.isoformat():
+                    return False
+                return not (until_date and issued_on > until_date.isoformat())
+
+            def export(job):
+                batches = (
+                    [d for d in map(model_to_dict, page) if in_range(d)]
+                    for page in iter_pages(lister(**kwargs), job)
+                )
+                return write_documents(batches, Path(settings.export_dir), basename, format)
+
+            return await anyio.to_thread.run_sync(
+                run_or_submit, ctx, "export_documents", background, export
+            )
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def cashflow_forecast(
+        ctx: Context,
+        horizon_months: int = 3,
+        granularity: str = "month",
+        background: bool = False,
+    ) -> ToolResult:
+        """Forecast incoming and outgoing payments per currency over the next months.
+
+        Expands recurring generators into their future invoices (expected paid at
+        occurrence + due days) and adds unpaid invoices and open expenses at their
+        due dates. Returns per-currency totals and weekly or monthly buckets with
+        inflow, outflow, net and cumulative net. Payments already overdue are
+        reported separately per currency. Amounts are decimal strings.
+
+        Args:
+            horizon_months: Number of months to forecast, starting today
+            granularity: Bucket size: "week" or "month"
+            background: Run as a background job and return its job ID immediately
+        """
+        try:
+            forecast = CashflowForecast(date.today(), horizon_months, granularity)
+            fa = get_client(ctx)
+            settings = ctx.request_context.lifespan_context.settings
+            listers = {"generator": fa.generators, "invoice": fa.invoices, "expense": fa.expenses}
+
+            def load(source):
+                kind, filters = source
+                return load_records(ctx, kind, lambda: listers[kind](**filters), filters)
+
+            def build(job):
+                account = account_settings(ctx)
+                currency = (account.get("currency") if account is not None else None) or "CZK"
+                due = (account.get("due") if account is not None else None) or DEFAULT_DUE_DAYS
+                with ThreadPoolExecutor(max_workers=settings.max_concurrency) as pool:
+                    loaded = list(pool.map(load, FORECAST_SOURCES))
+                seen = set()
+                stale_ages = []
+                for (kind, _), (records, stale_age) in zip(FORECAST_SOURCES, loaded):
+                    if stale_age is not None:
+                        stale_ages.append(stale_age)
+                    for record in records:
+                        if (kind, record.get("id")) in seen:
+                            continue
+                        seen.add((kind, record.get("id")))
+                        if kind == "generator":
+                            forecast.add_generator(record, currency, due)
+                        else:
+                            forecast.add_document(record, currency, outflow=kind == "expense")
+                result = forecast.result()
+                if stale_ages:
+                    result["stale"] = {"age": max(stale_ages), "complete": False}
+                return result
+
+            return await anyio.to_thread.run_sync(
+                run_or_submit, ctx, "cashflow_forecast", background, build
+            )
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def search_documents(
+        ctx: Context,
+        query: str,
+        document_type: str | None = None,
+        max_items: int = 20,
+        cursor: str | None = None,
+        background: bool = False,
+    ) -> ToolResult:
+        """Full-text search over invoices and expenses, best matches first.
+
+        Searches document numbers, order and original numbers, variable symbols,
+        notes, tags and line item names. Matching ignores case and Czech
+        diacritics and tolerates Czech word endings ("hostingu" finds "hosting");
+        every query word must match. Served from a local index that is brought
+        up to date with documents changed since its last sync (the first search,
+        and one every FAKTUROID_SEARCH_REBUILD_INTERVAL seconds, loads the whole
+        history and drops deleted documents).
+
+        Args:
+            query: Words to search for
+            document_type: "invoices" or "expenses" (default: both)
+            max_items: Maximum number of results to return
+            cursor: next_cursor from a previous call with the same query and document_type
+            background: Run as a background job and return its job ID immediately
+        """
+        try:
+            if document_type is not None and document_type not in DOCUMENT_TYPES:
+                raise ValueError(f"document_type must be one of: {', '.join(DOCUMENT_TYPES)}")
+            if max_items < 1:
+                raise ValueError("max_items must be at least 1")
+            fa = get_client(ctx)
+            settings = ctx.request_context.lifespan_context.settings
+            index = get_search(ctx)
+            kinds = (document_type[:-1],) if document_type else SEARCH_KINDS
+            filters = {"query": query, "document_type": document_type}
+            _, offset = decode_cursor(cursor, filters) if cursor else (0, 0)
+            listers = {"invoice": fa.invoices, "expense": fa.expenses}
+
+            def load(kind):
+                def updated(since):
+                    kwargs = {"updated_since": since} if since else {}
+                    return get_cache(ctx).put_many(kind, collect(listers[kind](**kwargs)))
+
+                return updated
+
+            def run(job):
+                stale = None
+                for kind in kinds:
+                    synced = index.synced_at.get(kind)
+                    age = (datetime.now(UTC) - synced).total_seconds() if synced else None
+                    if age is not None and age < settings.search_sync_interval:
+                        continue
+                    try:
+                        index.sync(kind, load(kind))
+                    except Exception as e:
+                        if not is_outage(e) or synced is None:
+                            raise
+                        stale = {"age": round(age, 1), "reason": str(e)}
+                started = time.perf_counter()
+                total, page = index.search(query, kinds, offset, max_items)
+                result = {
+                    "result": page,
+                    "total": total,
+                    "next_cursor": (
+                        encode_cursor(0, offset + max_items, filters)
+                        if offset + max_items < total
+                        else None
+                    ),
+                    "took_ms": round((time.perf_counter() - started) * 1000, 2),
+                }
+                if stale:
+                    result["stale"] = stale
+                return result
+
+            return await anyio.to_thread.run_sync(
+                run_or_submit, ctx, "search_documents", background, run
+            )
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def add_attachments(
+        ctx: Context, document_type: str, documents: list[dict]
+    ) -> ListToolResult:
+        """Attach files to several invoices or expenses, uploading concurrently.
+
+        Each file is an upload ID returned by POST /uploads (HTTP transport) or a
+        path inside the server's attachment directory (FAKTUROID_ATTACHMENT_DIR).
+        Files are streamed to Fakturoid from disk, and content a document
+        already received is not uploaded again. Results list each document once,
+        in input order; a document that fails returns {"id": ..., "error": ...}
+        instead of failing the whole call.
+
+        Args:
+            document_type: "invoices" or "expenses"
+            documents: List of {"id": document ID, "files": [paths or upload IDs]}
+        """
+        try:
+            if document_type not in DOCUMENT_TYPES:
+                raise ValueError(f"document_type must be one of: {', '.join(DOCUMENT_TYPES)}")
+            kind = document_type[:-1]
+            store = get_attachments(ctx)
+            cache = get_cache(ctx)
+
+            def attach():
+                files: dict[int, list[str]] = {}
+                for document in documents:
+                    files.setdefault(document["id"], []).extend(document["files"])
+                refs = list(dict.fromkeys(ref for refs in files.values() for ref in refs))
+                stored = {ref: store.resolve([ref])[0] for ref in refs}
+                batch = [(i, [stored[ref] for ref in refs]) for i, refs in files.items()]
+                results = []
+                for (document_id, _), outcome in zip(batch, store.attach_many(kind, batch)):
+                    if isinstance(outcome, Exception):
+                        results.append({"id": document_id, "error": str(outcome)})
+                        continue
+                    cache.invalidate(kind, document_id)
+                    results.append({"id": document_id, "uploaded": outcome is not None})
+                return results
+
+            return json_response(await anyio.to_thread.run_sync(attach))
+        except Exception as e:
+            return error_response(e)
@@ -1,15 +1,77 @@
 """Expense tools for Fakturoid MCP server."""
 
+from datetime import date
+from functools import partial
+
+import anyio
 from fakturoid import Expense, ExpensePayment, InvoiceLine
 from mcp.server.fastmcp import Context, FastMCP
 
+from fakturoid_mcp.duplicates import ExpenseIndex
+from fakturoid_mcp.records import from_dict
 from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
+    account_settings,
     error_response,
+    expand_documents,
+    fetch_many,
+    get_attachments,
+    get_cache,
     get_client,
+    get_search,
+    get_snapshot,
+    get_writes,
     json_response,
+    load_entity,
+    load_records,
     model_to_dict,
     parse_date,
+    run_or_submit,
+    serialize_list,
+    snapshot_records,
+    stale_list,
+    submit_write,
+    validate_lines,
 )
+from fakturoid_mcp.validation import compute_totals, writable_line
+
+
+def possible_duplicates(ctx: Context, payload: dict, key: str | None) -> list[dict]:
+    """Find the supplier's existing expenses that look like duplicates of ``payload``.
+
+    A payload whose idempotency key was already submitted is a retry, not a duplicate.
+    """
+    if key:
+        try:
+            get_writes(ctx).get("expense", key)
+            return []
+        except ValueError:
+            pass
+    account = account_settings(ctx)
+    defaults = account.to_dict() if account is not None else {}
+    totals = compute_totals(
+        payload["lines"],
+        vat_price_mode=defaults.get("vat_price_mode") or "without_vat",
+        default_vat_rate=defaults.get("vat_rate") or 0,
+    )
+    proposed = from_dict(
+        {
+            "subject_id": payload["subject_id"],
+            "currency": payload.get("currency") or defaults.get("currency"),
+            "total": totals["total"],
+            "issued_on": payload.get("issued_on") or date.today().isoformat(),
+            "variable_symbol": payload.get("variable_symbol"),
+            "original_number": payload.get("original_number"),
+        }
+    )
+    fa = get_client(ctx)
+    filters = {"subject_id": payload["subject_id"]}
+    records, _ = load_records(ctx, "expense", lambda: fa.expenses(**filters), filters)
+    index = ExpenseIndex()
+    for record in records:
+        index.add(record)
+    return index.check(proposed)
 
 
 def register(mcp: FastMCP) -> None:
@@ -25,7 +87,13 @@ def register(mcp: FastMCP) -> None:
         status: str | None = None,
         custom_id: str | None = None,
         variable_symbol: str | None = None,
-    ) -> str:
+        expand: list[str] | None = None,
+        max_items: int | None = None,
+        max_bytes: int | None = None,
+        cursor: str | None = None,
+        snapshot_id: str | None = None,
+        background: bool = False,
+    ) -> ListToolResult:
         """List expenses with optional filters.
 
         Args:
@@ -36,6 +104,15 @@ def register(mcp: FastMCP) -> None:
             status: Filter by status (open, overdue, paid)
             custom_id: Filter by custom identifier
             variable_symbol: Filter by variable symbol
+            expand: Related data to embed, e.g. ["subject"] to include each supplier's details
+            max_items: Return at most this many records
+            max_bytes: Stop adding records once the JSON result would exceed this size;
+                       cut results include next_cursor and a summary of omitted records
+            cursor: next_cursor from a previous budgeted call with the same filters
+            snapshot_id: Read from this snapshot (see begin_snapshot); the list is fixed
+                         by its first call with the same filters
+            background: Run as a background job and return its job ID immediately;
+                        fetch the data later with get_job_result
         """
         try:
             fa = get_client(ctx)
@@ -54,27 +131,132 @@ def register(mcp: FastMCP) -> None:
                 kwargs["custom_id"] = custom_id
             if variable_symbol:
                 kwargs["variable_symbol"] = variable_symbol
-            expenses = list(fa.expenses(**kwargs))
-            return json_response([model_to_dict(e) for e in expenses])
+            snapshot = get_snapshot(ctx, snapshot_id)
+
+            def serialize(page):
+                return expand_documents(ctx, [model_to_dict(e) for e in page], expand, snapshot)
+
+            def fetch(job):
+                filters = {**kwargs, "expand": expand}
+                try:
+                    if snapshot is not None:
+                        items = snapshot_records(
+                            ctx,
+                            snapshot,
+                            "expense",
+                            kwargs,
+                            lambda: fa.expenses(**kwargs),
+                            fa.expense,
+                            job,
+                        )
+                    else:
+                        items = fa.expenses(**kwargs)
+                    return serialize_list(
+                        items, serialize, filters, job, max_items, max_bytes, cursor
+                    )
+                except Exception as e:
+                    return stale_list(ctx, "expense", filters, serialize, e, max_items)
+
+            return run_or_submit(ctx, "list_expenses", background, fetch)
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def get_expense(ctx: Context, expense_id: int) -> str:
+    def get_expense(
+        ctx: Context,
+        expense_id: int,
+        expand: list[str] | None = None,
+        snapshot_id: str | None = None,
+    ) -> ToolResult:
         """Get a single expense by ID.
 
         Args:
             expense_id: The expense ID
+            expand: Related data to embed, e.g. ["subject"] to include the supplier's details
+            snapshot_id: Read from this snapshot (see begin_snapshot)
         """
         try:
             fa = get_client(ctx)
-            expense = fa.expense(expense_id)
-            return json_response(model_to_dict(expense))
+            snapshot = get_snapshot(ctx, snapshot_id)
+            if snapshot is not None:
+                expense = snapshot.load("expense", expense_id, fa.expense).to_dict()
+            else:
+                expense = load_entity(ctx, "expense", expense_id, fa.expense)
+            return json_response(expand_documents(ctx, [expense], expand, snapshot)[0])
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def get_expenses(
+        ctx: Context, expense_ids: list[int], snapshot_id: str | None = None
+    ) -> ListToolResult:
+        """Get multiple expenses by ID in one call.
+
+        Cached expenses are returned directly; the rest are fetched concurrently.
+        Results keep the input order. IDs that cannot be loaded return
+        {"id": ..., "error": ...} instead of failing the whole call.
+
+        Args:
+            expense_ids: List of expense IDs
+            snapshot_id: Read from this snapshot (see begin_snapshot)
+        """
+        try:
+            fa = get_client(ctx)
+            snapshot = get_snapshot(ctx, snapshot_id)
+            return json_response(fetch_many(ctx, "expense", expense_ids, fa.expense, snapshot))
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def find_duplicate_expenses(
+        ctx: Context,
+        subject_id: int | None = None,
+        since: str | None = None,
+        date_window: int = 7,
+        min_score: float = 0.5,
+        background: bool = False,
+    ) -> ToolResult:
+        """Find groups of expenses that were probably entered more than once.
+
+        Expenses are compared only with others of the same supplier sharing the
+        original document number, the variable symbol, or the amount within
+        date_window days of the issue date. Each group lists the expense IDs and
+        the matching pairs with a score (0-1) and the signals that matched.
+
+        Args:
+            subject_id: Only check this supplier's expenses
+            since: Only check expenses created since this date (YYYY-MM-DD)
+            date_window: Maximum days between issue dates for same-amount matches
+            min_score: Minimum pair score to report (original number 0.5, variable
+                       symbol 0.4, amount 0.4, issue date proximity up to 0.2)
+            background: Run as a background job and return its job ID immediately
+        """
+        try:
+            fa = get_client(ctx)
+            kwargs = {}
+            if subject_id is not None:
+                kwargs["subject_id"] = subject_id
+            if since:
+                kwargs["since"] = parse_date(since)
+
+            def find(job):
+                records, stale_age = load_records(
+                    ctx, "expense", lambda: fa.expenses(**kwargs), kwargs
+                )
+                index = ExpenseIndex(date_window, min_score)
+                for record in records:
+                    index.add(record)
+                result = {"checked": len(index), "groups": index.groups()}
+                if stale_age is not None:
+                    result["stale"] = {"age": stale_age, "complete": False}
+                return result
+
+            return run_or_submit(ctx, "find_duplicate_expenses", background, find)
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def create_expense(
+    async def create_expense(
         ctx: Context,
         subject_id: int,
         lines: list[dict],
@@ -85,11 +267,21 @@ def register(mcp: FastMCP) -> None:
         payment_method: str | None = None,
         note: str | None = None,
         variable_symbol: str | None = None,
+        original_number: str | None = None,
         custom_id: str | None = None,
         tags: list[str] | None = None,
-    ) -> str:
+        attachments: list[str] | None = None,
+        check_duplicates: bool = False,
+        idempotency_key: str | None = None,
+        wait: float = 30,
+    ) -> ToolResult:
         """Create a new expense.
 
+        The request is stored in a durable write queue before being sent, so
+        retrying with the same idempotency_key never creates a second expense.
+        With check_duplicates, the expense is not created if the supplier already
+        has a likely duplicate; the error then lists the matching expenses.
+
         Args:
             subject_id: Supplier subject ID (required)
             lines: List of line items, each with keys: name (str), quantity (number),
@@ -101,22 +293,34 @@ def register(mcp: FastMCP) -> None:
             payment_method: Payment method (bank, cash, cod, card, paypal, custom)
             note: Note on the expense
             variable_symbol: Variable symbol
+            original_number: Supplier's document number
             custom_id: Custom identifier
             tags: List of tags
+            attachments: Files to attach: upload IDs returned by POST /uploads (HTTP
+                         transport) or paths inside the server's attachment directory;
+                         streamed from disk after the expense is created, identical files
+                         are sent once
+            check_duplicates: Look for existing expenses of the supplier with the same
+                              original number, variable symbol or amount and date first
+            idempotency_key: Unique key for this request (defaults to custom_id, else generated);
+                             stored as the expense's custom_id unless one is given
+            wait: Seconds to wait for the expense to be saved; if it is not saved by then
+                  (or wait is 0), the queued write's status is returned instead
         """
         try:
-            fa = get_client(ctx)
-            expense_lines = [InvoiceLine(**line) for line in lines]
+            await anyio.to_thread.run_sync(
+                partial(validate_lines, ctx, lines, currency, payment_method, issued=False)
+            )
             kwargs: dict = {
                 "subject_id": subject_id,
-                "lines": expense_lines,
+                "lines": lines,
             }
             if issued_on:
-                kwargs["issued_on"] = parse_date(issued_on)
+                kwargs["issued_on"] = parse_date(issued_on).isoformat()
             if taxable_fulfillment_due:
-                kwargs["taxable_fulfillment_due"] = parse_date(taxable_fulfillment_due)
+                kwargs["taxable_fulfillment_due"] = parse_date(taxable_fulfillment_due).isoformat()
             if due_on:
-                kwargs["due_on"] = parse_date(due_on)
+                kwargs["due_on"] = parse_date(due_on).isoformat()
             if currency:
                 kwargs["currency"] = currency
             if payment_method:
@@ -125,13 +329,27 @@ def register(mcp: FastMCP) -> None:
                 kwargs["note"] = note
             if variable_symbol:
                 kwargs["variable_symbol"] = variable_symbol
+            if original_number:
+                kwargs["original_number"] = original_number
             if custom_id:
                 kwargs["custom_id"] = custom_id
             if tags:
                 kwargs["tags"] = tags
-            expense = Expense(**kwargs)
-            fa.save(expense)
-            return json_response(model_to_dict(expense))
+            if attachments:
+                kwargs["attachments"] = await anyio.to_thread.run_sync(
+                    get_attachments(ctx).resolve, attachments
+                )
+            if check_duplicates:
+                key = idempotency_key or custom_id
+                duplicates = await anyio.to_thread.run_sync(possible_duplicates, ctx, kwargs, key)
+                if duplicates:
+                    ids = ", ".join(str(d["id"]) for d in duplicates)
+                    result = json_response(
+                        {"error": f"Possible duplicate of expense {ids}", "duplicates": duplicates}
+                    )
+                    result.isError = True
+                    return result
+            return await submit_write(ctx, "expense", kwargs, idempotency_key, wait)
         except Exception as e:
             return error_response(e)
 
@@ -146,7 +364,7 @@ def register(mcp: FastMCP) -> None:
         variable_symbol: str | None = None,
         custom_id: str | None = None,
         lines: list[dict] | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Update an existing expense.
 
         Args:
@@ -160,6 +378,7 @@ def register(mcp: FastMCP) -> None:
             lines: Replacement line items (replaces all existing lines)
         """
         try:
+            validate_lines(ctx, lines, currency, payment_method, issued=False)
             fa = get_client(ctx)
             expense = fa.expense(expense_id)
             if due_on is not None:
@@ -175,14 +394,15 @@ def register(mcp: FastMCP) -> None:
             if custom_id is not None:
                 expense.custom_id = custom_id
             if lines is not None:
-                expense.lines = [InvoiceLine(**line) for line in lines]
+                expense.lines = [InvoiceLine(**writable_line(line)) for line in lines]
             fa.save(expense)
+            get_cache(ctx).put("expense", expense)
             return json_response(model_to_dict(expense))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def delete_expense(ctx: Context, expense_id: int) -> str:
+    def delete_expense(ctx: Context, expense_id: int) -> ToolResult:
         """Delete an expense by ID.
 
         Args:
@@ -191,6 +411,8 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.delete(Expense(id=expense_id))
+            get_cache(ctx).invalidate("expense", expense_id)
+            get_search(ctx).remove("expense", expense_id)
             return json_response({"success": True, "deleted_id": expense_id})
         except Exception as e:
             return error_response(e)
@@ -200,7 +422,7 @@ def register(mcp: FastMCP) -> None:
         ctx: Context,
         expense_id: int,
         event: str,
-    ) -> str:
+    ) -> ToolResult:
         """Fire an event on an expense to change its state.
 
         Args:
@@ -210,6 +432,7 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.fire_expense_event(expense_id, event)
+            get_cache(ctx).invalidate("expense", expense_id)
             return json_response({"success": True, "expense_id": expense_id, "event": event})
         except Exception as e:
             return error_response(e)
@@ -221,7 +444,7 @@ def register(mcp: FastMCP) -> None:
         paid_on: str,
         amount: float,
         currency: str | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Record a payment on an expense.
 
         Args:
@@ -240,12 +463,13 @@ def register(mcp: FastMCP) -> None:
                 kwargs["currency"] = currency
             payment = ExpensePayment(**kwargs)
             fa.save(payment, expense_id=expense_id)
+            get_cache(ctx).invalidate("expense", expense_id)
             return json_response(model_to_dict(payment))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def delete_expense_payment(ctx: Context, expense_id: int, payment_id: int) -> str:
+    def delete_expense_payment(ctx: Context, expense_id: int, payment_id: int) -> ToolResult:
         """Delete a payment from an expense.
 
         Args:
@@ -255,6 +479,7 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.delete(ExpensePayment(id=payment_id), expense_id=expense_id)
+            get_cache(ctx).invalidate("expense", expense_id)
             return json_response({"success": True, "expense_id": expense_id, "payment_id": payment_id})
         except Exception as e:
             return error_response(e)
@@ -4,12 +4,22 @@ from fakturoid import Generator, InvoiceLine
 from mcp.server.fastmcp import Context, FastMCP
 
 from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
     error_response,
+    fetch_many,
+    get_cache,
     get_client,
     json_response,
+    load_entity,
     model_to_dict,
     parse_date,
+    serialize_list,
+    stale_list,
+    validate_lines,
+    with_warnings,
 )
+from fakturoid_mcp.validation import writable_line
 
 
 def register(mcp: FastMCP) -> None:
@@ -21,13 +31,20 @@ def register(mcp: FastMCP) -> None:
         recurring: bool | None = None,
         subject_id: int | None = None,
         since: str | None = None,
-    ) -> str:
+        max_items: int | None = None,
+        max_bytes: int | None = None,
+        cursor: str | None = None,
+    ) -> ListToolResult:
         """List invoice generators (templates).
 
         Args:
             recurring: True for recurring generators, False for simple templates
             subject_id: Filter by subject (client) ID
             since: Return generators created since this date (YYYY-MM-DD)
+            max_items: Return at most this many records
+            max_bytes: Stop adding records once the JSON result would exceed this size;
+                       cut results include next_cursor and a summary of omitted records
+            cursor: next_cursor from a previous budgeted call with the same filters
         """
         try:
             fa = get_client(ctx)
@@ -38,13 +55,23 @@ def register(mcp: FastMCP) -> None:
                 kwargs["subject_id"] = subject_id
             if since:
                 kwargs["since"] = parse_date(since)
-            generators = list(fa.generators(**kwargs))
-            return json_response([model_to_dict(g) for g in generators])
+
+            def serialize(page):
+                return [model_to_dict(g) for g in page]
+
+            try:
+                items = fa.generators(**kwargs)
+                result = serialize_list(
+                    items, serialize, kwargs, None, max_items, max_bytes, cursor
+                )
+            except Exception as e:
+                result = stale_list(ctx, "generator", kwargs, serialize, e, max_items)
+            return json_response(result)
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def get_generator(ctx: Context, generator_id: int) -> str:
+    def get_generator(ctx: Context, generator_id: int) -> ToolResult:
         """Get a single invoice generator (template) by ID.
 
         Args:
@@ -52,8 +79,24 @@ def register(mcp: FastMCP) -> None:
         """
         try:
             fa = get_client(ctx)
-            generator = fa.generator(generator_id)
-            return json_response(model_to_dict(generator))
+            return json_response(load_entity(ctx, "generator", generator_id, fa.generator))
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def get_generators(ctx: Context, generator_ids: list[int]) -> ListToolResult:
+        """Get multiple invoice generators (templates) by ID in one call.
+
+        Cached generators are returned directly; the rest are fetched concurrently.
+        Results keep the input order. IDs that cannot be loaded return
+        {"id": ..., "error": ...} instead of failing the whole call.
+
+        Args:
+            generator_ids: List of generator IDs
+        """
+        try:
+            fa = get_client(ctx)
+            return json_response(fetch_many(ctx, "generator", generator_ids, fa.generator))
         except Exception as e:
             return error_response(e)
 
@@ -69,7 +112,7 @@ def register(mcp: FastMCP) -> None:
         payment_method: str | None = None,
         note: str | None = None,
         tags: list[str] | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Create a new invoice generator (template).
 
         Args:
@@ -85,8 +128,9 @@ def register(mcp: FastMCP) -> None:
             tags: List of tags
         """
         try:
+            warnings = validate_lines(ctx, lines, currency, payment_method)
             fa = get_client(ctx)
-            generator_lines = [InvoiceLine(**line) for line in lines]
+            generator_lines = [InvoiceLine(**writable_line(line)) for line in lines]
             kwargs: dict = {
                 "name": name,
                 "subject_id": subject_id,
@@ -105,7 +149,8 @@ def register(mcp: FastMCP) -> None:
                 kwargs["tags"] = tags
             generator = Generator(**kwargs)
             fa.save(generator)
-            return json_response(model_to_dict(generator))
+            get_cache(ctx).put("generator", generator)
+            return json_response(with_warnings(model_to_dict(generator), warnings))
         except Exception as e:
             return error_response(e)
 
@@ -119,7 +164,7 @@ def register(mcp: FastMCP) -> None:
         payment_method: str | None = None,
         note: str | None = None,
         lines: list[dict] | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Update an existing invoice generator (template).
 
         Args:
@@ -132,6 +177,7 @@ def register(mcp: FastMCP) -> None:
             lines: Replacement line items (replaces all existing lines)
         """
         try:
+            warnings = validate_lines(ctx, lines, currency, payment_method)
             fa = get_client(ctx)
             generator = fa.generator(generator_id)
             if name is not None:
@@ -145,14 +191,15 @@ def register(mcp: FastMCP) -> None:
             if note is not None:
                 generator.note = note
             if lines is not None:
-                generator.lines = [InvoiceLine(**line) for line in lines]
+                generator.lines = [InvoiceLine(**writable_line(line)) for line in lines]
             fa.save(generator)
-            return json_response(model_to_dict(generator))
+            get_cache(ctx).put("generator", generator)
+            return json_response(with_warnings(model_to_dict(generator), warnings))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def delete_generator(ctx: Context, generator_id: int) -> str:
+    def delete_generator(ctx: Context, generator_id: int) -> ToolResult:
         """Delete an invoice generator (template) by ID.
 
         Args:
@@ -161,6 +208,7 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.delete(Generator(id=generator_id))
+            get_cache(ctx).invalidate("generator", generator_id)
             return json_response({"success": True, "deleted_id": generator_id})
         except Exception as e:
             return error_response(e)
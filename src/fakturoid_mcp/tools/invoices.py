@@ -1,15 +1,58 @@
 """Invoice tools for Fakturoid MCP server."""
 
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from decimal import Decimal
+from functools import partial
+
+import anyio
 from fakturoid import Invoice, InvoiceLine, InvoiceMessage, InvoicePayment
 from mcp.server.fastmcp import Context, FastMCP
 
+from fakturoid_mcp.pdfs import place
+from fakturoid_mcp.reconcile import (
+    PaymentMatcher,
+    parse_statement,
+    transaction_from_dict,
+    transaction_keys,
+)
 from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
+    account_settings,
+    collect,
     error_response,
+    expand_documents,
+    export_path,
+    fetch_many,
+    get_attachments,
+    get_cache,
     get_client,
+    get_metadata,
+    get_payments,
+    get_pdfs,
+    get_rate_limiter,
+    get_search,
+    get_snapshot,
     json_response,
+    load_entity,
     model_to_dict,
     parse_date,
+    run_or_submit,
+    serialize_list,
+    snapshot_records,
+    stale_list,
+    submit_write,
+    validate_lines,
+    with_warnings,
 )
+from fakturoid_mcp.validation import NON_VAT_PAYER, compute_totals, writable_line
+
+UNSAFE_FILENAME_CHARS = re.compile(r"[^\w.-]+")
+
+UNPAID_STATUSES = ("open", "sent", "overdue")
 
 
 def register(mcp: FastMCP) -> None:
@@ -25,7 +68,13 @@ def register(mcp: FastMCP) -> None:
         status: str | None = None,
         custom_id: str | None = None,
         proforma: bool | None = None,
-    ) -> str:
+        expand: list[str] | None = None,
+        max_items: int | None = None,
+        max_bytes: int | None = None,
+        cursor: str | None = None,
+        snapshot_id: str | None = None,
+        background: bool = False,
+    ) -> ListToolResult:
         """List invoices with optional filters.
 
         Args:
@@ -36,6 +85,15 @@ def register(mcp: FastMCP) -> None:
             status: Filter by status (open, sent, overdue, paid, cancelled)
             custom_id: Filter by custom identifier
             proforma: True for proforma invoices, False for regular
+            expand: Related data to embed, e.g. ["subject"] to include each client's details
+            max_items: Return at most this many records
+            max_bytes: Stop adding records once the JSON result would exceed this size;
+                       cut results include next_cursor and a summary of omitted records
+            cursor: next_cursor from a previous budgeted call with the same filters
+            snapshot_id: Read from this snapshot (see begin_snapshot); the list is fixed
+                         by its first call with the same filters
+            background: Run as a background job and return its job ID immediately;
+                        fetch the data later with get_job_result
         """
         try:
             fa = get_client(ctx)
@@ -54,27 +112,84 @@ def register(mcp: FastMCP) -> None:
                 kwargs["custom_id"] = custom_id
             if proforma is not None:
                 kwargs["proforma"] = proforma
-            invoices = list(fa.invoices(**kwargs))
-            return json_response([model_to_dict(i) for i in invoices])
+            snapshot = get_snapshot(ctx, snapshot_id)
+
+            def serialize(page):
+                return expand_documents(ctx, [model_to_dict(i) for i in page], expand, snapshot)
+
+            def fetch(job):
+                filters = {**kwargs, "expand": expand}
+                try:
+                    if snapshot is not None:
+                        items = snapshot_records(
+                            ctx,
+                            snapshot,
+                            "invoice",
+                            kwargs,
+                            lambda: fa.invoices(**kwargs),
+                            fa.invoice,
+                            job,
+                        )
+                    else:
+                        items = fa.invoices(**kwargs)
+                    return serialize_list(
+                        items, serialize, filters, job, max_items, max_bytes, cursor
+                    )
+                except Exception as e:
+                    return stale_list(ctx, "invoice", filters, serialize, e, max_items)
+
+            return run_or_submit(ctx, "list_invoices", background, fetch)
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def get_invoice(ctx: Context, invoice_id: int) -> str:
+    def get_invoice(
+        ctx: Context,
+        invoice_id: int,
+        expand: list[str] | None = None,
+        snapshot_id: str | None = None,
+    ) -> ToolResult:
         """Get a single invoice by ID.
 
         Args:
             invoice_id: The invoice ID
+            expand: Related data to embed, e.g. ["subject"] to include the client's details
+            snapshot_id: Read from this snapshot (see begin_snapshot)
         """
         try:
             fa = get_client(ctx)
-            invoice = fa.invoice(invoice_id)
-            return json_response(model_to_dict(invoice))
+            snapshot = get_snapshot(ctx, snapshot_id)
+            if snapshot is not None:
+                invoice = snapshot.load("invoice", invoice_id, fa.invoice).to_dict()
+            else:
+                invoice = load_entity(ctx, "invoice", invoice_id, fa.invoice)
+            return json_response(expand_documents(ctx, [invoice], expand, snapshot)[0])
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def create_invoice(
+    def get_invoices(
+        ctx: Context, invoice_ids: list[int], snapshot_id: str | None = None
+    ) -> ListToolResult:
+        """Get multiple invoices by ID in one call.
+
+        Cached invoices are returned directly; the rest are fetched concurrently.
+        Results keep the input order. IDs that cannot be loaded return
+        {"id": ..., "error": ...} instead of failing the whole call.
+
+        Args:
+            invoice_ids: List of invoice IDs
+            snapshot_id: Read from this snapshot (see begin_snapshot)
+        """
+        try:
+            fa = get_client(ctx)
+            snapshot = get_snapshot(ctx, snapshot_id)
+            return json_response(fetch_many(ctx, "invoice", invoice_ids, fa.invoice, snapshot))
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def create_invoice(
         ctx: Context,
         subject_id: int,
         lines: list[dict],
@@ -88,9 +203,15 @@ def register(mcp: FastMCP) -> None:
         custom_id: str | None = None,
         order_number: str | None = None,
         tags: list[str] | None = None,
-    ) -> str:
+        attachments: list[str] | None = None,
+        idempotency_key: str | None = None,
+        wait: float = 30,
+    ) -> ToolResult:
         """Create a new invoice.
 
+        The request is stored in a durable write queue before being sent, so
+        retrying with the same idempotency_key never creates a second invoice.
+
         Args:
             subject_id: Client subject ID (required)
             lines: List of line items, each with keys: name (str), quantity (number),
@@ -105,20 +226,29 @@ def register(mcp: FastMCP) -> None:
             custom_id: Custom identifier
             order_number: Order number
             tags: List of tags
+            attachments: Files to attach: upload IDs returned by POST /uploads (HTTP
+                         transport) or paths inside the server's attachment directory;
+                         streamed from disk after the invoice is created, identical files
+                         are sent once
+            idempotency_key: Unique key for this request (defaults to custom_id, else generated);
+                             stored as the invoice's custom_id unless one is given
+            wait: Seconds to wait for the invoice to be saved; if it is not saved by then
+                  (or wait is 0), the queued write's status is returned instead
         """
         try:
-            fa = get_client(ctx)
-            invoice_lines = [InvoiceLine(**line) for line in lines]
+            warnings = await anyio.to_thread.run_sync(
+                partial(validate_lines, ctx, lines, currency, payment_method)
+            )
             kwargs: dict = {
                 "subject_id": subject_id,
-                "lines": invoice_lines,
+                "lines": lines,
             }
             if due is not None:
                 kwargs["due"] = due
             if issued_on:
-                kwargs["issued_on"] = parse_date(issued_on)
+                kwargs["issued_on"] = parse_date(issued_on).isoformat()
             if taxable_fulfillment_due:
-                kwargs["taxable_fulfillment_due"] = parse_date(taxable_fulfillment_due)
+                kwargs["taxable_fulfillment_due"] = parse_date(taxable_fulfillment_due).isoformat()
             if currency:
                 kwargs["currency"] = currency
             if payment_method:
@@ -133,9 +263,59 @@ def register(mcp: FastMCP) -> None:
                 kwargs["order_number"] = order_number
             if tags:
                 kwargs["tags"] = tags
-            invoice = Invoice(**kwargs)
-            fa.save(invoice)
-            return json_response(model_to_dict(invoice))
+            if attachments:
+                kwargs["attachments"] = await anyio.to_thread.run_sync(
+                    get_attachments(ctx).resolve, attachments
+                )
+            return await submit_write(ctx, "invoice", kwargs, idempotency_key, wait, warnings)
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def preview_invoice(
+        ctx: Context,
+        lines: list[dict],
+        currency: str | None = None,
+        vat_price_mode: str | None = None,
+        round_total: bool = False,
+        exchange_rate: str | None = None,
+    ) -> ToolResult:
+        """Validate invoice lines and compute the totals Fakturoid would, without creating it.
+
+        Lines without vat_rate use the account's default rate. Amounts are decimal strings.
+
+        Args:
+            lines: List of line items, each with keys: name (str), quantity (number),
+                   unit_name (str), unit_price (number), vat_rate (number)
+            currency: Currency code (defaults to the account currency)
+            vat_price_mode: without_vat (unit prices exclude VAT) or from_total_with_vat
+                            (unit prices include VAT); defaults to the account setting
+            round_total: Round the total to whole currency units
+            exchange_rate: Exchange rate to the account currency, for native totals
+        """
+        try:
+            warnings = validate_lines(ctx, lines, currency, vat_price_mode=vat_price_mode)
+            account = account_settings(ctx)
+            defaults = account.to_dict() if account is not None else {}
+            vat_price_mode = vat_price_mode or defaults.get("vat_price_mode") or "without_vat"
+            totals = compute_totals(
+                lines,
+                vat_price_mode=vat_price_mode,
+                vat_payer=defaults.get("vat_mode") != NON_VAT_PAYER,
+                default_vat_rate=defaults.get("vat_rate") or 0,
+                round_total=round_total,
+                exchange_rate=exchange_rate,
+            )
+            return json_response(
+                with_warnings(
+                    {
+                        "currency": currency or defaults.get("currency"),
+                        "vat_price_mode": vat_price_mode,
+                        **totals,
+                    },
+                    warnings,
+                )
+            )
         except Exception as e:
             return error_response(e)
 
@@ -150,7 +330,7 @@ def register(mcp: FastMCP) -> None:
         custom_id: str | None = None,
         order_number: str | None = None,
         lines: list[dict] | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Update an existing invoice.
 
         Args:
@@ -164,6 +344,7 @@ def register(mcp: FastMCP) -> None:
             lines: Replacement line items (replaces all existing lines)
         """
         try:
+            warnings = validate_lines(ctx, lines, currency, payment_method)
             fa = get_client(ctx)
             invoice = fa.invoice(invoice_id)
             if due is not None:
@@ -179,14 +360,15 @@ def register(mcp: FastMCP) -> None:
             if order_number is not None:
                 invoice.order_number = order_number
             if lines is not None:
-                invoice.lines = [InvoiceLine(**line) for line in lines]
+                invoice.lines = [InvoiceLine(**writable_line(line)) for line in lines]
             fa.save(invoice)
-            return json_response(model_to_dict(invoice))
+            get_cache(ctx).put("invoice", invoice)
+            return json_response(with_warnings(model_to_dict(invoice), warnings))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def delete_invoice(ctx: Context, invoice_id: int) -> str:
+    def delete_invoice(ctx: Context, invoice_id: int) -> ToolResult:
         """Delete an invoice by ID.
 
         Args:
@@ -195,6 +377,8 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.delete(Invoice(id=invoice_id))
+            get_cache(ctx).invalidate("invoice", invoice_id)
+            get_search(ctx).remove("invoice", invoice_id)
             return json_response({"success": True, "deleted_id": invoice_id})
         except Exception as e:
             return error_response(e)
@@ -206,7 +390,7 @@ def register(mcp: FastMCP) -> None:
         event: str,
         paid_on: str | None = None,
         paid_amount: float | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Fire an event on an invoice to change its state.
 
         Args:
@@ -225,6 +409,7 @@ def register(mcp: FastMCP) -> None:
             if paid_amount is not None:
                 kwargs["paid_amount"] = paid_amount
             fa.fire_invoice_event(invoice_id, event, **kwargs)
+            get_cache(ctx).invalidate("invoice", invoice_id)
             return json_response({"success": True, "invoice_id": invoice_id, "event": event})
         except Exception as e:
             return error_response(e)
@@ -237,7 +422,7 @@ def register(mcp: FastMCP) -> None:
         amount: float,
         currency: str | None = None,
         mark_document_as_paid: bool = True,
-    ) -> str:
+    ) -> ToolResult:
         """Record a payment on an invoice.
 
         Args:
@@ -259,12 +444,13 @@ def register(mcp: FastMCP) -> None:
                 kwargs["mark_document_as_paid"] = False
             payment = InvoicePayment(**kwargs)
             fa.save(payment, invoice_id=invoice_id)
+            get_cache(ctx).invalidate("invoice", invoice_id)
             return json_response(model_to_dict(payment))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def delete_invoice_payment(ctx: Context, invoice_id: int, payment_id: int) -> str:
+    def delete_invoice_payment(ctx: Context, invoice_id: int, payment_id: int) -> ToolResult:
         """Delete a payment from an invoice.
 
         Args:
@@ -274,6 +460,7 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.delete(InvoicePayment(id=payment_id), invoice_id=invoice_id)
+            get_cache(ctx).invalidate("invoice", invoice_id)
             return json_response({"success": True, "invoice_id": invoice_id, "payment_id": payment_id})
         except Exception as e:
             return error_response(e)
@@ -285,7 +472,7 @@ def register(mcp: FastMCP) -> None:
         email: str,
         email_subject: str | None = None,
         email_body: str | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Send an invoice via email.
 
         Args:
@@ -303,6 +490,206 @@ def register(mcp: FastMCP) -> None:
                 kwargs["body"] = email_body
             message = InvoiceMessage(**kwargs)
             fa.save(message, invoice_id=invoice_id)
+            get_cache(ctx).invalidate("invoice", invoice_id)
             return json_response({"success": True, "invoice_id": invoice_id, "email": email})
         except Exception as e:
             return error_response(e)
+
+    @mcp.tool()
+    async def download_invoice_pdfs(
+        ctx: Context,
+        invoice_ids: list[int],
+        dest_dir: str = "invoices",
+        background: bool = False,
+    ) -> ListToolResult:
+        """Download invoice PDFs to a directory on the server.
+
+        PDFs are fetched concurrently and kept in a local cache keyed by the
+        invoice's updated_at (always loaded fresh from Fakturoid), so repeated
+        runs download only invoices that changed. Files are named by invoice
+        number. Returns one entry per invoice with its path and status
+        (downloaded, cached or unchanged), or {"id": ..., "error": ...} if it
+        could not be downloaded.
+
+        Args:
+            invoice_ids: List of invoice IDs
+            dest_dir: Target directory, relative to the export directory
+            background: Run as a background job and return its job ID immediately
+        """
+        try:
+            fa = get_client(ctx)
+            pdfs = get_pdfs(ctx)
+            dest = export_path(ctx, dest_dir)
+            settings = ctx.request_context.lifespan_context.settings
+            limiter = get_rate_limiter(ctx)
+            ids = list(dict.fromkeys(invoice_ids))
+
+            def load(invoice_id: int):
+                limiter.acquire()
+                return fa.invoice(invoice_id)
+
+            def save(invoice: dict, job) -> dict:
+                if job is not None:
+                    job.check_cancelled()
+                name = UNSAFE_FILENAME_CHARS.sub("_", invoice.get("number") or str(invoice["id"]))
+                blob, downloaded = pdfs.fetch(invoice["id"], invoice.get("updated_at"))
+                path = dest / f"{name}.pdf"
+                written = place(blob, path)
+                status = "downloaded" if downloaded else "cached" if written else "unchanged"
+                return {
+                    "id": invoice["id"],
+                    "number": invoice.get("number"),
+                    "path": str(path),
+                    "bytes": path.stat().st_size,
+                    "status": status,
+                }
+
+            def download(job):
+                # Cached invoices may predate a change, so updated_at is loaded fresh.
+                invoices = fetch_many(ctx, "invoice", ids, load, refresh=True)
+                dest.mkdir(parents=True, exist_ok=True)
+                results = {}
+                with ThreadPoolExecutor(max_workers=settings.max_concurrency) as pool:
+                    futures = {}
+                    for invoice_id, invoice in zip(ids, invoices):
+                        if "error" in invoice:
+                            results[invoice_id] = invoice
+                        else:
+                            futures[pool.submit(save, invoice, job)] = invoice_id
+                    for future in as_completed(futures):
+                        invoice_id = futures[future]
+                        try:
+                            results[invoice_id] = future.result()
+                        except Exception as e:
+                            results[invoice_id] = {"id": invoice_id, "error": str(e)}
+                        if job is not None:
+                            job.report(len(results), len(ids), f"{len(results)} PDFs processed")
+                pdfs.save_index()
+                if job is not None:
+                    job.check_cancelled()
+                return [results[invoice_id] for invoice_id in ids]
+
+            return await anyio.to_thread.run_sync(
+                run_or_submit, ctx, "download_invoice_pdfs", background, download
+            )
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def reconcile_payments(
+        ctx: Context,
+        statement: str | None = None,
+        format: str | None = None,
+        transactions: list[dict] | None = None,
+        match_by_amount: bool = True,
+        dry_run: bool = False,
+        background: bool = False,
+    ) -> ToolResult:
+        """Match bank transactions to unpaid invoices and record the payments.
+
+        Transactions are matched by variable symbol (exact, partial and
+        overpayments), then by a variable symbol in the payment message, then by
+        a unique open invoice with the same amount and currency. Matched payments
+        are recorded concurrently. Returns the matches, the payments recorded and
+        every transaction that could not be matched, with the reason.
+
+        Recorded transactions are remembered (by bank reference, or by their
+        contents when there is none), so running the same statement again skips
+        them and reports them as already recorded.
+
+        Args:
+            statement: Bank statement content, CSV (with a header row) or ABO/GPC
+            format: Statement format: csv or gpc (detected automatically if omitted)
+            transactions: Transactions as a list of dicts instead of a statement, each with
+                          keys: amount, currency, paid_on (YYYY-MM-DD), variable_symbol,
+                          message, counterparty, reference
+            match_by_amount: Allow matching by amount alone when no variable symbol matches
+            dry_run: Only report matches, do not record any payments
+            background: Run as a background job and return its job ID immediately
+        """
+        try:
+            if (statement is None) == (transactions is None):
+                raise ValueError("Provide either statement or transactions")
+            if statement is not None:
+                parsed = parse_statement(statement, format)
+            else:
+                parsed = [transaction_from_dict(t) for t in transactions]
+            fa = get_client(ctx)
+            cache = get_cache(ctx)
+            limiter = get_rate_limiter(ctx)
+            ledger = get_payments(ctx)
+            settings = ctx.request_context.lifespan_context.settings
+            keys = dict(zip(map(id, parsed), transaction_keys(parsed)))
+
+            def record(tx, allocation: dict, job) -> None:
+                if job is not None:
+                    job.check_cancelled()
+                limiter.acquire()
+                payment = InvoicePayment(
+                    paid_on=tx.paid_on or date.today(), amount=Decimal(allocation["amount"])
+                )
+                fa.save(payment, invoice_id=allocation["invoice_id"])
+                ledger.add(keys[id(tx)], allocation["invoice_id"], payment.id, allocation["amount"])
+                cache.invalidate("invoice", allocation["invoice_id"])
+                allocation["payment_id"] = payment.id
+
+            def reconcile(job):
+                with ThreadPoolExecutor(max_workers=len(UNPAID_STATUSES)) as pool:
+                    pages = pool.map(lambda s: collect(fa.invoices(status=s)), UNPAID_STATUSES)
+                    invoices = cache.put_many("invoice", [i for page in pages for i in page])
+                currency = get_metadata(ctx).account().get("currency")
+                recorded = ledger.recorded(
+                    [keys[id(tx)] for tx in parsed], {i.get("id"): i for i in invoices}
+                )
+                fresh = [tx for tx in parsed if keys[id(tx)] not in recorded]
+                matcher = PaymentMatcher(invoices, currency, match_by_amount)
+                matches, unmatched = matcher.reconcile(fresh)
+
+                allocations = [(m["transaction"], a) for m in matches for a in m["allocations"]]
+                for _, allocation in allocations:
+                    del allocation["units"]
+                    allocation["status"] = "matched" if dry_run else "pending"
+                if not dry_run and allocations:
+                    with ThreadPoolExecutor(max_workers=settings.max_concurrency) as pool:
+                        futures = {
+                            pool.submit(record, tx, allocation, job): allocation
+                            for tx, allocation in allocations
+                        }
+                        for n, future in enumerate(as_completed(futures), start=1):
+                            allocation = futures[future]
+                            try:
+                                future.result()
+                                allocation["status"] = "recorded"
+                            except Exception as e:
+                                allocation.update(status="failed", error=str(e))
+                            if job is not None:
+                                job.report(n, len(futures), f"{n} payments recorded")
+                    if job is not None:
+                        job.check_cancelled()
+
+                statuses = Counter(a["status"] for _, a in allocations)
+                return {
+                    "summary": {
+                        "transactions": len(parsed),
+                        "matched": len(matches),
+                        "unmatched": len(unmatched),
+                        "already_recorded": len(parsed) - len(fresh),
+                        "by_method": dict(Counter(m["method"] for m in matches)),
+                        "payments": dict(statuses),
+                    },
+                    "matches": [{**m, "transaction": m["transaction"].to_dict()} for m in matches],
+                    "unmatched": [
+                        {**u, "transaction": u["transaction"].to_dict()} for u in unmatched
+                    ],
+                    "already_recorded": [
+                        {"transaction": tx.to_dict(), "payments": recorded[keys[id(tx)]]}
+                        for tx in parsed
+                        if keys[id(tx)] in recorded
+                    ],
+                }
+
+            return await anyio.to_thread.run_sync(
+                run_or_submit, ctx, "reconcile_payments", background, reconcile
+            )
+        except Exception as e:
+            return error_response(e)
@@ -0,0 +1,78 @@
+"""Background job tools for Fakturoid MCP server."""
+
+import time
+
+import anyio
+from mcp.server.fastmcp import Context, FastMCP
+
+from fakturoid_mcp.jobs import FINISHED_STATES
+from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
+    error_response,
+    get_jobs,
+    json_response,
+)
+
+POLL_INTERVAL = 0.5
+
+
+def register(mcp: FastMCP) -> None:
+    """Register job tools."""
+
+    @mcp.tool()
+    def list_jobs(ctx: Context) -> ListToolResult:
+        """List background jobs (running and recently finished)."""
+        try:
+            return json_response([job.to_dict() for job in get_jobs(ctx).list()])
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def get_job_status(ctx: Context, job_id: str) -> ToolResult:
+        """Get the state and progress of a background job.
+
+        Args:
+            job_id: The job ID returned when the job was started
+        """
+        try:
+            return json_response(get_jobs(ctx).get(job_id).to_dict())
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def get_job_result(ctx: Context, job_id: str, wait: float = 0) -> ToolResult:
+        """Get the result of a background job, optionally waiting for it to finish.
+
+        While waiting, progress is reported as MCP progress notifications.
+
+        Args:
+            job_id: The job ID returned when the job was started
+            wait: Maximum number of seconds to wait for the job to finish
+        """
+        try:
+            job = get_jobs(ctx).get(job_id)
+            deadline = time.monotonic() + wait
+            reported = None
+            while job.state not in FINISHED_STATES and time.monotonic() < deadline:
+                if (job.progress, job.total) != reported:
+                    reported = (job.progress, job.total)
+                    await ctx.report_progress(job.progress, job.total, job.message)
+                await anyio.sleep(min(POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            return json_response(job.to_dict(include_result=True))
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def cancel_job(ctx: Context, job_id: str) -> ToolResult:
+        """Cancel a background job.
+
+        Pending jobs never start; running jobs stop before their next Fakturoid API request.
+
+        Args:
+            job_id: The job ID to cancel
+        """
+        try:
+            return json_response(get_jobs(ctx).cancel(job_id).to_dict())
+        except Exception as e:
+            return error_response(e)
@@ -0,0 +1,44 @@
+"""Snapshot tools for consistent multi-call reads."""
+
+from mcp.server.fastmcp import Context, FastMCP
+
+from fakturoid_mcp.tools._helpers import (
+    ToolResult,
+    error_response,
+    get_cache,
+    json_response,
+)
+
+
+def register(mcp: FastMCP) -> None:
+    """Register snapshot tools."""
+
+    @mcp.tool()
+    def begin_snapshot(ctx: Context) -> ToolResult:
+        """Start a snapshot for reading consistent data across several calls.
+
+        Pass the returned snapshot_id to list_invoices, get_invoice(s), list_expenses
+        and get_expense(s). Within the snapshot each entity keeps the version it
+        had when the snapshot first saw it, and each list keeps the result of its
+        first call with the same filters, even if the data changes meanwhile.
+        Entities cached within the cache TTL are served without calling Fakturoid;
+        older cached copies are fetched again on first use. The snapshot
+        expires after a period without use; end it with end_snapshot when done.
+        """
+        try:
+            return json_response(get_cache(ctx).begin_snapshot().to_dict())
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def end_snapshot(ctx: Context, snapshot_id: str) -> ToolResult:
+        """End a snapshot and release the data it kept.
+
+        Args:
+            snapshot_id: The snapshot ID returned by begin_snapshot
+        """
+        try:
+            snapshot = get_cache(ctx).end_snapshot(snapshot_id)
+            return json_response({"success": True, **snapshot.to_dict()})
+        except Exception as e:
+            return error_response(e)
@@ -4,13 +4,24 @@ from fakturoid import Subject
 from mcp.server.fastmcp import Context, FastMCP
 
 from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
     error_response,
+    fetch_many,
+    get_cache,
     get_client,
     json_response,
+    load_entity,
     model_to_dict,
     parse_date,
+    run_or_submit,
+    serialize_list,
+    stale_list,
 )
 
+SEARCH_FIELDS = ("name", "full_name", "email", "registration_no", "vat_no")
+"""Subject fields matched by search_subjects when it answers from the cache."""
+
 
 def register(mcp: FastMCP) -> None:
     """Register subject tools."""
@@ -21,13 +32,23 @@ def register(mcp: FastMCP) -> None:
         since: str | None = None,
         updated_since: str | None = None,
         custom_id: str | None = None,
-    ) -> str:
+        max_items: int | None = None,
+        max_bytes: int | None = None,
+        cursor: str | None = None,
+        background: bool = False,
+    ) -> ListToolResult:
         """List all subjects (contacts/clients) in Fakturoid.
 
         Args:
             since: Return subjects created since this date (YYYY-MM-DD)
             updated_since: Return subjects updated since this date (YYYY-MM-DD)
             custom_id: Filter by custom identifier
+            max_items: Return at most this many records
+            max_bytes: Stop adding records once the JSON result would exceed this size;
+                       cut results include next_cursor and a summary of omitted records
+            cursor: next_cursor from a previous budgeted call with the same filters
+            background: Run as a background job and return its job ID immediately;
+                        fetch the data later with get_job_result
         """
         try:
             fa = get_client(ctx)
@@ -38,27 +59,52 @@ def register(mcp: FastMCP) -> None:
                 kwargs["updated_since"] = parse_date(updated_since)
             if custom_id:
                 kwargs["custom_id"] = custom_id
-            subjects = list(fa.subjects(**kwargs))
-            return json_response([model_to_dict(s) for s in subjects])
+
+            def serialize(page):
+                return [model_to_dict(s) for s in page]
+
+            def fetch(job):
+                try:
+                    items = fa.subjects(**kwargs)
+                    return serialize_list(
+                        items, serialize, kwargs, job, max_items, max_bytes, cursor
+                    )
+                except Exception as e:
+                    return stale_list(ctx, "subject", kwargs, serialize, e, max_items)
+
+            return run_or_submit(ctx, "list_subjects", background, fetch)
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def search_subjects(ctx: Context, query: str) -> str:
+    def search_subjects(ctx: Context, query: str) -> ListToolResult:
         """Full-text search for subjects (contacts/clients).
 
+        While Fakturoid is unavailable, cached subjects whose name, email or
+        registration numbers contain the query are returned, marked stale.
+
         Args:
             query: Search query string
         """
         try:
             fa = get_client(ctx)
-            subjects = fa.subjects.search(query)
-            return json_response([model_to_dict(s) for s in subjects])
+            needle = query.casefold()
+
+            def serialize(page):
+                return [model_to_dict(s) for s in page]
+
+            def contains(record) -> bool:
+                return any(needle in str(record.get(f) or "").casefold() for f in SEARCH_FIELDS)
+
+            try:
+                return json_response(serialize(fa.subjects.search(query)))
+            except Exception as e:
+                return json_response(stale_list(ctx, "subject", {}, serialize, e, match=contains))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def get_subject(ctx: Context, subject_id: int) -> str:
+    def get_subject(ctx: Context, subject_id: int) -> ToolResult:
         """Get a single subject (contact/client) by ID.
 
         Args:
@@ -66,8 +112,24 @@ def register(mcp: FastMCP) -> None:
         """
         try:
             fa = get_client(ctx)
-            subject = fa.subject(subject_id)
-            return json_response(model_to_dict(subject))
+            return json_response(load_entity(ctx, "subject", subject_id, fa.subject))
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    def get_subjects(ctx: Context, subject_ids: list[int]) -> ListToolResult:
+        """Get multiple subjects (contacts/clients) by ID in one call.
+
+        Cached subjects are returned directly; the rest are fetched concurrently.
+        Results keep the input order. IDs that cannot be loaded return
+        {"id": ..., "error": ...} instead of failing the whole call.
+
+        Args:
+            subject_ids: List of subject IDs
+        """
+        try:
+            fa = get_client(ctx)
+            return json_response(fetch_many(ctx, "subject", subject_ids, fa.subject))
         except Exception as e:
             return error_response(e)
 
@@ -86,7 +148,7 @@ def register(mcp: FastMCP) -> None:
         web: str | None = None,
         full_name: str | None = None,
         custom_id: str | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Create a new subject (contact/client).
 
         Args:
@@ -130,6 +192,7 @@ def register(mcp: FastMCP) -> None:
                 kwargs["custom_id"] = custom_id
             subject = Subject(**kwargs)
             fa.save(subject)
+            get_cache(ctx).put("subject", subject)
             return json_response(model_to_dict(subject))
         except Exception as e:
             return error_response(e)
@@ -149,7 +212,7 @@ def register(mcp: FastMCP) -> None:
         phone: str | None = None,
         web: str | None = None,
         full_name: str | None = None,
-    ) -> str:
+    ) -> ToolResult:
         """Update an existing subject (contact/client).
 
         Args:
@@ -186,12 +249,13 @@ def register(mcp: FastMCP) -> None:
                 if value is not None:
                     setattr(subject, key, value)
             fa.save(subject)
+            get_cache(ctx).put("subject", subject)
             return json_response(model_to_dict(subject))
         except Exception as e:
             return error_response(e)
 
     @mcp.tool()
-    def delete_subject(ctx: Context, subject_id: int) -> str:
+    def delete_subject(ctx: Context, subject_id: int) -> ToolResult:
         """Delete a subject (contact/client) by ID.
 
         Args:
@@ -200,6 +264,7 @@ def register(mcp: FastMCP) -> None:
         try:
             fa = get_client(ctx)
             fa.delete(Subject(id=subject_id))
+            get_cache(ctx).invalidate("subject", subject_id)
             return json_response({"success": True, "deleted_id": subject_id})
         except Exception as e:
             return error_response(e)
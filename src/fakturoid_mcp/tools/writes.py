@@ -0,0 +1,49 @@
+"""Write queue tools for Fakturoid MCP server."""
+
+import anyio
+from mcp.server.fastmcp import Context, FastMCP
+
+from fakturoid_mcp.tools._helpers import (
+    ListToolResult,
+    ToolResult,
+    error_response,
+    get_writes,
+    json_response,
+)
+
+
+def register(mcp: FastMCP) -> None:
+    """Register write queue tools."""
+
+    @mcp.tool()
+    def list_writes(ctx: Context, state: str | None = None, limit: int = 100) -> ListToolResult:
+        """List queued invoice/expense creations, newest first.
+
+        Args:
+            state: Filter by state (pending, running, done, failed)
+            limit: Maximum number of writes to return
+        """
+        try:
+            return json_response(get_writes(ctx).list(state, limit))
+        except Exception as e:
+            return error_response(e)
+
+    @mcp.tool()
+    async def get_write_status(
+        ctx: Context, kind: str, idempotency_key: str, wait: float = 0
+    ) -> ToolResult:
+        """Get the state of a queued creation, optionally waiting for it to finish.
+
+        Finished writes carry the created document as result, failed ones the error.
+
+        Args:
+            kind: Document kind (invoice or expense)
+            idempotency_key: The idempotency key returned by create_invoice/create_expense
+            wait: Maximum number of seconds to wait for the write to finish
+        """
+        try:
+            writes = get_writes(ctx)
+            status = await anyio.to_thread.run_sync(writes.wait, kind, idempotency_key, wait)
+            return json_response(status)
+        except Exception as e:
+            return error_response(e)
@@ -0,0 +1,242 @@
+"""Local validation and total computation for document lines.
+
+Invoices, expenses and generators are checked before any API request so that
+malformed payloads fail immediately instead of costing a round trip (and rate
+limit budget). VAT rates outside the configured standard rates are legitimate
+(OSS, foreign VAT), so they only produce warnings. Totals follow Fakturoid's
+per-VAT-rate method: line prices are rounded to hundredths, VAT is computed
+once per rate from the summed line prices, and all rounding is half-up.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+CURRENCIES = frozenset(
+    """
+    AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BHD BIF BMD BND BOB BRL BSD
+    BTN BWP BYN BZD CAD CDF CHF CLP CNY COP CRC CUP CVE CZK DJF DKK DOP DZD EGP ERN ETB
+    EUR FJD FKP GBP GEL GHS GIP GMD GNF GTQ GYD HKD HNL HTG HUF IDR ILS INR IQD IRR ISK
+    JMD JOD JPY KES KGS KHR KMF KPW KRW KWD KYD KZT LAK LBP LKR LRD LSL LYD MAD MDL MGA
+    MKD MMK MNT MOP MRU MUR MVR MWK MXN MYR MZN NAD NGN NIO NOK NPR NZD OMR PAB PEN PGK
+    PHP PKR PLN PYG QAR RON RSD RUB RWF SAR SBD SCR SDG SEK SGD SHP SLE SOS SRD SSP STN
+    SVC SYP SZL THB TJS TMT TND TOP TRY TTD TWD TZS UAH UGX USD UYU UZS VES VND VUV WST
+    XAF XCD XOF XPF YER ZAR ZMW ZWL
+    """.split()
+)
+"""ISO 4217 currency codes accepted by Fakturoid."""
+
+PAYMENT_METHODS = ("bank", "cash", "cod", "card", "paypal", "custom")
+VAT_PRICE_MODES = ("without_vat", "from_total_with_vat")
+NON_VAT_PAYER = "non_vat_payer"
+
+CENT = Decimal("0.01")
+
+LINE_FIELDS = {
+    "id": int,
+    "name": str,
+    "quantity": Decimal,
+    "unit_name": str,
+    "unit_price": Decimal,
+    "vat_rate": Decimal,
+    "inventory_item_id": int,
+    "sku": str,
+}
+"""Writable line fields and their expected types."""
+
+READONLY_LINE_FIELDS = frozenset(
+    {
+        "unit_price_without_vat",
+        "unit_price_with_vat",
+        "total_price_without_vat",
+        "total_vat",
+        "total_price_with_vat",
+        "native_total_price_without_vat",
+        "native_total_vat",
+        "native_total_price_with_vat",
+        "vat_rate_summary",
+        "inventory",
+    }
+)
+"""Computed line fields Fakturoid returns; ignored so lines from a document can be reused."""
+
+
+def to_decimal(value) -> Decimal:
+    """Convert a JSON number or numeric string to a finite Decimal; raises ValueError."""
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    try:
+        number = Decimal(str(value).strip()) if isinstance(value, (int, float, str)) else None
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValueError("expected a number")
+    return number
+
+
+def money(value: Decimal) -> Decimal:
+    """Round to hundredths, half-up."""
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def check_line(line, vat_payer: bool = True) -> list[str]:
+    """Return the problems of one line item (empty if it is valid)."""
+    if not isinstance(line, dict):
+        return ["must be an object"]
+    errors = [
+        f"unknown field {key!r}"
+        for key in line
+        if key not in LINE_FIELDS and key not in READONLY_LINE_FIELDS
+    ]
+    for key in ("name", "unit_price"):
+        if line.get(key) in (None, ""):
+            errors.append(f"{key} is required")
+    for key, expected in LINE_FIELDS.items():
+        value = line.get(key)
+        if value is None:
+            continue
+        if expected is Decimal:
+            try:
+                to_decimal(value)
+            except ValueError as e:
+                errors.append(f"{key}: {e}, got {value!r}")
+        elif not isinstance(value, expected) or isinstance(value, bool):
+            errors.append(f"{key}: expected {expected.__name__}, got {value!r}")
+    if line.get("vat_rate") is not None and not any(e.startswith("vat_rate") for e in errors):
+        rate = to_decimal(line["vat_rate"])
+        if not vat_payer and rate:
+            errors.append(f"vat_rate: {rate} not allowed, the account is not a VAT payer")
+    return errors
+
+
+def writable_line(line: dict) -> dict:
+    """Return the fields of a validated line to send to Fakturoid.
+
+    Read-only fields are dropped, and so are null fields, so that they fall
+    back to their defaults (quantity 1, the account's VAT rate) as in
+    ``compute_totals``.
+    """
+    return {key: value for key, value in line.items() if key in LINE_FIELDS and value is not None}
+
+
+def validate_document(
+    lines: list | None,
+    vat_rates: frozenset[Decimal] | None = None,
+    vat_payer: bool = True,
+    currency: str | None = None,
+    payment_method: str | None = None,
+    vat_price_mode: str | None = None,
+) -> list[str]:
+    """Check a document's lines and enum fields; raises ValueError listing every problem.
+
+    Returns warnings for line VAT rates not in ``vat_rates`` (not checked when None).
+    """
+    errors = []
+    warnings = []
+    if lines is not None:
+        if not lines:
+            errors.append("lines: at least one line is required")
+        for n, line in enumerate(lines):
+            problems = check_line(line, vat_payer)
+            errors.extend(f"lines[{n}].{e}" for e in problems)
+            if vat_rates is None or problems or line.get("vat_rate") is None:
+                continue
+            rate = to_decimal(line["vat_rate"])
+            if rate not in vat_rates:
+                standard = ", ".join(f"{r:f}" for r in sorted(vat_rates))
+                warnings.append(f"lines[{n}].vat_rate: {rate} is not a standard rate ({standard})")
+    if currency is not None and currency not in CURRENCIES:
+        errors.append(f"currency: unknown currency code {currency!r}")
+    if payment_method is not None and payment_method not in PAYMENT_METHODS:
+        errors.append(f"payment_method: must be one of {', '.join(PAYMENT_METHODS)}")
+    if vat_price_mode is not None and vat_price_mode not in VAT_PRICE_MODES:
+        errors.append(f"vat_price_mode: must be one of {', '.join(VAT_PRICE_MODES)}")
+    if errors:
+        raise ValueError("Invalid document: " + "; ".join(errors))
+    return warnings
+
+
+def compute_totals(
+    lines: list[dict],
+    vat_price_mode: str = "without_vat",
+    vat_payer: bool = True,
+    default_vat_rate=0,
+    round_total: bool = False,
+    exchange_rate=None,
+) -> dict:
+    """Compute line and document totals from validated lines without calling the API.
+
+    With ``without_vat`` unit prices exclude VAT and VAT is added per rate; with
+    ``from_total_with_vat`` they include it and VAT is extracted per rate.
+    Amounts are returned as decimal strings, like Fakturoid's own totals.
+    """
+    computed = []
+    by_rate: dict[Decimal, Decimal] = {}
+    for line in lines:
+        # Optional fields given as null fall back to their defaults, as when omitted.
+        quantity = to_decimal(_default(line.get("quantity"), 1))
+        unit_price = to_decimal(line["unit_price"])
+        rate = _default(line.get("vat_rate"), default_vat_rate)
+        rate = to_decimal(rate) if vat_payer else Decimal(0)
+        price = money(quantity * unit_price)
+        by_rate[rate] = by_rate.get(rate, Decimal(0)) + price
+        computed.append(
+            {
+                "name": line["name"],
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "vat_rate": rate,
+                "price": price,
+            }
+        )
+
+    summary = []
+    for rate, price in sorted(by_rate.items()):
+        if vat_price_mode == "from_total_with_vat":
+            vat = money(price * rate / (100 + rate))
+            base = price - vat
+        else:
+            base = price
+            vat = money(price * rate / 100)
+        summary.append({"vat_rate": rate, "base": base, "vat": vat, "total": base + vat})
+
+    subtotal = sum((s["base"] for s in summary), Decimal("0.00"))
+    total = sum((s["total"] for s in summary), Decimal("0.00"))
+    result = {
+        "lines": [_line_totals(line, vat_price_mode) for line in computed],
+        "vat_rates_summary": summary,
+        "subtotal": subtotal,
+        "total": total,
+    }
+    if round_total:
+        rounded = total.quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        result["rounding"] = rounded - total
+        result["total"] = rounded.quantize(CENT)
+    if exchange_rate is not None:
+        rate = to_decimal(exchange_rate)
+        result["native_subtotal"] = money(subtotal * rate)
+        result["native_total"] = money(result["total"] * rate)
+    return _stringify(result)
+
+
+def _default(value, default):
+    return default if value is None else value
+
+
+def _line_totals(line: dict, vat_price_mode: str) -> dict:
+    price, rate = line.pop("price"), line["vat_rate"]
+    if vat_price_mode == "from_total_with_vat":
+        vat = money(price * rate / (100 + rate))
+        line.update(total_price_without_vat=price - vat, total_vat=vat, total_price_with_vat=price)
+    else:
+        vat = money(price * rate / 100)
+        line.update(total_price_without_vat=price, total_vat=vat, total_price_with_vat=price + vat)
+    return line
+
+
+def _stringify(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _stringify(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_stringify(item) for item in value]
+    return value
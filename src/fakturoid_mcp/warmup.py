@@ -0,0 +1,148 @@
+"""Background cache warm-up and scheduled refresh of hot data."""
+
+import itertools
+import logging
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import anyio
+from fakturoid import Fakturoid
+
+from fakturoid_mcp.cache import EntityCache
+from fakturoid_mcp.metadata import MetadataCache
+from fakturoid_mcp.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Prefetches hot data into the caches without blocking readiness.
+
+    Every step runs concurrently in a worker thread. After the initial round the
+    same steps are repeated every ``refresh_interval`` seconds to keep the hot
+    sets fresh; metadata is only reloaded once its own (long) TTL has expired.
+    List requests share the API rate limit with bulk tool calls.
+    Progress is exposed through ``status()`` for the health endpoint.
+    """
+
+    def __init__(
+        self,
+        client: Fakturoid,
+        cache: EntityCache,
+        metadata: MetadataCache,
+        rate_limiter: RateLimiter,
+        refresh_interval: float,
+        max_concurrency: int,
+    ):
+        self.client = client
+        self.cache = cache
+        self.metadata = metadata
+        self.rate_limiter = rate_limiter
+        self.refresh_interval = refresh_interval
+        self.max_concurrency = max_concurrency
+        self.state = "pending"
+        self.steps = {name: {"state": "pending"} for name in self._step_functions()}
+        self.started_at: datetime | None = None
+        self.duration: float | None = None
+        self.last_refresh_at: datetime | None = None
+        self.refresh_count = 0
+
+    def _step_functions(self) -> dict[str, Callable[[], int]]:
+        return {
+            "account": self._warm_account,
+            "bank_accounts": self._warm_bank_accounts,
+            "subjects": self._warm_subjects,
+            "open_invoices": lambda: self._warm_invoices("open"),
+            "overdue_invoices": lambda: self._warm_invoices("overdue"),
+            "recurring_generators": self._warm_generators,
+        }
+
+    def _warm_account(self) -> int:
+        self.metadata.account()
+        return 1
+
+    def _warm_bank_accounts(self) -> int:
+        return len(self.metadata.bank_accounts())
+
+    def _warm_subjects(self) -> int:
+        return len(self.cache.replace("subject", self._load(self.client.subjects)))
+
+    def _warm_invoices(self, status: str) -> int:
+        invoices = self._load(lambda: self.client.invoices(status=status))
+        return len(self.cache.put_many("invoice", invoices))
+
+    def _warm_generators(self) -> int:
+        generators = self._load(lambda: self.client.generators(recurring=True))
+        return len(self.cache.put_many("generator", generators))
+
+    def _load(self, request: Callable[[], object]) -> list:
+        """Load every page of a list, taking a rate-limit token per API request.
+
+        Lazy lists request nothing until their first page is loaded, so the
+        token taken for the call covers that page.
+        """
+        self.rate_limiter.acquire()
+        items = request()
+        if not hasattr(items, "get_page"):
+            return list(items)
+        results = []
+        for n in itertools.count():
+            if n:
+                self.rate_limiter.acquire()
+            try:
+                results.extend(items.get_page(n))
+            except IndexError:
+                return results
+
+    def status(self) -> dict:
+        """Return warm-up progress as a JSON-safe dict."""
+        done = sum(1 for step in self.steps.values() if step["state"] in ("done", "failed"))
+        return {
+            "state": self.state,
+            "completed_steps": done,
+            "total_steps": len(self.steps),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "duration": self.duration,
+            "last_refresh_at": self.last_refresh_at.isoformat() if self.last_refresh_at else None,
+            "refresh_count": self.refresh_count,
+            "refresh_interval": self.refresh_interval,
+            "steps": self.steps,
+        }
+
+    async def run(self) -> None:
+        """Warm the cache, then keep refreshing hot sets until cancelled."""
+        self.state = "running"
+        self.started_at = datetime.now(UTC)
+        started = time.monotonic()
+        await self._run_round()
+        self.duration = round(time.monotonic() - started, 3)
+        failed = any(step["state"] == "failed" for step in self.steps.values())
+        self.state = "partial" if failed else "done"
+        logger.info("Cache warm-up finished in %.2fs (%s)", self.duration, self.state)
+
+        if self.refresh_interval <= 0:
+            return
+        while True:
+            await anyio.sleep(self.refresh_interval)
+            await self._run_round()
+            self.refresh_count += 1
+            self.last_refresh_at = datetime.now(UTC)
+
+    async def _run_round(self) -> None:
+        limiter = anyio.CapacityLimiter(self.max_concurrency)
+        async with anyio.create_task_group() as tg:
+            for name, func in self._step_functions().items():
+                tg.start_soon(self._run_step, name, func, limiter)
+
+    async def _run_step(self, name: str, func: Callable[[], int], limiter) -> None:
+        step = self.steps[name]
+        step["state"] = "running"
+        started = time.monotonic()
+        try:
+            count = await anyio.to_thread.run_sync(func, limiter=limiter)
+            step.update(state="done", count=count, error=None)
+        except Exception as e:
+            logger.warning("Cache warm-up step %s failed: %s", name, e)
+            step.update(state="failed", error=str(e))
+        step["duration"] = round(time.monotonic() - started, 3)
@@ -0,0 +1,302 @@
+"""Durable write-behind queue for document creation with idempotency keys."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import UTC, date, datetime
+
+from fakturoid import Expense, Invoice, InvoiceLine
+
+from fakturoid_mcp.attachments import AttachmentStore
+from fakturoid_mcp.breaker import CircuitBreaker, is_outage
+from fakturoid_mcp.cache import EntityCache
+from fakturoid_mcp.ratelimit import RateLimiter
+from fakturoid_mcp.validation import writable_line
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+WRITE_STATES = (PENDING, RUNNING, DONE, FAILED)
+
+DOCUMENT_MODELS = {"invoice": Invoice, "expense": Expense}
+DATE_FIELDS = ("issued_on", "taxable_fulfillment_due", "due_on")
+
+RETRY_DELAY = 5.0
+"""Minimum seconds before retrying a write that hit an outage."""
+
+PRUNE_INTERVAL = 60.0
+"""Seconds between deletions of finished writes older than the retention period."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    custom_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (kind, key)
+)
+"""
+
+
+def build_document(kind: str, payload: dict):
+    """Build an unsaved invoice or expense from a JSON payload of tool arguments."""
+    kwargs = dict(payload)
+    kwargs.pop("attachments", None)
+    for field in DATE_FIELDS:
+        if kwargs.get(field):
+            kwargs[field] = date.fromisoformat(kwargs[field])
+    kwargs["lines"] = [InvoiceLine(**writable_line(line)) for line in kwargs.get("lines") or []]
+    return DOCUMENT_MODELS[kind](**kwargs)
+
+
+class WriteQueue:
+    """Persists create requests in SQLite and drains them to Fakturoid.
+
+    Every write has an idempotency key, stored on the document as its
+    ``custom_id`` (unless the caller set one). Enqueuing the same key again
+    returns the existing write instead of creating a second document. A write
+    that was interrupted (timeout, outage, restart) is replayed only after
+    looking the ``custom_id`` up in Fakturoid, so a document that was in fact
+    created is never created twice. Workers drain the queue at the shared
+    API rate limit; writes that hit an outage wait for the circuit to close.
+    Attachments listed in the payload are uploaded once the document exists;
+    if that fails for a reason other than an outage, the write is still done
+    and its result reports the ``attachment_error``.
+    Finished writes (and so their keys) are kept for ``retention`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client,
+        cache: EntityCache,
+        rate_limiter: RateLimiter,
+        breaker: CircuitBreaker,
+        attachments: AttachmentStore,
+        workers: int,
+        retention: float = 604800.0,
+    ):
+        self.client = client
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.attachments = attachments
+        self.workers = workers
+        self.retention = retention
+        self._pruned_at = 0.0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._done: dict[tuple[str, str], threading.Event] = {}
+        self._threads: list[threading.Thread] = []
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(_SCHEMA)
+            # Writes interrupted by a restart are replayed (with a custom_id lookup first).
+            self._db.execute("UPDATE writes SET state = ? WHERE state = ?", (PENDING, RUNNING))
+
+    def start(self) -> None:
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"write-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, payload: dict, key: str | None = None) -> dict:
+        """Queue a create request and return its status.
+
+        ``key`` defaults to the payload's ``custom_id`` or a new UUID. Reusing a
+        key with a different payload raises ValueError.
+        """
+        if kind not in DOCUMENT_MODELS:
+            raise ValueError(f"Unsupported write kind: {kind}")
+        key = key or payload.get("custom_id") or uuid.uuid4().hex
+        payload = {**payload, "custom_id": payload.get("custom_id") or key}
+        build_document(kind, payload)  # reject invalid payloads before queueing
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        now = _now()
+        with self._lock:
+            row = self._row(kind, key)
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO writes (kind, key, custom_id, payload, state, created_at, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kind, key, payload["custom_id"], encoded, PENDING, now, now),
+                )
+                row = self._row(kind, key)
+            elif row["payload"] != encoded:
+                raise ValueError(f"Idempotency key {key} was already used for a different {kind}")
+        with self._wakeup:
+            self._wakeup.notify()
+        return self._to_dict(row)
+
+    def get(self, kind: str, key: str) -> dict:
+        with self._lock:
+            row = self._row(kind, key)
+        if row is None:
+            raise ValueError(f"Unknown {kind} write: {key}")
+        return self._to_dict(row)
+
+    def list(self, state: str | None = None, limit: int = 100) -> list[dict]:
+        if state is not None and state not in WRITE_STATES:
+            raise ValueError(f"state must be one of: {', '.join(WRITE_STATES)}")
+        query = "SELECT * FROM writes"
+        params: tuple = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            params = (state,)
+        query += " ORDER BY seq DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, (*params, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def wait(self, kind: str, key: str, timeout: float) -> dict:
+        """Block until the write is done or failed, or ``timeout`` expires; return its status."""
+        status = self.get(kind, key)
+        if status["state"] in (DONE, FAILED) or timeout <= 0:
+            return status
+        event = self._done.setdefault((kind, key), threading.Event())
+        # The write may have finished before the event was registered.
+        status = self.get(kind, key)
+        if status["state"] in (DONE, FAILED):
+            self._done.pop((kind, key), None)
+            return status
+        event.wait(timeout)
+        return self.get(kind, key)
+
+    def _row(self, kind: str, key: str) -> sqlite3.Row | None:
+        return self._db.execute(
+            "SELECT * FROM writes WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+
+    def _to_dict(self, row: sqlite3.Row) -> dict:
+        return {
+            "kind": row["kind"],
+            "idempotency_key": row["key"],
+            "custom_id": row["custom_id"],
+            "state": row["state"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def _claim(self) -> sqlite3.Row | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM writes WHERE state = ? AND not_before <= ? ORDER BY seq LIMIT 1",
+                (PENDING, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE writes SET state = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE seq = ?",
+                (RUNNING, _now(), row["seq"]),
+            )
+            return row
+
+    def _finish(self, row: sqlite3.Row, state: str, result=None, error=None, delay=0.0) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE writes SET state = ?, result = ?, error = ?, not_before = ?, "
+                "updated_at = ? WHERE seq = ?",
+                (
+                    state,
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time() + delay,
+                    _now(),
+                    row["seq"],
+                ),
+            )
+        if state in (DONE, FAILED):
+            event = self._done.pop((row["kind"], row["key"]), None)
+            if event is not None:
+                event.set()
+
+    def _prune(self) -> None:
+        """Delete finished writes last updated more than ``retention`` seconds ago."""
+        now = time.time()
+        with self._lock:
+            if now - self._pruned_at < PRUNE_INTERVAL:
+                return
+            self._pruned_at = now
+            cutoff = datetime.fromtimestamp(now - self.retention, UTC).isoformat()
+            self._db.execute(
+                "DELETE FROM writes WHERE state IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            )
+
+    def _work(self) -> None:
+        while True:
+            row = self._claim()
+            if row is None:
+                self._prune()
+                with self._wakeup:
+                    self._wakeup.wait(1.0)
+                continue
+            self._process(row)
+
+    def _find(self, kind: str, custom_id: str):
+        lister = self.client.invoices if kind == "invoice" else self.client.expenses
+        for model in lister(custom_id=custom_id):
+            return model
+        return None
+
+    def _process(self, row: sqlite3.Row) -> None:
+        kind = row["kind"]
+        try:
+            model = None
+            if row["attempts"] > 0:
+                # A previous attempt may have reached Fakturoid before failing.
+                self.rate_limiter.acquire()
+                model = self._find(kind, row["custom_id"])
+            payload = json.loads(row["payload"])
+            if model is None:
+                model = build_document(kind, payload)
+                self.rate_limiter.acquire()
+                self.client.save(model)
+            attachment_error = None
+            if payload.get("attachments"):
+                try:
+                    updated = self.attachments.attach(kind, model.id, payload["attachments"])
+                    if updated is not None:
+                        model.update(updated)
+                except Exception as e:
+                    if is_outage(e):
+                        raise
+                    # The document exists; failing the write would hide it.
+                    logger.warning("Attachments of %s %s failed: %s", kind, model.id, e)
+                    attachment_error = str(e)
+            result = self.cache.put(kind, model).to_dict()
+            if attachment_error is not None:
+                result["attachment_error"] = attachment_error
+            self._finish(row, DONE, result=result)
+        except Exception as e:
+            if is_outage(e):
+                delay = max(self.breaker.retry_in(), RETRY_DELAY)
+                logger.info("Write %s %s deferred %.0fs: %s", kind, row["key"], delay, e)
+                self._finish(row, PENDING, error=str(e), delay=delay)
+            else:
+                logger.warning("Write %s %s failed: %s", kind, row["key"], e)
+                self._finish(row, FAILED, error=str(e))
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
@@ -0,0 +1,203 @@
+"""Shared fixtures: an in-memory Fakturoid client and the MCP server wired to it."""
+
+import itertools
+from datetime import datetime
+from decimal import Decimal
+
+import anyio
+import pytest
+import requests
+from fakturoid import Account, BankAccount, Expense, Generator, Invoice, Subject
+from fakturoid.paging import PagedResource
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from fakturoid_mcp import server
+
+LIST_FILTERS_IGNORED = ("since", "updated_since", "until", "updated_until", "proforma")
+
+
+class FakeList(PagedResource):
+    """Lazily paged list, like the ``ModelList`` the client returns for list endpoints.
+
+    Nothing is requested until a page is loaded.
+    """
+
+    def __init__(
+        self, client: "FakeFakturoid", name: str, filters: dict, items: list, page_size: int
+    ):
+        super().__init__(page_size)
+        self.client = client
+        self.name = name
+        self.filters = filters
+        self.items = items
+        self.page_count = max(1, -(-len(items) // page_size))
+
+    def load_page(self, n):
+        self.client.request(self.name, self.filters, n)
+        return self.items[n * self.page_size : (n + 1) * self.page_size]
+
+
+class FakeSubjects:
+    """``client.subjects(...)`` with its ``search`` attribute."""
+
+    def __init__(self, client: "FakeFakturoid"):
+        self.client = client
+
+    def __call__(self, **filters):
+        return self.client.listing(Subject, "subjects", filters)
+
+    def search(self, query: str):
+        self.client.request("subjects.search", query)
+        return [s for s in self.client.store[Subject].values() if query.lower() in s.name.lower()]
+
+
+class FakeFakturoid:
+    """In-memory stand-in for the Fakturoid client.
+
+    Every API request is appended to ``calls``. Setting ``down`` makes requests
+    fail with a connection error, as during an outage.
+    """
+
+    def __init__(self, slug, email, client_id, client_secret, user_agent=None):
+        self.slug = slug
+        self.store = {Subject: {}, Invoice: {}, Expense: {}, Generator: {}}
+        self.payments: list[tuple[dict, object]] = []
+        self.calls: list[tuple] = []
+        self.down = False
+        self.page_size = 40
+        self.subjects = FakeSubjects(self)
+        self._ids = itertools.count(1)
+
+    def request(self, *call) -> None:
+        self.calls.append(call)
+        if self.down:
+            raise requests.ConnectionError("Connection refused")
+
+    def add(self, model):
+        """Store ``model`` as if it had been created in Fakturoid (no API call recorded)."""
+        if getattr(model, "id", None) is None:
+            model.id = next(self._ids)
+        self.store[type(model)][model.id] = model
+        return model
+
+    def listing(self, model_type: type, name: str, filters: dict) -> FakeList:
+        items = sorted(self.store[model_type].values(), key=lambda m: m.id)
+        for key, value in filters.items():
+            if key not in LIST_FILTERS_IGNORED:
+                items = [m for m in items if getattr(m, key, None) == value]
+        return FakeList(self, name, filters, items, self.page_size)
+
+    def _get(self, model_type: type, entity_id: int):
+        self.request(model_type.__name__.lower(), entity_id)
+        try:
+            return self.store[model_type][entity_id]
+        except KeyError:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.HTTPError("404 Client Error: Not Found", response=response) from None
+
+    def account(self):
+        self.request("account")
+        return Account(
+            name="Acme s.r.o.",
+            subdomain=self.slug,
+            currency="CZK",
+            vat_mode="vat_payer",
+            invoice_number_format="{RRRR}-{DDDD}",
+            due=14,
+        )
+
+    def bank_accounts(self):
+        self.request("bank_accounts")
+        return [BankAccount(id=1, name="Main", currency="CZK", number="123/0100", default=True)]
+
+    def subject(self, subject_id):
+        return self._get(Subject, subject_id)
+
+    def invoice(self, invoice_id):
+        return self._get(Invoice, invoice_id)
+
+    def expense(self, expense_id):
+        return self._get(Expense, expense_id)
+
+    def generator(self, generator_id):
+        return self._get(Generator, generator_id)
+
+    def invoices(self, **filters):
+        return self.listing(Invoice, "invoices", filters)
+
+    def expenses(self, **filters):
+        return self.listing(Expense, "expenses", filters)
+
+    def generators(self, **filters):
+        self.request("generators", filters)
+        return list(self.listing(Generator, "generators", filters).items)
+
+    def save(self, model, **kwargs):
+        self.request("save", type(model).__name__, kwargs)
+        if type(model) not in self.store:
+            model.id = next(self._ids)
+            self.payments.append((kwargs, model))
+            invoice = self.store[Invoice].get(kwargs.get("invoice_id"))
+            if invoice is not None:
+                invoice.payments = [*(getattr(invoice, "payments", None) or []), model]
+                invoice.remaining_amount -= Decimal(str(model.amount))
+            return
+        if isinstance(model, (Invoice, Expense, Generator)):
+            total = Decimal(0)
+            for line in model.lines:
+                total += Decimal(str(line.quantity)) * Decimal(str(line.unit_price))
+            model.subtotal = model.total = total
+            model.__dict__.setdefault("status", "open")
+            model.__dict__.setdefault("currency", "CZK")
+            model.updated_at = datetime.now()
+        self.add(model)
+
+    def delete(self, model, **kwargs):
+        self.request("delete", type(model).__name__, model.id)
+        self.store.get(type(model), {}).pop(model.id, None)
+
+    def fire_invoice_event(self, invoice_id, event, **kwargs):
+        self.request("fire_invoice_event", invoice_id, event)
+
+    def fire_expense_event(self, expense_id, event, **kwargs):
+        self.request("fire_expense_event", expense_id, event)
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """The server's application context, with Fakturoid replaced by ``FakeFakturoid``.
+
+    Runs in ``tmp_path``, so the write queue, ledger and file directories are
+    created there. Background warm-up is disabled.
+    """
+    monkeypatch.chdir(tmp_path)
+    for name, value in {
+        "SLUG": "acme",
+        "EMAIL": "user@example.com",
+        "CLIENT_ID": "id",
+        "CLIENT_SECRET": "secret",
+        "WARMUP_ENABLED": "false",
+    }.items():
+        monkeypatch.setenv(f"FAKTUROID_{name}", value)
+    monkeypatch.setattr(server, "Fakturoid", FakeFakturoid)
+    monkeypatch.setattr(server, "_app_context", None)
+    return server.get_app_context()
+
+
+@pytest.fixture
+def fakturoid(app) -> FakeFakturoid:
+    """The fake client behind ``app``'s circuit breaker."""
+    return app.client._client
+
+
+@pytest.fixture
+def call(app):
+    """Call a tool through an in-memory MCP session and return its ``CallToolResult``."""
+
+    async def call_tool(name: str, arguments: dict):
+        session = create_connected_server_and_client_session(server.mcp._mcp_server)
+        async with session as client:
+            return await client.call_tool(name, arguments)
+
+    return lambda name, **arguments: anyio.run(call_tool, name, arguments)
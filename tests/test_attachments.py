@@ -0,0 +1,140 @@
+"""Tests for attachment storage, streamed upload bodies and the upload route."""
+
+import base64
+import hashlib
+import json
+
+import anyio
+import httpx
+import pytest
+from pydantic import SecretStr
+
+from fakturoid_mcp import server
+from fakturoid_mcp.attachments import CHUNK_SIZE, AttachmentBody, AttachmentStore, encoded_length
+
+
+class FakeApi:
+    """Records requests and consumes their streamed body, as ``requests`` would."""
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, path, data=None, headers=None):
+        chunks = list(data)
+        self.requests.append((method, path, len(data), chunks))
+        return httpx.Response(200, json={"id": 1, "attachments": []})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AttachmentStore(FakeApi(), tmp_path / "uploads", tmp_path / "files")
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, CHUNK_SIZE, CHUNK_SIZE * 2 + 1])
+def test_body_length_matches_the_streamed_bytes(store, size):
+    content = bytes(n % 251 for n in range(size))
+    a = store.add([content], "scan.pdf")
+    b = store.add([b"second file"], 'quote "1".txt')
+    body = AttachmentBody([(store.blob_path(x["upload_id"]), x) for x in (a, b)])
+
+    sent = b"".join(body)
+    assert len(body) == len(sent)
+    assert encoded_length(size) == len(base64.b64encode(content))
+    attachments = json.loads(sent)["attachments"]
+    assert attachments[0] == {
+        "filename": "scan.pdf",
+        "data_url": "data:application/pdf;base64," + base64.b64encode(content).decode(),
+    }
+    assert attachments[1]["filename"] == 'quote "1".txt'
+    assert b"".join(body) == sent  # a retried request streams the body again
+
+
+def test_body_is_streamed_in_chunks(store):
+    content = b"x" * (CHUNK_SIZE * 3)
+    meta = store.add([content], "big.bin")
+    body = AttachmentBody([(store.blob_path(meta["upload_id"]), meta)])
+
+    chunks = list(body)
+
+    assert max(len(chunk) for chunk in chunks) == encoded_length(CHUNK_SIZE)
+    assert len(chunks) == 4 + 3  # JSON around the file, and the file in three chunks
+
+
+def test_identical_content_is_stored_once_and_attached_once(store):
+    first = store.add([b"receipt"], "a.pdf")
+    second = store.add([b"rece", b"ipt"], "b.pdf")
+    assert first["upload_id"] == second["upload_id"] == hashlib.sha256(b"receipt").hexdigest()
+    assert len(list(store.blobs.rglob("*"))) == 2  # one prefix directory, one blob
+
+    resolved = store.resolve([first["upload_id"], second["upload_id"]])
+    assert store.attach("invoice", 7, resolved) is not None
+    assert store.attach("invoice", 7, resolved) is None
+    assert [r[:2] for r in store.api.requests] == [("PATCH", "invoices/7.json")]
+
+
+def test_local_paths_must_be_inside_the_attachment_dir(store, tmp_path):
+    (tmp_path / "files").mkdir()
+    (tmp_path / "files" / "ok.txt").write_bytes(b"ok")
+    (tmp_path / "secret.txt").write_bytes(b"secret")
+
+    assert store.resolve([str(tmp_path / "files" / "ok.txt")])[0]["filename"] == "ok.txt"
+    with pytest.raises(ValueError, match="inside the attachment directory"):
+        store.resolve([str(tmp_path / "files" / ".." / "secret.txt")])
+    with pytest.raises(ValueError, match="Unknown upload ID"):
+        store.resolve(["0" * 64])
+
+
+def post_upload(body, headers=None, filename="receipt.pdf"):
+    async def send():
+        transport = httpx.ASGITransport(app=server.http_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/uploads", params={"filename": filename}, content=body, headers=headers
+            )
+
+    return anyio.run(send)
+
+
+@pytest.fixture
+def upload_token(app, monkeypatch):
+    monkeypatch.setattr(app.settings, "upload_token", SecretStr("s3cret"))
+    monkeypatch.setattr(app.settings, "upload_max_bytes", 1000)
+    return {"Authorization": "Bearer s3cret"}
+
+
+def test_upload_route_is_hidden_without_a_token(app):
+    assert app.settings.upload_token is None
+    assert post_upload(b"data").status_code == 404
+
+
+def test_upload_requires_the_token(upload_token):
+    assert post_upload(b"data").status_code == 401
+    assert post_upload(b"data", {"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_upload_stores_the_body(app, upload_token):
+    response = post_upload(b"%PDF-1.7", upload_token, filename="../receipt.pdf")
+
+    assert response.status_code == 201
+    stored = response.json()
+    assert stored == {
+        "upload_id": hashlib.sha256(b"%PDF-1.7").hexdigest(),
+        "filename": "receipt.pdf",
+        "content_type": "application/pdf",
+        "size": 8,
+    }
+    assert app.attachments.resolve([stored["upload_id"]])[0]["filename"] == "receipt.pdf"
+
+
+def test_upload_over_the_limit_is_rejected(app, upload_token):
+    assert post_upload(b"x" * 1001, upload_token).status_code == 413
+
+    async def chunks():
+        for _ in range(11):
+            yield b"x" * 100
+
+    # Without a Content-Length the limit is enforced while streaming.
+    response = post_upload(chunks(), upload_token)
+    assert response.status_code == 413
+    assert list(app.attachments.blobs.rglob("*.part")) == []
+    assert post_upload(b"x" * 1000, upload_token).status_code == 201
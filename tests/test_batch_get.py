@@ -0,0 +1,41 @@
+"""Tests for the batch get tools and the entity cache they fill."""
+
+from fakturoid import Invoice, Subject
+
+
+def invoice(fakturoid, subject_id=None):
+    return fakturoid.add(Invoice(number="2026-0001", status="open", subject_id=subject_id))
+
+
+def test_get_invoices_keeps_input_order_and_reports_missing_ids(call, fakturoid):
+    first, second = invoice(fakturoid), invoice(fakturoid)
+
+    result = call("get_invoices", invoice_ids=[second.id, 999, first.id, second.id])
+
+    rows = result.structuredContent["result"]
+    assert [row["id"] for row in rows] == [second.id, 999, first.id, second.id]
+    assert "404" in rows[1]["error"]
+    assert sorted(c[1] for c in fakturoid.calls) == sorted([first.id, second.id, 999])
+
+
+def test_get_invoices_serves_fetched_invoices_from_the_cache(call, fakturoid):
+    ids = [invoice(fakturoid).id for _ in range(3)]
+    call("get_invoices", invoice_ids=ids[:2])
+    fakturoid.calls.clear()
+
+    result = call("get_invoices", invoice_ids=ids)
+
+    assert [row["id"] for row in result.structuredContent["result"]] == ids
+    assert fakturoid.calls == [("invoice", ids[2])]
+
+
+def test_get_subjects_fills_the_cache_used_to_expand_invoices(call, fakturoid):
+    subject = fakturoid.add(Subject(name="Klient"))
+    created = invoice(fakturoid, subject.id)
+    call("get_subjects", subject_ids=[subject.id])
+    fakturoid.calls.clear()
+
+    result = call("get_invoice", invoice_id=created.id, expand=["subject"])
+
+    assert result.structuredContent["subject"]["name"] == "Klient"
+    assert fakturoid.calls == [("invoice", created.id)]
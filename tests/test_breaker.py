@@ -0,0 +1,114 @@
+"""Tests for the circuit breaker and stale reads during Fakturoid outages."""
+
+import time
+
+import pytest
+import requests
+from fakturoid import Generator, Invoice, Subject
+
+from fakturoid_mcp.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise requests.ConnectionError("Connection refused")
+
+
+def not_found():
+    response = requests.Response()
+    response.status_code = 404
+    raise requests.HTTPError("404 Client Error", response=response)
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_a_trial_call():
+    breaker = CircuitBreaker(failure_threshold=2, latency_threshold=10, reset_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert calls == []
+
+    time.sleep(0.06)
+    with pytest.raises(requests.ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN  # the failed trial reopens it at once
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.status()["state"] == CLOSED
+    assert breaker.failures == 0
+
+
+def test_client_errors_and_slow_calls_are_counted_differently():
+    breaker = CircuitBreaker(failure_threshold=2, latency_threshold=0.01, reset_timeout=60)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            breaker.call(not_found)
+    assert breaker.state == CLOSED
+
+    for _ in range(2):
+        breaker.call(time.sleep, 0.02)
+    assert breaker.state == OPEN
+    assert breaker.last_error.startswith("slow response")
+
+
+def test_only_one_trial_call_runs_while_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, latency_threshold=10, reset_timeout=0)
+    with pytest.raises(requests.ConnectionError):
+        breaker.call(fail)
+
+    def nested():
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: None)
+
+    breaker.call(nested)
+    assert breaker.state == CLOSED
+
+
+def test_cached_entities_are_served_stale_during_an_outage(app, call, fakturoid):
+    invoice = fakturoid.add(Invoice(number="2026-0001", status="open"))
+    call("get_invoice", invoice_id=invoice.id)
+    app.cache.ttl = 0
+    fakturoid.down = True
+
+    result = call("get_invoice", invoice_id=invoice.id)
+    missing = call("get_invoice", invoice_id=invoice.id + 1)
+
+    assert result.structuredContent["number"] == "2026-0001"
+    assert "age" in result.structuredContent["stale"]
+    assert missing.isError
+
+
+def test_list_tools_fall_back_to_the_cache_during_an_outage(app, call, fakturoid):
+    acme = fakturoid.add(Subject(name="Acme", email="info@acme.cz"))
+    fakturoid.add(Subject(name="Other"))
+    fakturoid.add(Generator(name="Hosting", recurring=True))
+    fakturoid.add(Generator(name="Template", recurring=False))
+    call("get_subjects", subject_ids=[1, 2])
+    call("get_generators", generator_ids=[3, 4])
+    fakturoid.down = True
+
+    subjects = call("search_subjects", query="ACME.cz").structuredContent
+    generators = call("list_generators", recurring=True).structuredContent
+
+    assert [row["id"] for row in subjects["result"]] == [acme.id]
+    assert subjects["stale"]["complete"] is False
+    assert [row["name"] for row in generators["result"]] == ["Hosting"]
+    assert "Connection refused" in generators["stale"]["reason"]
+
+
+def test_breaker_trips_and_fails_fast_for_tool_calls(app, call, fakturoid):
+    app.breaker.failure_threshold = 2
+    fakturoid.down = True
+    for _ in range(2):
+        call("get_invoice", invoice_id=1)
+
+    result = call("get_invoice", invoice_id=1)
+
+    assert result.isError
+    assert "failing fast" in result.structuredContent["error"]
+    assert len(fakturoid.calls) == 2
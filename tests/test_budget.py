@@ -0,0 +1,73 @@
+"""Tests for response budgets (max_items / max_bytes) and their cursors."""
+
+from fakturoid import Generator, Invoice
+
+
+def add_invoices(fakturoid, count, page_size=3):
+    fakturoid.page_size = page_size
+    for n in range(count):
+        fakturoid.add(Invoice(number=f"2026-{n:04d}", status="open", currency="CZK", total="100"))
+
+
+def test_cursor_pages_through_every_invoice_once(call, fakturoid):
+    add_invoices(fakturoid, 7)
+    seen, cursor, calls = [], None, 0
+    while True:
+        arguments = {"max_items": 2} | ({"cursor": cursor} if cursor else {})
+        result = call("list_invoices", **arguments).structuredContent
+        seen += [row["id"] for row in result["result"]]
+        cursor = result["next_cursor"]
+        calls += 1
+        if cursor is None:
+            break
+
+    assert seen == list(range(1, 8))
+    assert calls == 4
+
+
+def test_cut_page_is_summarized_and_later_pages_are_not_fetched(call, fakturoid):
+    add_invoices(fakturoid, 7)
+
+    result = call("list_invoices", max_items=2).structuredContent
+
+    assert len(result["result"]) == 2
+    assert result["omitted"] == {
+        "count": 1,
+        "by_status": {"open": {"count": 1, "totals": {"CZK": "100"}}},
+        "unfetched_pages": 2,
+    }
+    assert [c[2] for c in fakturoid.calls] == [0]
+
+
+def test_max_bytes_returns_at_least_one_row(call, fakturoid):
+    add_invoices(fakturoid, 3)
+
+    result = call("list_invoices", max_bytes=1).structuredContent
+
+    assert len(result["result"]) == 1
+    assert result["next_cursor"] is not None
+
+
+def test_cursor_is_rejected_with_different_filters(call, fakturoid):
+    add_invoices(fakturoid, 3)
+    cursor = call("list_invoices", max_items=1).structuredContent["next_cursor"]
+
+    result = call("list_invoices", max_items=1, cursor=cursor, status="paid")
+
+    assert result.isError
+    assert "different filters" in result.structuredContent["error"]
+
+
+def test_list_generators_honours_the_budget(call, fakturoid):
+    for n in range(3):
+        fakturoid.add(Generator(name=f"Hosting {n}", recurring=True))
+
+    first = call("list_generators", max_items=2).structuredContent
+    rest = call("list_generators", max_items=2, cursor=first["next_cursor"]).structuredContent
+
+    assert [row["name"] for row in first["result"] + rest["result"]] == [
+        "Hosting 0",
+        "Hosting 1",
+        "Hosting 2",
+    ]
+    assert rest["next_cursor"] is None
@@ -0,0 +1,32 @@
+"""Tests for the entity cache and its snapshots."""
+
+import time
+
+from fakturoid_mcp.cache import EntityCache
+from fakturoid_mcp.records import from_dict
+
+
+def invoice(invoice_id: int, status: str):
+    return from_dict({"id": invoice_id, "status": status})
+
+
+def test_snapshot_loads_entries_that_were_stale_when_taken():
+    cache = EntityCache(ttl=0.05)
+    cache.put("invoice", invoice(1, "open"))
+    time.sleep(0.1)
+    snapshot = cache.begin_snapshot()
+
+    assert snapshot.get("invoice", 1) is None
+    record = snapshot.load("invoice", 1, lambda i: invoice(i, "paid"))
+    assert record.get("status") == "paid"
+
+
+def test_snapshot_keeps_fresh_entries_when_the_cache_changes():
+    cache = EntityCache(ttl=60)
+    cache.put("invoice", invoice(1, "open"))
+    snapshot = cache.begin_snapshot()
+
+    cache.put("invoice", invoice(1, "paid"))
+
+    assert snapshot.get("invoice", 1).get("status") == "open"
+    assert cache.get("invoice", 1).get("status") == "paid"
@@ -0,0 +1,75 @@
+"""Tests for duplicate expense detection."""
+
+from datetime import date
+
+from fakturoid import Expense
+
+from fakturoid_mcp.duplicates import ExpenseIndex
+from fakturoid_mcp.records import compact
+
+LINES = [{"name": "Hosting", "unit_price": "1000", "vat_rate": 21}]
+
+
+def expense(id, **fields):
+    return compact({"id": id, "subject_id": 5, "currency": "CZK", **fields})
+
+
+def test_groups_match_normalized_numbers_and_nearby_amounts():
+    index = ExpenseIndex(date_window=7)
+    index.add(expense(1, original_number="FV-2026/001", issued_on=date(2026, 3, 1), total="10"))
+    index.add(expense(2, original_number="fv 2026 001", issued_on=date(2026, 4, 1), total="20"))
+    index.add(expense(3, issued_on=date(2026, 3, 10), total="500.00"))
+    index.add(expense(4, issued_on=date(2026, 3, 12), total="500.00"))
+    # Same amount a month later: a recurring bill, not a duplicate.
+    index.add(expense(5, issued_on=date(2026, 4, 12), total="500.00"))
+    # Same number at another supplier.
+    index.add(compact({"id": 6, "subject_id": 9, "original_number": "FV-2026/001"}))
+
+    groups = index.groups()
+
+    assert [g["ids"] for g in groups] == [[3, 4], [1, 2]]
+    assert groups[0]["pairs"][0]["reasons"] == ["amount", "issued_on"]
+    assert groups[1]["pairs"][0]["reasons"] == ["original_number"]
+
+
+def test_check_skips_the_expense_itself():
+    index = ExpenseIndex()
+    index.add(expense(1, variable_symbol="2026001", issued_on=date(2026, 3, 1), total="10"))
+
+    assert index.check(expense(1, variable_symbol="2026001")) == []
+    assert index.check(expense(None, variable_symbol="2026001")) == []  # 0.4 < min_score
+    assert index.check(expense(None, variable_symbol="2026001", issued_on=date(2026, 3, 2))) == [
+        {"id": 1, "score": 0.58, "reasons": ["variable_symbol", "issued_on"]}
+    ]
+
+
+def test_find_duplicate_expenses_tool(call, fakturoid):
+    for number in ("A-1", "a1", "B-2"):
+        fakturoid.add(Expense(subject_id=5, original_number=number, total="100"))
+
+    result = call("find_duplicate_expenses", subject_id=5).structuredContent
+
+    assert result["checked"] == 3
+    assert [g["ids"] for g in result["groups"]] == [[1, 2]]
+
+
+def test_create_expense_refuses_a_likely_duplicate(call, fakturoid):
+    fakturoid.add(Expense(subject_id=5, total="1210.00", currency="CZK", issued_on=date.today()))
+
+    result = call("create_expense", subject_id=5, lines=LINES, check_duplicates=True)
+
+    assert result.isError
+    assert result.structuredContent["duplicates"] == [
+        {"id": 1, "score": 0.6, "reasons": ["amount", "issued_on"]}
+    ]
+    assert len(fakturoid.store[Expense]) == 1
+
+
+def test_retry_with_the_same_key_is_not_a_duplicate(call, fakturoid):
+    arguments = {"subject_id": 5, "lines": LINES, "idempotency_key": "receipt-7"}
+    first = call("create_expense", **arguments).structuredContent
+    again = call("create_expense", check_duplicates=True, **arguments)
+
+    assert not again.isError
+    assert again.structuredContent["id"] == first["id"]
+    assert len(fakturoid.store[Expense]) == 1
@@ -0,0 +1,32 @@
+"""Tests for embedding related subjects into documents (``expand``)."""
+
+from fakturoid import Invoice, Subject
+
+
+def test_list_invoices_embeds_each_subject_once(call, fakturoid):
+    acme = fakturoid.add(Subject(name="Acme"))
+    other = fakturoid.add(Subject(name="Other"))
+    for subject in (acme, acme, other):
+        fakturoid.add(Invoice(number="2026-0001", subject_id=subject.id))
+    fakturoid.add(Invoice(number="2026-0002", subject_id=None))
+
+    result = call("list_invoices", expand=["subject"])
+
+    rows = result.structuredContent["result"]
+    assert [row["subject"] and row["subject"]["name"] for row in rows] == [
+        "Acme",
+        "Acme",
+        "Other",
+        None,
+    ]
+    subject_calls = [c for c in fakturoid.calls if c[0] == "subject"]
+    assert sorted(subject_calls) == [("subject", acme.id), ("subject", other.id)]
+
+
+def test_unknown_expand_value_is_an_error(call, fakturoid):
+    fakturoid.add(Invoice(number="2026-0001"))
+
+    result = call("list_invoices", expand=["lines"])
+
+    assert result.isError
+    assert "Unsupported expand value(s): lines" in result.structuredContent["error"]
@@ -0,0 +1,67 @@
+"""Tests for streaming document exports."""
+
+import json
+from datetime import date
+
+import pytest
+from fakturoid import Invoice
+
+from fakturoid_mcp.export import write_documents
+from fakturoid_mcp.tools.documents import EXPORT_CREATED_MARGIN
+
+BATCHES = [
+    [
+        {"id": 1, "note": None, "rounding": None, "lines": [{"name": "Hosting"}]},
+        {"id": 2, "note": None, "rounding": None, "lines": []},
+    ],
+    [
+        {
+            "id": 3,
+            "note": "Záloha",
+            "rounding": 5,
+            "paid_on": "2026-03-20",
+            "lines": [{"name": "Doména", "vat_rate": 21}],
+        },
+        {"id": "3a", "note": None, "rounding": "0.50", "lines": []},
+    ],
+]
+
+
+def test_parquet_keeps_fields_and_values_that_do_not_fit_the_first_batch(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    result = write_documents(iter(BATCHES), tmp_path, "invoices", "parquet")
+
+    assert [f["rows"] for f in result["files"]] == [4, 2]
+    rows = pq.read_table(tmp_path / "invoices.parquet").to_pylist()
+    assert [row["note"] for row in rows] == [None, None, "Záloha", None]
+    # All-null in the first batch, so stored as strings.
+    assert [row["rounding"] for row in rows] == [None, None, "5", "0.50"]
+    assert json.loads(rows[2]["extra"]) == {"paid_on": "2026-03-20"}
+    # "3a" does not fit the integer id column.
+    assert rows[3]["id"] is None
+    assert json.loads(rows[3]["extra"]) == {"id": "3a"}
+    lines = pq.read_table(tmp_path / "invoices_lines.parquet").to_pylist()
+    assert json.loads(lines[1]["extra"]) == {"vat_rate": 21}
+
+
+def test_csv_collects_later_fields_in_the_extra_column(tmp_path):
+    write_documents(iter(BATCHES), tmp_path, "invoices", "csv")
+
+    header, *rows = (tmp_path / "invoices.csv").read_text(encoding="utf-8").splitlines()
+    assert header == "id,note,rounding,extra"
+    assert rows[2].startswith("3,Záloha,5,")
+
+
+def test_export_requests_documents_created_within_the_margin(app, call, fakturoid):
+    for n, issued_on in enumerate(["2026-01-31", "2026-02-01", "2026-03-15"], start=1):
+        fakturoid.add(Invoice(number=f"2026-{n:04d}", issued_on=date.fromisoformat(issued_on)))
+
+    result = call(
+        "export_documents", document_type="invoices", since="2026-02-01", until="2026-02-28"
+    )
+
+    files = result.structuredContent["files"]
+    assert files[0]["rows"] == 1
+    since = date(2026, 2, 1) - EXPORT_CREATED_MARGIN
+    assert fakturoid.calls == [("invoices", {"since": since}, 0)]
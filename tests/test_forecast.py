@@ -0,0 +1,110 @@
+"""Tests for the cash-flow forecast."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from fakturoid import Expense, Generator, Invoice
+
+from fakturoid_mcp.forecast import CashflowForecast, add_months, format_units
+from fakturoid_mcp.records import compact
+
+
+def test_add_months_clamps_to_shorter_months():
+    assert add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+    assert add_months(date(2026, 11, 15), 3) == date(2027, 2, 15)
+    assert add_months(date(2026, 4, 30), 1, last_day=True) == date(2026, 5, 31)
+
+
+def test_format_units():
+    assert format_units(-1234) == "-12.34"
+    assert format_units(5) == "0.05"
+
+
+def test_generator_occurrences_do_not_drift_after_short_months():
+    forecast = CashflowForecast(date(2026, 1, 1), horizon_months=4)
+    generator = {
+        "next_occurrence_on": date(2026, 1, 31),
+        "total": Decimal("1000.00"),
+        "due": 0,
+        "currency": "CZK",
+    }
+    forecast.add_generator(compact(generator), "CZK", 14)
+
+    result = forecast.result()
+    # Jan 31, Feb 28, Mar 31, Apr 30 (not Mar 28, Apr 28).
+    assert [day.isoformat() for day in map(date.fromordinal, forecast.ordinals)] == [
+        "2026-01-31",
+        "2026-02-28",
+        "2026-03-31",
+        "2026-04-30",
+    ]
+    czk = result["currencies"]["CZK"]
+    assert czk["inflow"] == "4000.00"
+    assert [b["cumulative"] for b in czk["buckets"]] == [
+        "1000.00",
+        "2000.00",
+        "3000.00",
+        "4000.00",
+    ]
+    assert result["sources"]["occurrences"] == 4
+
+
+def test_generator_stops_at_its_end_date_and_skips_inactive():
+    forecast = CashflowForecast(date(2026, 1, 1), horizon_months=12)
+    base = {"next_occurrence_on": date(2026, 1, 10), "total": Decimal("50.00"), "due": 5}
+    forecast.add_generator(compact({**base, "end_date": date(2026, 2, 10)}), "CZK", 14)
+    forecast.add_generator(compact({**base, "active": False}), "CZK", 14)
+
+    assert forecast.result()["currencies"]["CZK"]["inflow"] == "100.00"
+    assert forecast.sources["generators"] == 1
+
+
+def test_overdue_documents_are_reported_apart_from_buckets():
+    forecast = CashflowForecast(date(2026, 3, 1), horizon_months=1, granularity="week")
+    invoice = {"due_on": date(2026, 2, 20), "remaining_amount": Decimal("300.00")}
+    expense = {"due_on": date(2026, 3, 4), "total": Decimal("120.50"), "currency": "EUR"}
+    forecast.add_document(compact(invoice), "CZK", outflow=False)
+    forecast.add_document(compact(expense), "CZK", outflow=True)
+
+    result = forecast.result()
+    assert result["currencies"]["CZK"]["overdue"] == {"inflow": "300.00", "outflow": "0.00"}
+    assert result["currencies"]["CZK"]["net"] == "0.00"
+    eur = result["currencies"]["EUR"]
+    assert eur["outflow"] == "-120.50"
+    # Weekly buckets start on Monday but are clipped to the forecast start.
+    assert eur["buckets"][0]["start"] == "2026-03-01"
+    assert eur["buckets"][0]["end"] == "2026-03-01"
+    assert eur["buckets"][1]["outflow"] == "-120.50"
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match="granularity"):
+        CashflowForecast(date(2026, 1, 1), 3, granularity="day")
+    with pytest.raises(ValueError, match="horizon_months"):
+        CashflowForecast(date(2026, 1, 1), 0)
+
+
+def test_tool_combines_generators_invoices_and_expenses(call, fakturoid):
+    today = date.today()
+    soon = today + timedelta(days=3)
+    fakturoid.add(
+        Generator(
+            recurring=True,
+            next_occurrence_on=soon,
+            due=0,
+            months_period=1,
+            total=Decimal("1000.00"),
+            currency="CZK",
+        )
+    )
+    fakturoid.add(Invoice(status="open", due_on=soon, remaining_amount=Decimal("250.00")))
+    fakturoid.add(Invoice(status="paid", due_on=soon, remaining_amount=Decimal("999.00")))
+    fakturoid.add(Expense(status="overdue", due_on=today - timedelta(days=5), total="80.00"))
+
+    result = call("cashflow_forecast", horizon_months=2).structuredContent
+
+    czk = result["currencies"]["CZK"]
+    assert czk["inflow"] == "2250.00"
+    assert czk["overdue"] == {"inflow": "0.00", "outflow": "-80.00"}
+    assert result["sources"] == {"generators": 1, "occurrences": 2, "invoices": 1, "expenses": 1}
@@ -0,0 +1,68 @@
+"""Tests for background jobs: progress, cancellation and expiry."""
+
+import threading
+
+from fakturoid import Invoice
+
+from fakturoid_mcp.jobs import CANCELLED, DONE, JobManager
+
+
+def test_background_list_reports_page_progress(call, fakturoid):
+    fakturoid.page_size = 2
+    for n in range(5):
+        fakturoid.add(Invoice(number=f"2026-{n:04d}"))
+
+    job = call("list_invoices", background=True).structuredContent["job"]
+    result = call("get_job_result", job_id=job["job_id"], wait=5).structuredContent
+
+    assert result["state"] == DONE
+    assert (result["progress"], result["total"]) == (3, 3)
+    assert result["message"] == "3 pages loaded"
+    assert len(result["result"]) == 5
+
+
+def test_cancelled_job_stops_at_its_next_check():
+    jobs = JobManager(max_workers=1, retention=60)
+    started, resume = threading.Event(), threading.Event()
+    steps = []
+
+    def work(job):
+        for n in range(3):
+            job.check_cancelled()
+            steps.append(n)
+            job.report(n + 1, 3)
+            started.set()
+            resume.wait(5)
+
+    job = jobs.submit("work", work)
+    started.wait(5)
+    jobs.cancel(job.id)
+    resume.set()
+
+    assert job.wait(5)
+    assert job.state == CANCELLED
+    assert steps == [0]
+    assert job.to_dict()["progress"] == 1
+
+
+def test_pending_job_cancelled_before_it_starts_never_runs():
+    jobs = JobManager(max_workers=1, retention=60)
+    release = threading.Event()
+    blocker = jobs.submit("blocker", lambda job: release.wait(5))
+    queued = jobs.submit("queued", lambda job: "ran")
+
+    jobs.cancel(queued.id)
+    release.set()
+
+    assert blocker.wait(5) and queued.wait(5)
+    assert queued.state == CANCELLED
+    assert queued.result is None
+
+
+def test_finished_jobs_expire_after_the_retention_period():
+    jobs = JobManager(max_workers=1, retention=0)
+    job = jobs.submit("work", lambda job: 42)
+    assert job.wait(5)
+
+    assert jobs.list() == []
+    assert job.result == 42
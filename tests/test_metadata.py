@@ -0,0 +1,21 @@
+"""Tests for the memoized account metadata."""
+
+
+def test_account_is_loaded_once_until_refreshed(call, fakturoid):
+    assert call("get_account").structuredContent["name"] == "Acme s.r.o."
+    call("get_account")
+    assert fakturoid.calls == [("account",)]
+
+    call("get_account", refresh=True)
+    assert fakturoid.calls == [("account",), ("account",)]
+
+
+def test_last_known_account_is_served_during_an_outage(call, fakturoid):
+    call("get_account")
+    fakturoid.down = True
+
+    result = call("get_account", refresh=True)
+
+    assert not result.isError
+    assert result.structuredContent["name"] == "Acme s.r.o."
+    assert "stale" in result.structuredContent
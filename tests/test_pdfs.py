@@ -0,0 +1,71 @@
+"""Tests for downloading invoice PDFs through the content-addressed cache."""
+
+import os
+from datetime import datetime
+
+from fakturoid import Invoice
+
+from fakturoid_mcp import pdfs
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.status_code = 200
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeApi:
+    def __init__(self):
+        self.paths = []
+
+    def request(self, method, path, **kwargs):
+        self.paths.append(path)
+        return FakeResponse(f"%PDF {path}".encode())
+
+
+def test_unchanged_invoices_are_not_downloaded_again(app, call, fakturoid, monkeypatch):
+    app.pdfs.api = api = FakeApi()
+    index_writes = []
+    replace = os.replace
+
+    def counting_replace(src, dst):
+        if str(dst).endswith("index.json"):
+            index_writes.append(dst)
+        replace(src, dst)
+
+    monkeypatch.setattr(pdfs.os, "replace", counting_replace)
+    ids = [fakturoid.add(Invoice(number=f"2026-{n:04d}", updated_at="1")).id for n in range(3)]
+
+    first = call("download_invoice_pdfs", invoice_ids=ids).structuredContent["result"]
+    second = call("download_invoice_pdfs", invoice_ids=ids).structuredContent["result"]
+
+    assert [row["status"] for row in first] == ["downloaded"] * 3
+    assert [row["status"] for row in second] == ["unchanged"] * 3
+    assert len(api.paths) == 3
+    assert len(index_writes) == 1
+    assert (app.pdfs.root / "index.json").exists()
+
+
+def test_invoice_changed_since_it_was_cached_is_downloaded_again(app, call, fakturoid):
+    app.pdfs.api = api = FakeApi()
+    invoice = fakturoid.add(Invoice(number="2026-0001", updated_at=datetime(2026, 3, 1)))
+    call("download_invoice_pdfs", invoice_ids=[invoice.id])
+    assert app.cache.get("invoice", invoice.id) is not None
+
+    invoice.updated_at = datetime(2026, 3, 2)
+    result = call("download_invoice_pdfs", invoice_ids=[invoice.id])
+
+    assert result.structuredContent["result"][0]["status"] == "downloaded"
+    assert len(api.paths) == 2
@@ -0,0 +1,115 @@
+"""Tests for the sampling profiler."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+
+from fakturoid_mcp.profiling import DONE, Profiler, traced_worker
+
+
+def spin(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(100))
+
+
+def pooled_spin(seconds: float) -> None:
+    spin(seconds)
+
+
+def untagged_spin(seconds: float) -> None:
+    spin(seconds)
+
+
+def unrelated_spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(100))
+
+
+def wait_done(profiler, profile, timeout: float = 5.0) -> None:
+    """Wait until ``profile`` is written and ``profiler`` has unhooked its tool."""
+    deadline = time.monotonic() + timeout
+    while (profile.state != DONE or profiler.tool is not None) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert profile.state == DONE
+
+
+def sampled(profile, name: str) -> bool:
+    return any(name in stack for stack in profile.stacks)
+
+
+def test_tool_profile_keeps_only_the_tools_stacks_including_pool_workers(tmp_path):
+    profiler = Profiler()
+    calls = []
+
+    async def call(name, arguments):
+        calls.append(name)
+        if name != "slow_tool":
+            return "other"
+
+        def work():
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                tagged = pool.submit(traced_worker(pooled_spin), 0.2)
+                untagged = pool.submit(untagged_spin, 0.2)
+                tagged.result(), untagged.result()
+            return "done"
+
+        return await anyio.to_thread.run_sync(work)
+
+    stop = threading.Event()
+    bystander = threading.Thread(target=unrelated_spin, args=(stop,), daemon=True)
+    bystander.start()
+    try:
+        profile = profiler.start(tmp_path, tool="slow_tool", calls=1, interval=0.002)
+        assert anyio.run(profiler.call_tool, call, "other_tool", {}) == "other"
+        assert profile.active_calls == 0
+        assert anyio.run(profiler.call_tool, call, "slow_tool", {}) == "done"
+        wait_done(profiler, profile)
+    finally:
+        stop.set()
+
+    assert calls == ["other_tool", "slow_tool"]
+    assert profile.to_dict()["tool_calls"]["count"] == 1
+    assert sampled(profile, "pooled_spin")
+    assert not sampled(profile, "untagged_spin")
+    assert not sampled(profile, "unrelated_spin")
+    written = (tmp_path / f"{profile.id}.collapsed").read_text(encoding="utf-8")
+    assert "pooled_spin" in written
+
+
+def test_time_window_profile_samples_every_busy_thread(tmp_path):
+    profiler = Profiler()
+    stop = threading.Event()
+    bystander = threading.Thread(target=unrelated_spin, args=(stop,), daemon=True)
+    bystander.start()
+    try:
+        profile = profiler.start(tmp_path, seconds=0.1, interval=0.002)
+        wait_done(profiler, profile)
+    finally:
+        stop.set()
+
+    assert sampled(profile, "unrelated_spin")
+    data = profile.to_dict()
+    assert data["samples"] == profile.samples > 0
+    assert data["layers"]
+    assert all(layer["seconds"] >= 0 for layer in data["layers"].values())
+
+
+def test_pool_work_outside_a_profiled_call_is_not_tagged():
+    assert traced_worker(spin) is spin
+
+
+def test_finished_profile_no_longer_hooks_calls(tmp_path):
+    profiler = Profiler()
+    profile = profiler.start(tmp_path, tool="t", calls=1, interval=0.002)
+
+    async def call(name, arguments):
+        return name
+
+    anyio.run(profiler.call_tool, call, "t", {})
+    wait_done(profiler, profile)
+    anyio.run(profiler.call_tool, call, "t", {})
+
+    assert len(profile.call_times) == 1
@@ -0,0 +1,89 @@
+"""Tests for matching bank transactions and the reconciled payment ledger."""
+
+from decimal import Decimal
+
+from fakturoid import Invoice
+
+from fakturoid_mcp.reconcile import parse_statement, transaction_keys
+
+STATEMENT = (
+    "Datum;Částka;Měna;VS;ID pohybu\n"
+    "15.03.2026;40;CZK;2026001;R1\n"
+    "16.03.2026;10;CZK;2026001;\n"
+    "16.03.2026;10;CZK;2026001;\n"
+)
+
+
+def open_invoice(fakturoid):
+    return fakturoid.add(
+        Invoice(
+            number="2026-001",
+            variable_symbol="2026001",
+            status="open",
+            currency="CZK",
+            total=Decimal("100.00"),
+            remaining_amount=Decimal("100.00"),
+            payments=[],
+        )
+    )
+
+
+def test_transaction_keys_distinguish_identical_transactions():
+    keys = transaction_keys(parse_statement(STATEMENT))
+    assert keys[0] == "ref:R1"
+    assert len(set(keys)) == 3
+    assert keys == transaction_keys(parse_statement(STATEMENT))
+
+
+def test_matched_transactions_are_recorded_as_payments(call, fakturoid):
+    invoice = open_invoice(fakturoid)
+
+    result = call("reconcile_payments", statement=STATEMENT).structuredContent
+
+    assert result["summary"]["payments"] == {"recorded": 3}
+    assert [m["method"] for m in result["matches"]] == ["partial"] * 3
+    assert [(kwargs["invoice_id"], p.amount) for kwargs, p in fakturoid.payments] == [
+        (invoice.id, Decimal("40.00")),
+        (invoice.id, Decimal("10.00")),
+        (invoice.id, Decimal("10.00")),
+    ]
+
+
+def test_rerunning_a_statement_records_no_payments(call, fakturoid):
+    open_invoice(fakturoid)
+    call("reconcile_payments", statement=STATEMENT)
+
+    # The invoice stays open after partial payments, so a rerun would match again.
+    result = call("reconcile_payments", statement=STATEMENT).structuredContent
+
+    assert result["summary"]["already_recorded"] == 3
+    assert result["matches"] == []
+    assert len(fakturoid.payments) == 3
+
+
+def test_payment_deleted_in_fakturoid_is_matched_again(call, fakturoid):
+    invoice = open_invoice(fakturoid)
+    call("reconcile_payments", statement=STATEMENT)
+
+    # The payment for R1 was deleted; the other two still exist.
+    deleted = invoice.payments.pop(0)
+    invoice.remaining_amount += deleted.amount
+    result = call("reconcile_payments", statement=STATEMENT).structuredContent
+
+    assert result["summary"]["already_recorded"] == 2
+    assert [m["transaction"]["reference"] for m in result["matches"]] == ["R1"]
+    assert len(fakturoid.payments) == 4
+
+
+def test_dry_run_records_nothing(call, fakturoid):
+    open_invoice(fakturoid)
+
+    result = call(
+        "reconcile_payments",
+        transactions=[{"amount": "100", "currency": "CZK", "variable_symbol": "2026001"}],
+        dry_run=True,
+    ).structuredContent
+
+    assert result["matches"][0]["method"] == "exact"
+    assert result["summary"]["payments"] == {"matched": 1}
+    assert fakturoid.payments == []
@@ -0,0 +1,90 @@
+"""Tests for the compact record representation of Fakturoid models."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from fakturoid import Invoice
+
+from fakturoid_mcp.records import compact, from_dict, pack_decimal, packed_units, unpack_decimal
+from fakturoid_mcp.tools._helpers import model_to_dict
+
+
+def invoice() -> Invoice:
+    return Invoice(
+        id=1,
+        number="2026-0001",
+        custom_id=None,
+        currency="CZK",
+        issued_on="2026-03-01",
+        updated_at="2026-03-01T10:00:00+01:00",
+        total="1234.50",
+        exchange_rate="1.000",
+        tags=["web", "hosting"],
+        lines=[
+            {"id": 11, "name": "Hosting", "quantity": "1.0", "unit_price": "1000.10"},
+            {"id": 12, "name": "Domain", "quantity": "2", "unit_price": "117.20", "vat_rate": 21},
+        ],
+    )
+
+
+def test_decimal_packing_keeps_scale_and_sign():
+    for text in ("0", "0.00", "1234.50", "-17.05", "0.001", "99999999999.99"):
+        value = Decimal(text)
+        restored = unpack_decimal(pack_decimal(value))
+        assert restored == value
+        assert str(restored) == str(value)
+
+
+def test_decimals_that_cannot_be_packed_are_kept_raw():
+    for text in ("NaN", "-0", "1e-20"):
+        assert pack_decimal(Decimal(text)) is None
+    record = compact({"id": 1, "amount": Decimal("1e-20")})
+    assert record.get("amount") == Decimal("1e-20")
+
+
+def test_packed_units_round_half_up():
+    assert packed_units(pack_decimal(Decimal("12.345"))) == 1235
+    assert packed_units(pack_decimal(Decimal("-12.345"))) == -1235
+    assert packed_units(pack_decimal(Decimal("12.3"))) == 1230
+
+
+def test_record_to_dict_matches_model_to_dict():
+    model = invoice()
+    record = compact(model)
+    assert record.to_dict() == model_to_dict(model)
+    assert record.to_dict()["total"] == "1234.50"
+    assert record.to_dict()["exchange_rate"] == "1.000"
+
+
+def test_fields_decode_to_model_types():
+    record = compact(invoice())
+    assert record.get("total") == Decimal("1234.50")
+    assert record.get("issued_on") == date(2026, 3, 1)
+    assert isinstance(record.get("updated_at"), datetime)
+    assert record.get("custom_id") is None
+    assert record.get("missing", "default") == "default"
+    assert record.units("total") == 123450
+
+
+def test_nested_lines_round_trip():
+    model = invoice()
+    record = compact(model)
+    lines = record.get("lines")
+    assert [line.get("name") for line in lines] == ["Hosting", "Domain"]
+    assert lines[1].get("unit_price") == Decimal("117.20")
+    rebuilt = record.to_model()
+    assert isinstance(rebuilt, Invoice)
+    assert model_to_dict(rebuilt) == model_to_dict(model)
+
+
+def test_from_dict_restores_native_types():
+    data = model_to_dict(invoice())
+    record = from_dict(data, Invoice)
+    assert record.get("total") == Decimal("1234.50")
+    assert record.to_dict() == data
+
+
+def test_records_with_the_same_fields_share_a_shape():
+    first = compact({"id": 1, "status": "open"})
+    second = compact({"id": 2, "status": "paid"})
+    assert first._shape is second._shape
@@ -0,0 +1,32 @@
+"""Tests for how tool results are encoded."""
+
+import json
+
+from fakturoid import Subject
+
+from fakturoid_mcp.tools._helpers import TEXT_STUB
+
+
+def test_results_are_structured_with_a_text_stub(call, fakturoid):
+    fakturoid.add(Subject(name="Acme"))
+
+    result = call("get_subjects", subject_ids=[1])
+
+    assert result.structuredContent["result"][0]["name"] == "Acme"
+    assert [c.text for c in result.content] == [TEXT_STUB]
+
+
+def test_text_fallback_repeats_the_result_as_json(app, call, fakturoid):
+    app.settings.text_fallback = True
+    fakturoid.add(Subject(name="Acme"))
+
+    result = call("get_subject", subject_id=1)
+
+    assert json.loads(result.content[0].text) == result.structuredContent
+
+
+def test_errors_are_always_sent_as_text(call):
+    result = call("get_subject", subject_id=404)
+
+    assert result.isError
+    assert "404" in json.loads(result.content[0].text)["error"]
@@ -0,0 +1,31 @@
+"""Tests for the local document search index."""
+
+from fakturoid_mcp.records import from_dict
+from fakturoid_mcp.search import SearchIndex
+
+
+def invoice(invoice_id: int):
+    return from_dict({"id": invoice_id, "number": f"2026-{invoice_id:04d}", "note": "Hosting"})
+
+
+def test_full_sync_drops_deleted_documents():
+    documents = {i: invoice(i) for i in range(1, 4)}
+    index = SearchIndex(rebuild_interval=0.000001)
+    index.sync("invoice", lambda since: list(documents.values()))
+    del documents[2]
+
+    index.sync("invoice", lambda since: list(documents.values()))
+
+    total, hits = index.search("hostingu")
+    assert total == 2
+    assert {hit["id"] for hit in hits} == {1, 3}
+
+
+def test_incremental_sync_keeps_unchanged_documents():
+    index = SearchIndex(rebuild_interval=0)
+    index.sync("invoice", lambda since: [invoice(1), invoice(2)])
+    index.add("expense", invoice(1))
+
+    index.sync("invoice", lambda since: [] if since else [invoice(1)])
+
+    assert index.search("hosting")[0] == 3
@@ -0,0 +1,85 @@
+"""Tests for local document validation and total computation."""
+
+from decimal import Decimal
+
+import pytest
+from fakturoid import Invoice
+
+from fakturoid_mcp.validation import compute_totals, validate_document, writable_line
+
+STANDARD_RATES = frozenset({Decimal(0), Decimal(12), Decimal(21)})
+
+
+def test_null_quantity_and_vat_rate_fall_back_to_defaults():
+    lines = [{"name": "Hosting", "quantity": None, "unit_price": "100", "vat_rate": None}]
+    assert validate_document(lines, STANDARD_RATES) == []
+
+    totals = compute_totals(lines, default_vat_rate=21)
+    assert totals["lines"][0]["quantity"] == "1"
+    assert totals["vat_rates_summary"] == [
+        {"vat_rate": "21", "base": "100.00", "vat": "21.00", "total": "121.00"}
+    ]
+
+
+def test_zero_quantity_is_not_replaced_by_default():
+    totals = compute_totals([{"name": "Free", "quantity": 0, "unit_price": "100"}])
+    assert totals["total"] == "0.00"
+
+
+def test_nonstandard_vat_rate_is_a_warning():
+    lines = [{"name": "OSS", "unit_price": "100", "vat_rate": 20}]
+    warnings = validate_document(lines, STANDARD_RATES)
+    assert len(warnings) == 1
+    assert warnings[0].startswith("lines[0].vat_rate: 20")
+
+
+def test_vat_rates_are_not_checked_without_standard_rates():
+    lines = [{"name": "Foreign", "unit_price": "100", "vat_rate": 19}]
+    assert validate_document(lines) == []
+
+
+def test_non_vat_payer_rejects_nonzero_rate():
+    lines = [{"name": "Hosting", "unit_price": "100", "vat_rate": 21}]
+    with pytest.raises(ValueError, match="not a VAT payer"):
+        validate_document(lines, STANDARD_RATES, vat_payer=False)
+
+
+def test_lines_copied_from_a_document_round_trip():
+    line = {
+        "id": 7,
+        "name": "Hosting",
+        "quantity": "1.0",
+        "unit_price": "100.0",
+        "vat_rate": 21,
+        "unit_price_without_vat": "100.0",
+        "unit_price_with_vat": "121.0",
+        "total_price_without_vat": "100.0",
+        "total_vat": "21.0",
+        "total_price_with_vat": "121.0",
+    }
+    assert validate_document([line], STANDARD_RATES) == []
+    assert writable_line(line) == {
+        "id": 7,
+        "name": "Hosting",
+        "quantity": "1.0",
+        "unit_price": "100.0",
+        "vat_rate": 21,
+    }
+
+
+def test_unknown_line_fields_are_still_rejected():
+    with pytest.raises(ValueError, match="unknown field 'price'"):
+        validate_document([{"name": "Hosting", "unit_price": "100", "price": "100"}])
+
+
+def test_null_quantity_is_sent_as_the_default(app, fakturoid):
+    app.writes.submit(
+        "invoice",
+        {"subject_id": 1, "lines": [{"name": "Hosting", "quantity": None, "unit_price": "100"}]},
+        key="null-quantity",
+    )
+    status = app.writes.wait("invoice", "null-quantity", timeout=5)
+
+    [invoice] = fakturoid.store[Invoice].values()
+    assert invoice.lines[0].quantity == Decimal(1)
+    assert status["result"]["total"] == "100"
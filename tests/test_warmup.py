@@ -0,0 +1,47 @@
+"""Tests for the background cache warm-up."""
+
+import anyio
+import requests
+from fakturoid import Invoice, Subject
+
+
+def test_warmup_fills_the_cache_within_the_rate_limit(app, fakturoid, monkeypatch):
+    fakturoid.page_size = 2
+    for n in range(5):
+        fakturoid.add(Subject(name=f"Klient {n}"))
+    fakturoid.add(Invoice(number="2026-0001", status="open"))
+    tokens = []
+    monkeypatch.setattr(app.rate_limiter, "acquire", lambda: tokens.append(len(fakturoid.calls)))
+    app.warmup.refresh_interval = 0
+
+    anyio.run(app.warmup.run)
+
+    status = app.warmup.status()
+    assert status["state"] == "done"
+    assert status["steps"]["subjects"]["count"] == 5
+    assert status["steps"]["open_invoices"]["count"] == 1
+    assert app.cache.get("subject", 1).get("name") == "Klient 0"
+    list_requests = [c for c in fakturoid.calls if c[0] not in ("account", "bank_accounts")]
+    # 3 pages of subjects, 1 page each of open and overdue invoices, 1 generators request
+    assert len(list_requests) == 6
+    assert len(tokens) >= len(list_requests)
+
+
+def test_failed_step_leaves_warmup_partial(app, fakturoid, monkeypatch):
+    def unavailable(**filters):
+        raise requests.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(fakturoid, "subjects", unavailable)
+    app.warmup.refresh_interval = 0
+
+    anyio.run(app.warmup.run)
+
+    status = app.warmup.status()
+    assert status["state"] == "partial"
+    assert status["completed_steps"] == status["total_steps"]
+    assert status["steps"]["subjects"] == {
+        "state": "failed",
+        "error": "Connection refused",
+        "duration": status["steps"]["subjects"]["duration"],
+    }
+    assert status["steps"]["account"]["state"] == "done"
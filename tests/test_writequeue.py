@@ -0,0 +1,62 @@
+"""Tests for the durable write queue: idempotency keys, replays and attachments."""
+
+import requests
+from fakturoid import Invoice
+
+from fakturoid_mcp import writequeue
+from fakturoid_mcp.writequeue import DONE
+
+PAYLOAD = {
+    "subject_id": 1,
+    "lines": [{"name": "Consulting", "quantity": "2", "unit_price": "1000"}],
+}
+
+
+def test_same_key_returns_the_existing_write(app, fakturoid):
+    first = app.writes.submit("invoice", PAYLOAD, key="order-1")
+    app.writes.wait("invoice", "order-1", timeout=5)
+    again = app.writes.submit("invoice", PAYLOAD, key="order-1")
+
+    assert again["idempotency_key"] == first["idempotency_key"] == "order-1"
+    assert again["state"] == DONE
+    assert again["result"]["custom_id"] == "order-1"
+    assert len(fakturoid.store[Invoice]) == 1
+
+
+def test_replay_finds_the_document_a_lost_response_created(app, fakturoid, monkeypatch):
+    monkeypatch.setattr(writequeue, "RETRY_DELAY", 0.0)
+    save = fakturoid.save
+
+    def save_then_drop_response(model, **kwargs):
+        save(model, **kwargs)
+        monkeypatch.setattr(fakturoid, "save", save)
+        raise requests.ConnectionError("Connection reset by peer")
+
+    monkeypatch.setattr(fakturoid, "save", save_then_drop_response)
+
+    app.writes.submit("invoice", PAYLOAD, key="order-2")
+    status = app.writes.wait("invoice", "order-2", timeout=10)
+
+    assert status["state"] == DONE
+    assert status["attempts"] == 2
+    [invoice] = fakturoid.store[Invoice].values()
+    assert invoice.custom_id == "order-2"
+    assert status["result"]["id"] == invoice.id
+    assert ("invoices", {"custom_id": "order-2"}, 0) in fakturoid.calls
+    assert [c for c in fakturoid.calls if c[0] == "save"] == [("save", "Invoice", {})]
+
+
+def test_attachment_failure_keeps_the_saved_document(app, fakturoid, monkeypatch):
+    def attach(kind, document_id, sources):
+        raise ValueError("Unknown upload: missing")
+
+    monkeypatch.setattr(app.writes.attachments, "attach", attach)
+
+    app.writes.submit("invoice", {**PAYLOAD, "attachments": ["missing"]}, key="order-3")
+    status = app.writes.wait("invoice", "order-3", timeout=5)
+
+    [invoice] = fakturoid.store[Invoice].values()
+    assert status["state"] == DONE
+    assert status["error"] is None
+    assert status["result"]["id"] == invoice.id
+    assert status["result"]["attachment_error"] == "Unknown upload: missing"